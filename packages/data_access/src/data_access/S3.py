@@ -1,23 +1,68 @@
+import contextvars
 import datetime
+import hashlib
+import json
+import logging
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cached_property
+from typing import Callable, Iterator
+from zoneinfo import ZoneInfo
 import duckdb
 import polars as pl
+import pyarrow as pa
 from dotenv import load_dotenv
-from duckdb import HTTPException
-from data_access.validators import validate_isin, parse_date
+from data_access.partitions import partition_globs, in_date_range, partition_date, hive_date_predicate, \
+    months_between, compacted_path, compacted_period, period_in_date_range, drop_compacted, Compaction
+from data_access.disk_cache import DiskCache, get_disk_cache
+from data_access.manifest import Manifest, ManifestEntry, ManifestStore, DATE_COLUMNS, dataset_of, \
+    get_manifest_store
+from data_access.result_cache import ResultCache, cached_result, get_result_cache
+from data_access.pool import ConnectionPool, get_pool
+from data_access.profiling import current_profile, fetching, profiled, timed
+from data_access.storage import LocalStorage, ObjectInfo, Storage, get_storage
+from data_access.validators import validate_isin, parse_date, parse_datetime
+from data_access.write_options import WriteOptions, COMPACTED_COMPRESSION_LEVEL, layout_of
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+# files are written under this prefix and moved to their key once the write succeeded, see `WriteOptions.atomic`
+STAGING_PREFIX = '_staging'
+# rows per record batch yielded by the `iter_*` readers, bounds memory held by a streamed query
+STREAM_BATCH_SIZE = 65_536
+# written once `news_isin_index` was backfilled from all stored news, see `rebuild_news_index`
+NEWS_INDEX_MARKER = '_markers/news_isin_index.json'
+# time zone of GPW sessions, ticks are partitioned by their day in it
+MARKET_TIMEZONE = ZoneInfo('Europe/Warsaw')
+# columns of daily OHLC rows, see `aggregate_ohlc_daily`
+OHLC_DAILY_COLUMNS = ('date', 'isin', 'open', 'close', 'low', 'high', 'volume')
+# bar lengths of `resample_ohlc` as DuckDB intervals, bars of DAILY_INTERVALS are aggregated from daily OHLC
+RESAMPLE_INTERVALS = {'1m': '1 minute', '5m': '5 minutes', '15m': '15 minutes', '1h': '1 hour',
+                      '1d': '1 day', '1w': '1 week', '1mo': '1 month'}
+DAILY_INTERVALS = ('1d', '1w', '1mo')
 
 
 class DuckS3:
-    """Reading/Writing S3 files via DuckDB"""
+    """
+    Reading/Writing S3 files via DuckDB.
 
-    def __init__(self, bucket: str = None):
+    The bucket is stored on the backend selected by STORAGE_BACKEND, S3/MinIO or a local directory (see
+    `get_storage`), `s3` is the root DuckDB reads it at, e.g. 's3://bucket' or '/data/bucket'.
+    """
+
+    def __init__(self, bucket: str = None, pool: ConnectionPool | None = None):
         if not bucket:
             bucket = os.environ.get('S3_BUCKET')
-        self.s3 = f"s3://{bucket}"
+        self.bucket = bucket
+        self.s3 = self.storage.uri
 
         self.is_minio = os.getenv('IS_MINIO')
+        # connections are shared by all DuckS3 instances of the process unless a dedicated pool is passed
+        self.pool = pool or get_pool()
+        self._news_index_complete = False
 
         self.filter_date_isin = {
             'date_from': {'column': 'date', 'operator': '>='},
@@ -25,35 +70,73 @@ class DuckS3:
             'isin': {'column': 'isin', 'operator': '='}
         }
 
+    @cached_property
+    def storage(self) -> Storage:
+        """Client for object operations DuckDB can't do, e.g. deleting files"""
+        return get_storage(self.bucket)
+
+    @cached_property
+    def manifests(self) -> ManifestStore:
+        """Manifests listing files of each dataset, see `register_files`"""
+        return get_manifest_store(self.storage)
+
+    @cached_property
+    def result_cache(self) -> ResultCache | None:
+        """Cache of query results, see `cached_result`"""
+        return get_result_cache()
+
+    def dataset_versions(self, datasets: tuple[str, ...]) -> tuple[str | None, ...]:
+        """Returns versions (manifest ETags) of datasets, None for datasets without a manifest"""
+        versions = []
+        with timed('list'):
+            for dataset in datasets:
+                manifest = self.manifests.load(dataset)
+                versions.append(manifest.etag if manifest else None)
+        return tuple(versions)
+
+    def data_version(self, method: str) -> tuple[str, datetime.datetime | None] | None:
+        """
+        Returns version of the data a cached method (see `cached_result`) reads, used as HTTP validators by the API.
+
+        Returns:
+            tuple[str, datetime.datetime | None] | None: Hash of manifest ETags of the datasets read by the method and
+                the time their newest file was written, None if any of them has no manifest, as its changes can't
+                be detected without listing the bucket
+        """
+        datasets = getattr(getattr(type(self), method), 'datasets', ())
+        if not datasets:
+            return None
+        with timed('list'):
+            manifests = [self.manifests.load(dataset) for dataset in datasets]
+        if any(manifest is None for manifest in manifests):
+            return None
+        tag = hashlib.sha256('|'.join(f"{manifest.dataset}:{manifest.etag}" for manifest in manifests).encode())
+        last_modified = max((manifest.last_modified for manifest in manifests if manifest.last_modified), default=None)
+        return tag.hexdigest()[:32], last_modified
+
+    @cached_property
+    def disk_cache(self) -> DiskCache | None:
+        """Local cache of immutable objects, None if S3_CACHE_DIR is not set or the bucket is already local"""
+        if isinstance(self.storage, LocalStorage):
+            return None
+        return get_disk_cache()
+
     def file_exists(self, path) -> bool:
         """Checks if the given path exists"""
+        return self.storage.head(path) is not None
 
-        try:
-            with self.get_connection() as conn:
-                conn.sql(f"""SELECT 1 FROM '{self.s3}/{path}'""")
-                return True
-        except HTTPException as e:
-            if '404' in str(e):
-                return False
-            else:
-                raise
-
+    @contextmanager
     def get_connection(self, read_only: bool = True):
-        """Gets connection to duckdb"""
-        conn = duckdb.connect(":memory:")
-        conn.sql("SET TimeZone = 'Europe/Warsaw'")
-        if self.is_minio:
-            conn.execute(f"""
-                CREATE SECRET minio_secret (
-                    TYPE S3,
-                    KEY_ID '{os.getenv('S3_ACCESS_KEY_ID')}',
-                    SECRET '{os.getenv('S3_SECRET_ACCESS_KEY')}',
-                    ENDPOINT '{os.getenv('S3_ENDPOINT')}',
-                    URL_STYLE '{os.getenv('S3_URL_STYLE', 'path')}',
-                    USE_SSL {os.getenv('S3_USE_SSL', 'false')}
-                )
-            """)
-        return conn
+        """
+        Gets a cursor from the DuckDB connection pool, returned to the pool when the context exits. Disk cache files
+        returned by `_read_paths` while the cursor is held stay on disk until then (see `DiskCache.pinned`).
+        """
+        with self.pool.acquire() as conn:
+            if self.disk_cache is None:
+                yield conn
+            else:
+                with self.disk_cache.pinned():
+                    yield conn
 
     def _query_filter(self, filter_def: dict, **kwargs) -> tuple[str, dict]:
         """
@@ -89,27 +172,345 @@ class DuckS3:
         where_clausule = " AND ".join(conditions) if conditions else ""
         return where_clausule, params
 
-    def write_data(self, data: pl.DataFrame | dict, path: str):
-        """Write data (json/parquet) to given path in S3"""
+    def _list_files(self, pattern: str, manifest: Manifest | None = None) -> list[ObjectInfo]:
+        """
+        Lists objects matching the glob pattern, empty list if nothing matches.
+
+        Files are resolved from the manifest of the dataset (loaded if not given), the bucket is listed only for
+        datasets which don't have a manifest yet.
+        """
+        key = self.storage.key(pattern)
+        with timed('list'):
+            manifest = manifest or self.manifests.load(dataset_of(key))
+            if manifest is None:
+                if profile := current_profile():
+                    profile.list_requests += 1
+                return self.storage.glob(pattern)
+            return manifest.glob(key, self.storage.uri)
+
+    def _resolve(self, pattern: str) -> list[str]:
+        """Paths to read files matching the glob pattern from, the pattern itself if nothing matches"""
+        return self._read_paths(self._list_files(pattern)) or [pattern]
+
+    def _file_stats(self, dataset: str, paths: list[str]) -> dict[str, tuple[int, str | None, str | None]]:
+        """Reads row counts and min/max of the date column of parquet files from their footers"""
+        date_column = DATE_COLUMNS.get(dataset, 'date')
+        with self.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT file_name,
+                       SUM(row_group_num_rows) FILTER (WHERE column_id = 0),
+                       MIN(stats_min_value) FILTER (WHERE path_in_schema = $column),
+                       MAX(stats_max_value) FILTER (WHERE path_in_schema = $column)
+                FROM parquet_metadata($files)
+                GROUP BY file_name
+            """, {'files': paths, 'column': date_column}).fetchall()
+        return {self.storage.key(file): (int(count), min_date and min_date[:10], max_date and max_date[:10])
+                for file, count, min_date, max_date in rows}
+
+    def _manifest_entries(self, dataset: str, objects: list[ObjectInfo]) -> dict[str, ManifestEntry]:
+        if not objects:
+            return {}
+        stats = self._file_stats(dataset, [obj.path for obj in objects])
+        entries = {}
+        for obj in objects:
+            rows, min_date, max_date = stats.get(obj.key, (None, None, None))
+            entries[obj.key] = ManifestEntry(key=obj.key, size=obj.size, etag=obj.etag,
+                                             last_modified=obj.last_modified.isoformat(), rows=rows,
+                                             min_date=min_date, max_date=max_date)
+        return entries
+
+    def _build_manifest(self, dataset: str) -> Manifest:
+        """Builds manifest of the dataset from a listing of the bucket"""
+        objects = (self.storage.glob(f"{self.s3}/{dataset}/**/*.parquet") +
+                   self.storage.glob(f"{self.s3}/compacted/{dataset}/*/*.parquet"))
+        return Manifest(dataset=dataset, entries=self._manifest_entries(dataset, objects))
+
+    def register_files(self, paths: list[str], replaces: list[str] | None = None) -> None:
+        """
+        Records written files in manifests of their datasets, so readers can find them without listing the bucket.
+
+        Args:
+            paths: Written files (full paths or keys)
+            replaces: Files removed from the manifest in the same update, e.g. files merged by a compaction
+        """
+        objects = [self.storage.head(path) for path in paths]
+        by_dataset: dict[str, list[ObjectInfo]] = {}
+        for obj in objects:
+            if obj is not None:
+                by_dataset.setdefault(dataset_of(obj.key), []).append(obj)
+        for path in replaces or []:
+            by_dataset.setdefault(dataset_of(self.storage.key(path)), [])
+
+        for dataset, dataset_objects in by_dataset.items():
+            entries = self._manifest_entries(dataset, dataset_objects)
+            removed = [self.storage.key(path) for path in replaces or [] if dataset_of(self.storage.key(path)) == dataset]
+
+            def change(manifest: Manifest) -> None:
+                for key in removed:
+                    manifest.entries.pop(key, None)
+                manifest.entries.update(entries)
+
+            self.manifests.update(dataset, change, bootstrap=lambda: self._build_manifest(dataset))
+
+    def rebuild_manifest(self, dataset: str) -> None:
+        """Replaces manifest of the dataset with a fresh listing of the bucket"""
+        entries = self._build_manifest(dataset).entries
+
+        def change(manifest: Manifest) -> None:
+            manifest.entries = entries
+
+        self.manifests.update(dataset, change, bootstrap=lambda: Manifest(dataset=dataset))
+
+    def _read_paths(self, objects: list[ObjectInfo]) -> list[str]:
+        """
+        Returns paths DuckDB should read the objects from.
+
+        Immutable objects are served from the local disk cache when it's enabled, missing ones are downloaded
+        in parallel, everything else is read from S3 directly.
+        """
+        if self.disk_cache is None:
+            return [obj.path for obj in objects]
+
+        def read_path(obj: ObjectInfo) -> str:
+            if not self.disk_cache.is_immutable(obj.key):
+                return obj.path
+            return self.disk_cache.get(obj.key, obj.etag, self.storage.download)
+
+        # downloads run in copies of the caller's context, so files are pinned by its `get_connection`
+        contexts = [contextvars.copy_context() for _ in objects]
+        with timed('download'), ThreadPoolExecutor(max_workers=8) as executor:
+            return list(executor.map(lambda context, obj: context.run(read_path, obj), contexts, objects))
+
+    @staticmethod
+    def _sql_list(paths: list[str]) -> str:
+        """Renders paths as SQL list literal"""
+        return "[" + ", ".join("'" + path.replace("'", "''") + "'" for path in paths) + "]"
+
+    def _partition_files(self, dataset: str, date_from: datetime.date | None = None,
+                         date_to: datetime.date | None = None,
+                         file_pattern: str = '*.parquet') -> tuple[list[ObjectInfo], list[ObjectInfo]]:
+        """
+        Resolves files of a year=/month=/day= partitioned dataset which can hold rows from the date range.
+
+        Only the prefixes of touched months/years are listed and the listed files are pruned by their partition date,
+        so the cost of a query for recent data doesn't depend on how much history is stored. Files merged by
+        `compact_partitions` are resolved as well and take precedence over the day partitions they were made of.
+
+        Args:
+            dataset: Dataset prefix in the bucket, e.g. 'ohlc' or 'news'
+            date_from: First partition date, None for no lower bound
+            date_to: Last partition date, None for no upper bound
+            file_pattern: Pattern of file names inside the day partition
+
+        Returns:
+            Tuple of day partition files (hive layout) and compacted files
+        """
+        with timed('list'):
+            manifest = self.manifests.load(dataset)
+        if manifest:
+            # no listing cost to save, the manifest already lists every file
+            patterns = [f"{self.s3}/{dataset}/**/{file_pattern}"]
+        else:
+            patterns = partition_globs(f"{self.s3}/{dataset}", date_from, date_to, file_pattern)
+        daily = [obj for pattern in patterns for obj in self._list_files(pattern, manifest)
+                 if in_date_range(obj.path, date_from, date_to)]
+        compacted = [obj for obj in self._list_files(f"{self.s3}/compacted/{dataset}/*/{file_pattern}", manifest)
+                     if period_in_date_range(*compacted_period(obj.path), date_from, date_to)]
+
+        objects = {obj.path: obj for obj in daily + compacted}
+        daily, compacted = drop_compacted([obj.path for obj in daily], [obj.path for obj in compacted])
+        return [objects[path] for path in daily], [objects[path] for path in compacted]
+
+    def _scan(self, conn, dataset: str, date_from: datetime.date | None = None, date_to: datetime.date | None = None,
+              file_pattern: str = '*.parquet', filename: bool = False):
+        """
+        Returns relation over a partitioned dataset, day partitions and compacted files are read as one table
+        with year, month and day columns.
+
+        If no file matches the date range, a single file of the dataset is scanned so DuckDB can still bind the
+        schema, the hive predicate of the query (see `hive_date_predicate`) then filters out all of its rows.
+        """
+        daily, compacted = self._partition_files(dataset, date_from, date_to, file_pattern)
+        if not daily and not compacted:
+            all_daily, all_compacted = self._partition_files(dataset, file_pattern=file_pattern)
+            compacted = all_compacted[:1]
+            daily = all_daily[:1] if not compacted else []
+
+        daily_paths = self._read_paths(daily)
+        if not daily_paths and not compacted:
+            # empty dataset, DuckDB raises the same "No files found" error as for a plain glob
+            daily_paths = [f"{self.s3}/{dataset}/**/{file_pattern}"]
+
+        scans = []
+        if daily_paths:
+            scans.append(f"SELECT * FROM read_parquet({self._sql_list(daily_paths)}, hive_partitioning = true, "
+                         f"filename = {filename})")
+        if compacted:
+            scans.append(f"SELECT * FROM read_parquet({self._sql_list(self._read_paths(compacted))}, "
+                         f"hive_partitioning = false, filename = {filename})")
+        return conn.sql(" UNION ALL BY NAME ".join(scans))
+
+    def compact_partitions(self, dataset: str, yearly: bool = False, sort_by: list[str] | None = None,
+                           row_group_size: int = 122_880) -> Compaction:
+        """
+        Merges day partitions of closed months into monthly files, or monthly files of closed years into yearly ones.
+
+        Files are merged per file name (e.g. one file per news source) into `compacted/{dataset}/`. The compacted
+        file is written and swapped for the merged files in the dataset manifest in a single update before anything
+        is deleted, readers switch to it as soon as it exists (see `drop_compacted`), so they never see
+        a half-compacted period. Files left behind by an interrupted run are already ignored by
+        readers and are deleted by the next run.
+
+        Args:
+            dataset: Hive partitioned dataset, e.g. 'news', 'ohlc' or 'ohlc_daily'
+            yearly: If True, monthly files of closed years are merged, otherwise day partitions of closed months
+            sort_by: Columns to sort rows by, so min/max statistics of row groups let readers skip data, defaults to
+                the sort order of the dataset layout
+            row_group_size: Number of rows per row group
+
+        Returns:
+            Compaction: Written compacted files and deleted merged files
+        """
+        today = datetime.date.today()
+        root = f"{self.s3}/compacted/{dataset}"
+        compaction = Compaction()
+        daily = [obj.path for obj in self._list_files(f"{self.s3}/{dataset}/**/*.parquet")]
+        compacted = [obj.path for obj in self._list_files(f"{root}/*/*.parquet")]
+        existing = set(compacted)
+
+        groups = {}
+        if yearly:
+            for path in compacted:
+                year, month = compacted_period(path)
+                if month is not None and year < today.year:
+                    groups.setdefault((year, None, path.rsplit('/', 1)[-1]), []).append(path)
+        else:
+            for path in daily:
+                date = partition_date(path)
+                if date and (date.year, date.month) < (today.year, today.month):
+                    groups.setdefault((date.year, date.month, path.rsplit('/', 1)[-1]), []).append(path)
+
+        layout = layout_of(dataset)
+        options = layout.replace(sort_by=tuple(sort_by) if sort_by else layout.sort_by,
+                                 row_group_size=row_group_size, partition_by=(),
+                                 compression_level=COMPACTED_COMPRESSION_LEVEL)
+        for (year, month, name), files in sorted(groups.items()):
+            target = compacted_path(root, year, month, name)
+            covered_by_year = compacted_path(root, year, None, name) in existing
+            if target not in existing and not covered_by_year:
+                # the connection is released before registering, reading statistics of the written file takes
+                # another one from the pool
+                with self.get_connection(read_only=False) as conn:
+                    merged = conn.sql(f"""SELECT * FROM read_parquet({self._sql_list(files)},
+                                                                     hive_partitioning = {not yearly},
+                                                                     union_by_name = true)""")
+                    self._copy(conn, merged, target, options)
+                compaction.written.append(target)
+                logger.info(f"Compacted {len(files)} files into {target}")
+                self.register_files([target], replaces=files)
+            else:
+                self.register_files([], replaces=files)
+            self.storage.delete(files)
+            compaction.deleted += files
+
+        return compaction
 
+    def write_data(self, data: pl.DataFrame | dict, path: str, options: WriteOptions | None = None,
+                   register: bool = True) -> list[str]:
+        """
+        Writes data as parquet to given path in S3 and registers written files in the dataset manifest.
+
+        Args:
+            data: Data to write
+            path: Path relative to the bucket, a file, or the dataset root directory for partitioned writes
+            options: Compression, sort order, row group size and partitioning of the files, defaults to the layout
+                of the dataset (see `DATASET_LAYOUTS`)
+            register: If False, registering is left to the caller, bulk loads writing many files register them
+                with a single `register_files` call instead of one manifest update per file
+
+        Returns:
+            list[str]: Paths of written files
+        """
+        options = options or layout_of(path)
         with self.get_connection(read_only=False) as conn:
-            conn.sql(f"""COPY data TO '{self.s3 + path}'""")
+            written = self._copy(conn, conn.sql("SELECT * FROM data"), self.s3 + path, options)
+        if register:
+            self.register_files(written)
+        return written
 
+    def _copy(self, conn, source: duckdb.DuckDBPyRelation, target: str, options: WriteOptions) -> list[str]:
+        """
+        Writes the relation to the target path, see `WriteOptions`. Written files are not registered in the manifest,
+        callers register them (together with files they replace).
+
+        Returns:
+            list[str]: Paths of written files
+        """
+        query = f"SELECT * FROM source {'ORDER BY ' + ', '.join(options.sort_by) if options.sort_by else ''}"
+        if not options.atomic:
+            self.storage.prepare_write(target)
+            return conn.sql(f"COPY ({query}) TO '{target}' ({options.copy_options()}, RETURN_FILES)").fetchone()[1]
+
+        staging = f"{self.s3}/{STAGING_PREFIX}/{uuid.uuid4().hex}"
+        staged_target = f"{staging}/{self.storage.key(target)}"
+        try:
+            self.storage.prepare_write(staged_target)
+            staged = conn.sql(f"""COPY ({query}) TO '{staged_target}'
+                                  ({options.copy_options()}, RETURN_FILES)""").fetchone()[1]
+        except Exception:
+            self.storage.delete([obj.path for obj in self.storage.glob(f"{staging}/**/*")])
+            raise
+        written = []
+        for path in staged:
+            final = f"{self.s3}/{path.removeprefix(staging + '/')}"
+            self.storage.move(path, final)
+            written.append(final)
+        return written
+
+    @profiled
     def read_file(self, path, hive: bool = False, file_name: bool = False, filter_query: str = None,
                   columns: list[str] = None) -> pl.DataFrame:
         """Reads parquet file from s3"""
         with self.get_connection() as conn:
-            rel = conn.read_parquet(f"{self.s3}/{path}", hive_partitioning=hive, filename=file_name)
-            if filter_query:
-                rel = rel.filter(filter_query)
-
-            if columns:
-                rel = rel.select(*columns)
-
-            return rel.pl()
-
+            return self._materialize(conn, self._file_relation(conn, path, hive, file_name, filter_query, columns))
+
+    @profiled
+    def iter_file(self, path, hive: bool = False, file_name: bool = False, filter_query: str = None,
+                  columns: list[str] = None, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+        """Reads parquet file from s3 in record batches of `batch_size` rows, see `read_file`"""
+        yield from self._iter_batches(
+            lambda conn: self._file_relation(conn, path, hive, file_name, filter_query, columns), batch_size)
+
+    def _file_relation(self, conn, path, hive: bool, file_name: bool, filter_query: str | None,
+                       columns: list[str] | None) -> duckdb.DuckDBPyRelation:
+        rel = conn.read_parquet(f"{self.s3}/{path}", hive_partitioning=hive, filename=file_name)
+        if filter_query:
+            rel = rel.filter(filter_query)
+
+        if columns:
+            rel = rel.select(*columns)
+        return rel
+
+    def _iter_batches(self, build: Callable[[duckdb.DuckDBPyConnection], duckdb.DuckDBPyRelation],
+                      batch_size: int) -> Iterator[pa.RecordBatch]:
+        """
+        Runs the query built on a pooled connection and yields its result in record batches as DuckDB produces
+        them, so only one batch is held in memory. The connection is checked out until the iterator is exhausted
+        or closed. An empty result yields one empty batch, so consumers always get the schema.
+        """
+        with self.get_connection() as conn:
+            reader = build(conn).to_arrow_reader(batch_size)
+            empty = True
+            for batch in reader:
+                empty = False
+                yield batch
+            if empty:
+                yield pa.RecordBatch.from_pylist([], schema=reader.schema)
+
+    @profiled
+    @cached_result('news', 'news_isin_index')
     def get_news(self, isin: str = None, only_isin: bool = False, date_from: str = None, date_to: str = None,
-                 source: str = None) -> pl.DataFrame:
+                 source: str = None, arrow: bool = False) -> pl.DataFrame | pa.Table:
         """
         Retrieves news data based on specified filters and date range.
 
@@ -119,11 +520,25 @@ class DuckS3:
             date_from: Start date for filtering news, formatted as string.
             date_to: End date for filtering news, formatted as string.
             source: News source to filter by, e.g., 'interia' or 'bankier'.
+            arrow: If True, the result is returned as an Arrow table, see `_materialize`.
 
         Returns:
             pl.DataFrame: DataFrame containing news data with columns including title, link, date, summary,
             company_isins, year, month, and day.
         """
+        build = self._news_relation(isin, only_isin, date_from, date_to, source)
+        with self.get_connection() as conn:
+            return self._materialize(conn, build(conn), arrow)
+
+    @profiled
+    def iter_news(self, isin: str = None, only_isin: bool = False, date_from: str = None, date_to: str = None,
+                  source: str = None, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+        """Retrieves news in record batches of `batch_size` rows, see `get_news` for the filters"""
+        yield from self._iter_batches(self._news_relation(isin, only_isin, date_from, date_to, source), batch_size)
+
+    def _news_relation(self, isin: str | None, only_isin: bool, date_from: str | None, date_to: str | None,
+                       source: str | None) -> Callable[[duckdb.DuckDBPyConnection], duckdb.DuckDBPyRelation]:
+        """Validates filters of a news query and returns function building the query on a connection"""
         news_filter = self.filter_date_isin.copy()
         news_filter['isin'] = {'column': 'company_isins', 'operator': 'IN'}
         date_from = parse_date(date_from)
@@ -135,34 +550,181 @@ class DuckS3:
         else:
             source = '*'
 
-        path = f'{self.s3}/news/**/{source}.parquet'
-
-        where, params = self._query_filter(filter_def=news_filter, date_from=date_from, date_to=date_to,
-                                           isin=isin)
+        def build(conn) -> duckdb.DuckDBPyRelation:
+            if (isin or only_isin) and self._has_news_index():
+                return self._news_by_index_relation(conn, isin, date_from, date_to, source)
+
+            news_filter['only_isin'] = {'column': 'len(company_isins)', 'operator': '>'}
+            where, params = self._query_filter(filter_def=news_filter, date_from=date_from, date_to=date_to,
+                                               isin=isin, only_isin=0 if only_isin else None)
+            # article is stored in partition of the day it was fetched, which is never earlier than its publication
+            # date, so only the lower bound is safe to prune partitions with
+            partition_where = hive_date_predicate(date_from, None)
+            conditions = " AND ".join(condition for condition in (partition_where, where) if condition)
+
+            # `write_news` skips links stored within its lookback only, older partitions and articles repeated
+            # after a longer break hold the same link on several days, the latest copy is returned
+            query = f"""WITH data AS (SELECT title, link, MAKE_DATE(year, month, day) AS _date, date, summary,
+                                             company_isins
+                                      FROM news
+                                      {'WHERE ' + conditions if conditions else ""})
+                        SELECT DISTINCT ON (link) title, link, date, summary, company_isins
+                        FROM data
+                        ORDER BY _date DESC"""
+            news = self._scan(conn, 'news', date_from=date_from, file_pattern=f'{source}.parquet')
+            return conn.sql(query, params=params)
+
+        return build
+
+    def _has_news_index(self) -> bool:
+        """
+        Checks if `news_isin_index` covers all stored news, i.e. it was backfilled by `rebuild_news_index`. Index
+        files written by `write_news` alone cover only articles fetched since, readers scan partitions until then.
+        """
+        if not self._news_index_complete:
+            # the marker is never removed, so only its absence has to be checked again
+            self._news_index_complete = self.storage.head(NEWS_INDEX_MARKER) is not None
+        return self._news_index_complete
 
-        query = f"""WITH data AS (SELECT title, link, MAKE_DATE(year, month, day) as _date, date, summary, company_isins 
-        FROM read_parquet('{path}', hive_partitioning=True)
-        ) 
-        SELECT DISTINCT ON (link) title, link, date, summary, company_isins FROM data
-                    {'WHERE ' + where if where else ""}
-                    ORDER BY _date DESC"""
-        with self.get_connection() as conn:
-            statement = conn.sql(query, params=params)
-            df = statement.pl()
-            return df
+    def _news_by_index_relation(self, conn, isin: str | None, date_from: datetime.date | None,
+                                date_to: datetime.date | None, source: str) -> duckdb.DuckDBPyRelation:
+        """
+        Reads news about a company (or about any company if isin is None) through the `news_isin_index` dataset.
 
+        The index holds one small row per (isin, article), sorted by isin, so row group statistics skip other
+        companies. Only news partitions of days the index points to are opened and only the indexed rows are returned.
+        """
+        where, params = self._query_filter(filter_def=self.filter_date_isin, date_from=date_from, date_to=date_to,
+                                           isin=isin)
+        partition_where = hive_date_predicate(date_from, None)
+        conditions = " AND ".join(condition for condition in (partition_where, where) if condition)
+        isin_index = self._scan(conn, 'news_isin_index', date_from=date_from, file_pattern=f'{source}.parquet')
+        matches = conn.sql(f"""SELECT DISTINCT link, year, month, day
+                               FROM isin_index
+                               {'WHERE ' + conditions if conditions else ""}""", params=params).pl()
+
+        days = sorted({datetime.date(*day) for day in matches.select('year', 'month', 'day').iter_rows()})
+        day_keys = ", ".join(str(day.year * 10000 + day.month * 100 + day.day) for day in days)
+        news = self._scan(conn, 'news', date_from=days[0] if days else date_from, date_to=days[-1] if days else None,
+                          file_pattern=f'{source}.parquet')
+        return conn.sql(f"""WITH data AS (SELECT title, link, MAKE_DATE(year, month, day) AS _date, date, summary,
+                                                 company_isins
+                                          FROM news SEMI JOIN matches USING (link, year, month, day)
+                                          WHERE (year * 10000 + month * 100 + day) IN ({day_keys or 'NULL'}))
+                            SELECT DISTINCT ON (link) title, link, date, summary, company_isins
+                            FROM data
+                            ORDER BY _date DESC""")
+
+    @profiled
     def get_today_news(self, company_isin=None, source: str = None) -> pl.DataFrame:
         """return latest news for today from S3 bucket"""
         today = datetime.date.today().isoformat()
         return self.get_news(isin=company_isin, date_from=today, source=source)
 
+    def write_news(self, news: pl.DataFrame, source: str, lookback_days: int = 7) -> pl.DataFrame:
+        """
+        Appends articles fetched from a news source to today's partition and updates the ISIN index.
+
+        RSS feeds repeat articles for days, so links already stored within lookback_days are skipped and readers
+        don't have to deduplicate. Articles mentioning companies get one (isin, link) row per company in the
+        `news_isin_index` dataset, written under the same partition and file name as the news.
+
+        Args:
+            news: Fetched articles with title, link, date, summary and company_isins columns
+            source: Name of the news source used as file name, e.g. 'BankierSource'
+            lookback_days: Number of past days searched for already stored links
+
+        Returns:
+            pl.DataFrame: Articles which weren't stored yet
+        """
+        today = datetime.date.today()
+        since = today - datetime.timedelta(days=lookback_days)
+        partition = f"year={today.year}/month={today.month}/day={today.day}/{source}.parquet"
+        news = news.unique(subset='link', keep='first', maintain_order=True)
+
+        with self.get_connection() as conn:
+            daily, compacted = self._partition_files('news', date_from=since)
+            if daily or compacted:
+                stored = self._scan(conn, 'news', date_from=since)
+                stored_links = conn.sql(f"SELECT link FROM stored WHERE {hive_date_predicate(since, None)}").pl()
+                news = news.filter(~pl.col('link').is_in(stored_links.get_column('link').implode()))
+            if news.is_empty():
+                return news
+
+            today_files = self._list_files(f"{self.s3}/news/{partition}")
+            if today_files:
+                stored_today = conn.read_parquet(self._read_paths(today_files), hive_partitioning=False).pl()
+                news_to_write = pl.concat([stored_today, news], how='vertical_relaxed')
+            else:
+                news_to_write = news
+
+        isin_index = (news_to_write.select(pl.col('company_isins').alias('isin'), 'link', 'date')
+                      .explode('isin')
+                      .drop_nulls('isin')
+                      .sort('isin', 'date'))
+        self.write_data(news_to_write, f"/news/{partition}")
+        if self._has_news_index():
+            self.write_data(isin_index, f"/news_isin_index/{partition}")
+        else:
+            # the first indexed write backfills the index from all stored news, today's partition included
+            self.rebuild_news_index()
+        return news
+
+    def rebuild_news_index(self) -> int:
+        """
+        Rebuilds the `news_isin_index` dataset from all stored news and marks it complete, so readers start using it
+        (see `_has_news_index`). Called by the first `write_news` of a bucket, or manually after fixing news data.
+
+        An article repeated by older, not deduplicated partitions is indexed only at its first occurrence.
+
+        Returns:
+            int: Number of index files written
+        """
+        with self.get_connection() as conn:
+            news = self._scan(conn, 'news', filename=True)
+            isin_index = conn.sql("""
+                WITH mentions AS (SELECT UNNEST(company_isins) AS isin, link, date, year, month, day,
+                                         REGEXP_EXTRACT(filename, '[^/]+$') AS file_name
+                                  FROM news)
+                SELECT * FROM mentions
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY link, isin ORDER BY year, month, day) = 1
+                ORDER BY isin, date
+            """).pl()
+
+        written = []
+        for (year, month, day, file_name), rows in isin_index.group_by('year', 'month', 'day', 'file_name'):
+            written += self.write_data(rows.select('isin', 'link', 'date'),
+                                       f"/news_isin_index/year={year}/month={month}/day={day}/{file_name}",
+                                       register=False)
+        self.register_files(written)
+        marker = {'rebuilt_at': datetime.datetime.now().isoformat()}
+        self.storage.put_bytes(NEWS_INDEX_MARKER, json.dumps(marker).encode())
+        self._news_index_complete = True
+        return len(written)
+
+    def publish_latest(self, dataset: str, data: pl.DataFrame) -> None:
+        """
+        Writes the newest snapshot of a dataset also as `latest/{dataset}.parquet`.
+
+        Readers of the newest snapshot open only this object, so they don't slow down as history grows. It's
+        written after the snapshot itself and replaced in a single PUT, so it never points to partial data.
+        """
+        self.write_data(data, f"/latest/{dataset}.parquet")
+
+    def _latest_paths(self, dataset: str, pattern: str) -> list[str]:
+        """Paths of the snapshot published by `publish_latest`, all files matching pattern if there is none yet"""
+        latest = self._list_files(f"{self.s3}/latest/{dataset}.parquet")
+        return self._read_paths(latest) if latest else self._resolve(pattern)
+
+    @profiled
+    @cached_result('latest', 'companies_metadata')
     def get_latest_isins(self):
         """return latest ISINs from companies_metadata parquet file in S3 bucket"""
         with self.get_connection() as conn:
-            path = f'{self.s3}/companies_metadata/*.parquet'
+            files = self._latest_paths('companies_metadata', f'{self.s3}/companies_metadata/*.parquet')
 
-            isins = conn.sql("""WITH metadata AS (SELECT *
-                                                  FROM read_parquet('s3://stock/companies_metadata/*.parquet'))
+            isins = conn.sql(f"""WITH metadata AS (SELECT *
+                                                  FROM read_parquet({self._sql_list(files)}))
                                 SELECT company_isin
                                 FROM metadata
                                 WHERE date = (SELECT MAX(date) FROM metadata)
@@ -171,39 +733,54 @@ class DuckS3:
 
             return [x[0] for x in isins]
 
+    @profiled
+    @cached_result('latest', 'companies_metadata')
     def get_companies_metadata(self, isin: str | None = None) -> pl.DataFrame:
         """Retrieves company metadata from the latest available parquet file in S3."""
         validate_isin(isin)
-        path = f'{self.s3}/companies_metadata/*.parquet'
         with self.get_connection() as conn:
+            files = self._latest_paths('companies_metadata', f'{self.s3}/companies_metadata/*.parquet')
             metadata = conn.sql(f"""WITH metadata AS (
-                                    SELECT * FROM read_parquet('{path}')
+                                    SELECT * FROM read_parquet({self._sql_list(files)})
                                     )
                                     SELECT * FROM metadata WHERE date = (SELECT MAX(date) FROM metadata)
             """)
 
             if isin:
-                metadata = metadata.filter(f"company_isin = '{isin}'").select("EXCLUDE(day, month, year)")
+                metadata = metadata.filter(f"company_isin = '{isin}'")
 
-            return metadata.pl()
+            return self._materialize(conn, metadata)
 
+    @profiled
+    @cached_result('ohlc_daily', 'ohlc_seed')
     def aggregate_ohlc_daily(self, isin: str = None,
                              date_from: str | None = None, date_to: str | None = None,
-                             ):
+                             arrow: bool = False, columns: list[str] | None = None,
+                             after: tuple[str, str] | None = None, limit: int | None = None):
         """
         Aggregates daily OHLC (Open, High, Low, Close) data for financial instruments.
 
-        This method retrieves and processes daily OHLC data from Parquet files stored in S3. It combines
-        data from both the main OHLC daily dataset and a seed dataset, depending on the specified date range.
+        This method retrieves daily OHLC data from the `ohlc_daily` rollup maintained by the pipeline (see
+        `update_ohlc_daily_rollup`), so minutely ticks are not re-aggregated on every call. It combines
+        data from both the rollup and a seed dataset, depending on the specified date range.
         The method supports filtering by ISIN and date range, and returns aggregated data grouped by date and ISIN.
+        Filters and the column selection are pushed down to the parquet scans, so only matching row groups and the
+        selected columns are read.
 
         Args:
             isin: International Securities Identification Number to filter data. If None, all ISINs are included.
             date_from: Start date for filtering data. If None, no start date filter is applied.
             date_to: End date for filtering data. If None, no end date filter is applied.
+            arrow: If True, the result is returned as an Arrow table, see `_materialize`.
+            columns: Columns to return (see `OHLC_DAILY_COLUMNS`), date and isin identifying a row are always
+                included. If None, all columns are returned.
+            after: (isin, date) of the last row of the previous page, only rows following it in the (isin, date)
+                order are returned
+            limit: Maximum number of returned rows, pages are fetched by passing (isin, date) of the last row of
+                a page as `after` of the next call
 
         Returns:
-            Polars DataFrame containing aggregated OHLC data with the following columns:
+            Polars DataFrame containing aggregated OHLC data sorted by isin and date with the following columns:
                 - date: Trading date
                 - isin: International Securities Identification Number
                 - open: Opening price
@@ -214,47 +791,43 @@ class DuckS3:
 
         Raises:
             ValidationError: If the provided ISIN is invalid.
+            ValueError: If a column is unknown, the cursor invalid or the limit not positive.
         """
         validate_isin(isin)
         date_from = parse_date(date_from)
         date_to = parse_date(date_to)
+        unknown = set(columns or ()) - set(OHLC_DAILY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns {sorted(unknown)}, valid columns are {list(OHLC_DAILY_COLUMNS)}")
+        selected = [column for column in OHLC_DAILY_COLUMNS if columns is None or column in (*columns, 'date', 'isin')]
+        if limit is not None and limit <= 0:
+            raise ValueError("Limit must be positive")
+
+        where, params = self._query_filter(filter_def=self.filter_date_isin, date_from=date_from, date_to=date_to,
+                                           isin=isin)
+        where_clause = f"WHERE {where}" if where else ""
+        page_where = ""
+        if after is not None:
+            after_isin, after_date = after
+            validate_isin(after_isin)
+            params.update(after_isin=after_isin, after_date=parse_date(str(after_date)))
+            page_where = "WHERE isin > $after_isin OR (isin = $after_isin AND date > $after_date)"
 
         with self.get_connection() as conn:
-            ohlc_daily = conn.read_parquet(
-                f"{self.s3}/ohlc/**/*.parquet",
-                hive_partitioning=True
-            )
-            ohlc_seed = conn.read_parquet(
-                f"{self.s3}/ohlc_seed/*.parquet"
-            )
-            seed_date = conn.sql("""
-                                 SELECT CAST(split(filename, '/')[-1]::VARCHAR AS DATE)
-                                 FROM read_parquet(?, filename = True)
-                                 LIMIT 1
-                                 """, params=[f"{self.s3}/ohlc_seed/*.parquet"]).fetchone()[0]
+            ohlc_daily = self._scan(conn, 'ohlc_daily', date_from=date_from, date_to=date_to)
+            seed_files = self._list_files(f"{self.s3}/ohlc_seed/*.parquet")
+            ohlc_seed = conn.read_parquet(self._read_paths(seed_files))
+            seed_date = datetime.date.fromisoformat(seed_files[0].key.split('/')[-1][:10])
             use_seed = date_from is None or seed_date >= date_from
 
-            where, params = self._query_filter(
-                filter_def=self.filter_date_isin,
-                date_from=date_from,
-                date_to=date_to
-            )
-            where_clause = f"WHERE {where}" if where else ""
-
+            partition_where = hive_date_predicate(date_from, date_to)
             query_parts = [
                 f"""WITH data AS(
-                SELECT *, MAKE_DATE(year, month, day) as date FROM ohlc_daily)
-                    SELECT 
-                        date, 
-                        isin,
-                        ARG_MIN(price, datetime) as open,  
-                        ARG_MAX(price, datetime) as close, 
-                        MIN(price) as low,
-                        MAX(price) as high,
-                        SUM(volume) as volume
+                SELECT * FROM ohlc_daily
+                {'WHERE ' + partition_where if partition_where else ""})
+                    SELECT date, isin, open, close, low, high, volume
                     FROM data 
                     {where_clause}
-                    GROUP BY isin, date
                     """
             ]
 
@@ -269,60 +842,339 @@ class DuckS3:
                     {where_clause}
                     """)
 
-            query_parts.append("ORDER BY isin, date")
-
-            final_query = "\n".join(query_parts)
+            union = "\n".join(query_parts)
+            final_query = f"""SELECT {', '.join(selected)}
+                              FROM ({union})
+                              {page_where}
+                              ORDER BY isin, date
+                              {f'LIMIT {int(limit)}' if limit else ''}"""
 
             result = conn.sql(final_query, params=params)
-            return result.pl()
+            return self._materialize(conn, result, arrow)
+
+    def update_ohlc_daily_rollup(self, day: datetime.date | None = None) -> None:
+        """
+        Aggregates minutely OHLC ticks into the `ohlc_daily` rollup, one row per (isin, date).
 
-    def get_ohlc_minutely(self, isin: str = None, date_from: str | None = None, date_to: str | None = None):
+        Only the partition of the given day is rewritten, so the cost of an update doesn't grow with the history.
+
+        Args:
+            day: Day to (re)aggregate. If None, every day with ticks is rebuilt, use for initial setup.
+        """
+        partition_where = hive_date_predicate(day, day)
+        with self.get_connection(read_only=False) as conn:
+            ticks = self._scan(conn, 'ohlc', date_from=day, date_to=day)
+            daily = conn.sql(f"""
+            SELECT MAKE_DATE(year, month, day) as date,
+                   isin,
+                   ARG_MIN(price, datetime) as open,
+                   ARG_MAX(price, datetime) as close,
+                   MIN(price) as low,
+                   MAX(price) as high,
+                   SUM(volume) as volume,
+                   year, month, day
+            FROM ticks
+            {'WHERE ' + partition_where if partition_where else ""}
+            GROUP BY isin, year, month, day
+            """)
+            written = self._copy(conn, daily, f"{self.s3}/ohlc_daily", layout_of('ohlc_daily'))
+        self.register_files(written)
+
+    def ohlc_daily_rollup_exists(self) -> bool:
+        """Checks if any partition of the `ohlc_daily` rollup was written"""
+        daily, compacted = self._partition_files('ohlc_daily')
+        return bool(daily or compacted)
+
+    @profiled
+    @cached_result('ohlc')
+    def get_ohlc_minutely(self, isin: str = None, date_from: str | None = None, date_to: str | None = None,
+                          arrow: bool = False, since: str | datetime.datetime | None = None):
         """
         Retrieves raw OHLC (Open, High, Low, Close) data for a specified ISIN within a date range.
 
         This method queries parquet files stored in S3 to fetch OHLC data. It supports filtering by ISIN and date range.
-        The data is processed to include a proper date column constructed from year, month, and day fields.
 
         Args:
             isin: International Securities Identification Number to filter data. If None, no ISIN filtering is applied.
             date_from: Start date for filtering data in string format. If None, no start date filtering is applied.
             date_to: End date for filtering data in string format. If None, no end date filtering is applied.
+            arrow: If True, the result is returned as an Arrow table, see `_materialize`.
+            since: Only ticks with `datetime` at or after this timestamp (see `parse_datetime`) are returned, days
+                before it aren't read at all. Used to fetch ticks added since the newest one a client already has.
 
         Returns:
-            Query result containing OHLC data with additional date column constructed from year, month, and day fields.
+            Query result containing OHLC data with the year, month and day partition columns, `date` is the time the
+            ticks were fetched at, the day partition is its date.
         """
+        build = self._ohlc_minutely_relation(isin, date_from, date_to, since)
+        with self.get_connection() as conn:
+            return self._materialize(conn, build(conn), arrow)
+
+    @profiled
+    def iter_ohlc_minutely(self, isin: str = None, date_from: str | None = None, date_to: str | None = None,
+                           batch_size: int = STREAM_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+        """
+        Retrieves raw OHLC data in record batches of `batch_size` rows, see `get_ohlc_minutely`. Used for exports of
+        long date ranges, e.g. all ticks of a month, which are streamed in bounded memory.
+        """
+        yield from self._iter_batches(self._ohlc_minutely_relation(isin, date_from, date_to), batch_size)
+
+    def _ohlc_minutely_relation(self, isin: str | None, date_from: str | None, date_to: str | None,
+                                since: str | datetime.datetime | None = None
+                                ) -> Callable[[duckdb.DuckDBPyConnection], duckdb.DuckDBPyRelation]:
+        """Validates filters of a minutely OHLC query and returns function building the query on a connection"""
         validate_isin(isin)
         date_from = parse_date(date_from)
         date_to = parse_date(date_to)
+        since = parse_datetime(since)
+        if since is not None:
+            # day partitions are in market time, the same time zone DuckDB compares naive timestamps in
+            since_day = (since.astimezone(MARKET_TIMEZONE) if since.tzinfo else since).date()
+            date_from = max(date_from, since_day) if date_from else since_day
+
+        # the date range is applied to partition columns only, the `date` column of ticks is the time they were
+        # fetched at, not a date
+        ticks_filter = {'isin': {'column': 'isin', 'operator': '='},
+                        'since': {'column': 'datetime', 'operator': '>='}}
+        where, params = self._query_filter(filter_def=ticks_filter, isin=isin, since=since)
+        partition_where = hive_date_predicate(date_from, date_to)
+        conditions = " AND ".join(condition for condition in (partition_where, where) if condition)
+
+        def build(conn) -> duckdb.DuckDBPyRelation:
+            ticks = self._scan(conn, 'ohlc', date_from=date_from, date_to=date_to, filename=True)
+            # `date` is stored with every tick already, deriving it from the partition columns again would add
+            # a duplicate `date_1` column
+            return conn.sql(f"""SELECT *
+                                FROM ticks
+                                {'WHERE ' + conditions if conditions else ""}""", params=params)
+
+        return build
+
+    @profiled
+    @cached_result('ohlc', 'ohlc_daily', 'ohlc_seed')
+    def resample_ohlc(self, interval: str, isin: str | None = None, date_from: str | None = None,
+                      date_to: str | None = None, arrow: bool = False):
+        """
+        Aggregates OHLC data into bars of the given interval, e.g. 5 minute candles of a day or weekly candles of
+        a year, ready to be charted.
 
-        where, params = self._query_filter(filter_def=self.filter_date_isin, date_from=date_from, date_to=date_to)
-        with self.get_connection() as conn:
-            ohlc = conn.sql(
-                f"""WITH data as (SELECT *, MAKE_DATE(year, month, day) as date
-                   FROM read_parquet('{self.s3}/ohlc/**/*.parquet', hive_partitioning = True,
-                                     filename = True))
-                        SELECT * FROM data
-                       {' WHERE ' + where if where else ""}""", params=params)
-            return ohlc.pl()
-
-    def _filter_df_by_date(self, date_from: str, date_to: str, df: pl.DataFrame,
-                           col_date: str = 'date') -> pl.DataFrame:
-        """helper function to filter a dataframe by date range"""
-        date_from = parse_date(date_from)
+        Intraday bars are aggregated from minutely ticks, bars of a day and longer from daily OHLC (see
+        `aggregate_ohlc_daily`), weeks start on Monday, months on their first day. Bars at the edges of the date
+        range aggregate only data within it.
+
+        Args:
+            interval: Bar length, one of `RESAMPLE_INTERVALS`
+            isin: International Securities Identification Number to filter data. If None, all ISINs are included.
+            date_from: Start date of the bars. If None, intraday bars cover the last day with ticks, longer bars
+                the whole history.
+            date_to: End date of the bars. If None, no end date filter is applied.
+            arrow: If True, the result is returned as an Arrow table, see `_materialize`.
+
+        Returns:
+            Bars sorted by isin and date with columns date (start of the bar), isin, open, high, low, close and volume
+
+        Raises:
+            ValueError: If the interval is unknown or a filter is invalid.
+        """
+        if interval not in RESAMPLE_INTERVALS:
+            raise ValueError(f"Unknown interval '{interval}', valid intervals are {list(RESAMPLE_INTERVALS)}")
+        width = RESAMPLE_INTERVALS[interval]
+
+        if interval in DAILY_INTERVALS:
+            daily = self.aggregate_ohlc_daily(isin=isin, date_from=date_from, date_to=date_to, arrow=True)
+            with self.get_connection() as conn:
+                bars = conn.sql(f"""SELECT time_bucket(INTERVAL '{width}', date) AS date, isin,
+                                           ARG_MIN(open, daily.date) AS open, MAX(high) AS high, MIN(low) AS low,
+                                           ARG_MAX(close, daily.date) AS close, SUM(volume) AS volume
+                                    FROM daily
+                                    GROUP BY ALL
+                                    ORDER BY isin, date""")
+                return self._materialize(conn, bars, arrow)
+
+        validate_isin(isin)
+        date_from = parse_date(date_from) or self.last_ohlc_date()
         date_to = parse_date(date_to)
+        where, params = self._query_filter(filter_def={'isin': {'column': 'isin', 'operator': '='}}, isin=isin)
+        conditions = " AND ".join(condition for condition in (hive_date_predicate(date_from, date_to), where)
+                                  if condition)
+        with self.get_connection() as conn:
+            ticks = self._scan(conn, 'ohlc', date_from=date_from, date_to=date_to)
+            bars = conn.sql(f"""SELECT time_bucket(INTERVAL '{width}', datetime) AS date, isin,
+                                       ARG_MIN(price, datetime) AS open, MAX(price) AS high, MIN(price) AS low,
+                                       ARG_MAX(price, datetime) AS close, CAST(SUM(volume) AS BIGINT) AS volume
+                                FROM ticks
+                                {'WHERE ' + conditions if conditions else ""}
+                                GROUP BY ALL
+                                ORDER BY isin, date""", params=params)
+            return self._materialize(conn, bars, arrow)
+
+    @profiled
+    @cached_result('ohlc')
+    def last_ohlc_date(self, lookback_months: int = 24) -> datetime.date:
+        """
+        Returns the date of the newest OHLC partition.
+
+        The date is read from the dataset manifest or from partition paths of the most recent months only, without
+        opening any parquet file. Falls back to scanning the whole dataset when no partition was written within lookback_months.
+        """
+        today = datetime.date.today()
+        first_month = today.year * 12 + today.month - 1 - lookback_months
+        first_month = datetime.date(first_month // 12, first_month % 12 + 1, 1)
+        manifest = self.manifests.load('ohlc')
+        if manifest and manifest.entries:
+            dates = [partition_date(key) or datetime.date.fromisoformat(entry.max_date)
+                     for key, entry in manifest.entries.items() if partition_date(key) or entry.max_date]
+            if dates:
+                return max(dates)
+
+        with self.get_connection() as conn:
+            for year, month in reversed(months_between(first_month, today)):
+                files = self._list_files(f"{self.s3}/ohlc/year={year}/month={month}/*/*.parquet")
+                dates = [partition_date(file.path) for file in files]
+                dates = [date for date in dates if date]
+                if dates:
+                    return max(dates)
+
+            ticks = self._scan(conn, 'ohlc')
+            return conn.sql("SELECT MAX(MAKE_DATE(year, month, day)) FROM ticks").fetchone()[0]
+
+    def _append_by_year(self, root: str, data: pl.DataFrame, date_column: str,
+                        file_name: str | None = None) -> list[str]:
+        """
+        Appends rows to a `{root}/year=YYYY/` layout without rewriting any existing file.
+
+        Args:
+            root: Dataset location, e.g. 's3://bucket/gold_prices'
+            data: Rows to append
+            date_column: Date column the year partition is taken from, files are written with the layout of the dataset
+            file_name: Name of the file written in each year, defaults to the last date of the year
+
+        Returns:
+            list[str]: Paths of written files
+        """
+        written = []
+        for (year,), rows in data.group_by(pl.col(date_column).dt.year()):
+            name = file_name or f"{rows.get_column(date_column).max().isoformat()}.parquet"
+            written += self.write_data(rows, f"{root}/year={year}/{name}".removeprefix(self.s3))
+        return written
+
+    def _compact_years(self, root: str, legacy_path: str, date_column: str, key: list[str]) -> Compaction:
+        """
+        Merges files of closed years of a `{root}/year=YYYY/` layout into one file per year and splits the legacy
+        single-file history into years.
+
+        The merged file is registered in place of the merged files in a single manifest update before they are
+        deleted; until then rows stored twice are dropped by `_scan_years`.
+
+        Returns:
+            Compaction: Files written and still in place, i.e. yearly files and legacy splits of the current year,
+                and deleted files, including legacy splits of closed years merged by the same call
+        """
+        compaction = Compaction()
+        legacy = self._list_files(legacy_path)
+        if legacy:
+            with self.get_connection() as conn:
+                history = conn.sql(f"""SELECT * REPLACE (CAST({date_column} AS DATE) AS {date_column})
+                                       FROM read_parquet({self._sql_list(self._read_paths(legacy))})""").pl()
+            compaction.written += self._append_by_year(root, history, date_column, file_name='legacy.parquet')
+            self.register_files([], replaces=[obj.path for obj in legacy])
+            self.storage.delete([obj.path for obj in legacy])
+            compaction.deleted += [obj.path for obj in legacy]
+            logger.info(f"Split legacy {legacy_path} into {len(compaction.written)} year files")
+
+        years = {}
+        for obj in self._list_files(f"{root}/year=*/*.parquet"):
+            year = int(obj.key.split('year=')[1].split('/')[0])
+            if year < datetime.date.today().year:
+                years.setdefault(year, []).append(obj.path)
+
+        options = layout_of(self.storage.key(root)).replace(compression_level=COMPACTED_COMPRESSION_LEVEL)
+        for year, inputs in sorted(years.items()):
+            target = f"{root}/year={year}/{year}.parquet"
+            files = [path for path in inputs if path != target]
+            if not files:
+                continue
+            with self.get_connection(read_only=False) as conn:
+                # rows of the legacy history lose to copies appended since, as on read (see `_scan_years`)
+                merged = conn.sql(f"""
+                SELECT * EXCLUDE (year, filename) FROM read_parquet({self._sql_list(inputs)}, hive_partitioning = true,
+                                                                    union_by_name = true, filename = true)
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY {', '.join(key)}
+                                           ORDER BY filename LIKE '%/legacy.parquet') = 1
+                """)
+                self._copy(conn, merged, target, options)
+            self.register_files([target], replaces=files)
+            self.storage.delete(files)
+            compaction.written = [path for path in compaction.written if path not in files] + [target]
+            compaction.deleted += files
+            logger.info(f"Compacted {len(files)} files of {year} into {target}")
+        return compaction
+
+    def _scan_years(self, conn, root: str, legacy_path: str, date_from: datetime.date | None,
+                    date_to: datetime.date | None):
+        """
+        Returns relation over a `{root}/year=YYYY/` layout merged with the legacy single-file history.
+
+        Only year partitions overlapping the date range are read. The `_layout` column is 0 for appended rows
+        and 1 for legacy ones, still in the single file or split into `legacy.parquet` files by `_compact_years`,
+        so the caller can prefer the appended copy of a row stored in both.
+        """
         if date_from:
-            df = df.filter(pl.col(col_date) >= date_from)
-        if date_to:
-            df = df.filter(pl.col(col_date) <= date_to)
-        return df
+            last_year = (date_to or max(datetime.date.today(), date_from)).year
+            patterns = [f"{root}/year={year}/*.parquet" for year in range(date_from.year, last_year + 1)]
+        else:
+            patterns = [f"{root}/year=*/*.parquet"]
+        partitioned = [obj for pattern in patterns for obj in self._list_files(pattern)]
+        legacy = self._read_paths(self._list_files(legacy_path))
+        if not partitioned and not legacy and date_from:
+            # no year matches the range, a single file lets DuckDB bind the schema, the caller's filter drops its rows
+            partitioned = self._list_files(f"{root}/year=*/*.parquet")[:1]
+        partitioned = self._read_paths(partitioned)
+
+        scans = []
+        if partitioned:
+            scans.append(f"SELECT * EXCLUDE (year, filename), "
+                         f"CAST(filename LIKE '%/legacy.parquet' AS INTEGER) AS _layout "
+                         f"FROM read_parquet({self._sql_list(partitioned)}, hive_partitioning = true, "
+                         f"union_by_name = true, filename = true)")
+        if legacy or not partitioned:
+            # without any partitioned file DuckDB raises the usual "No files found" error for a missing dataset
+            scans.append(f"SELECT *, 1 AS _layout FROM read_parquet({self._sql_list(legacy or [legacy_path])})")
+        return conn.sql(" UNION ALL BY NAME ".join(scans))
+
+    def append_currencies(self, currency_type: str, data: pl.DataFrame, file_name: str | None = None) -> list[str]:
+        """
+        Appends rows of NBP currency tables to the year partitioned `currencies/{currency_type}/year=YYYY/` layout.
+
+        Existing files are never rewritten, a daily update writes one small file named by the effective date of
+        the table. Rows already stored (e.g. by a backfill) are dropped by `get_currencies` when reading.
 
+        Args:
+            currency_type: Type of currency table, e.g. 'mid_market_rate'
+            data: Rows with effective_date and code columns
+            file_name: Name of the file written in each year, defaults to the last effective date of the year
+
+        Returns:
+            list[str]: Paths of written files
+        """
+        return self._append_by_year(f"{self.s3}/currencies/{currency_type}", data, 'effective_date', file_name)
+
+    def compact_currencies(self, currency_type: str) -> Compaction:
+        """Merges daily currency tables of closed years into yearly files and splits the legacy single file"""
+        root = f"{self.s3}/currencies/{currency_type}"
+        return self._compact_years(root, f"{root}.parquet", 'effective_date', ['code', 'effective_date'])
+
+    @profiled
+    @cached_result('currencies')
     def get_currencies(self, currency_type: str, date_from: str | None = None, date_to: str | None = None,
-                       currency_code: str = None, columns: list[str] = None) -> pl.DataFrame:
+                       currency_code: str = None, columns: list[str] = None,
+                       arrow: bool = False) -> pl.DataFrame | pa.Table:
         """
         Retrieves currency data from parquet files with optional filtering by date range and currency code.
 
-        This method reads currency data from parquet files based on the specified currency type and applies
-        filtering operations to narrow down the results according to the provided parameters.
+        Year partitions overlapping the date range are merged on read with the legacy single-file history, if it
+        still exists; rows stored more than once are returned once per (code, effective_date), preferring the
+        partitioned copy.
 
         Args:
             currency_type: Type of currency data to retrieve (e.g., 'exchange_rates', 'currency_codes')
@@ -330,43 +1182,113 @@ class DuckS3:
             date_to: End date for filtering records (inclusive), format 'YYYY-MM-DD'
             currency_code: Specific currency code to filter results by (e.g., 'USD', 'EUR')
             columns: List of column names to include in the result DataFrame, None means all columns
+            arrow: If True, the result is returned as an Arrow table, see `_materialize`
 
         Returns:
             pl.DataFrame: DataFrame containing filtered currency data with specified columns
         """
-        df = self.read_file(f"currencies/{currency_type}.parquet", columns=columns)
-        df = self._filter_df_by_date(date_from, date_to, df, 'effective_date')
+        date_from = parse_date(date_from)
+        date_to = parse_date(date_to)
+        currency_filter = {
+            'date_from': {'column': 'effective_date', 'operator': '>='},
+            'date_to': {'column': 'effective_date', 'operator': '<='},
+            'currency_code': {'column': 'code', 'operator': '='}
+        }
+        where, params = self._query_filter(filter_def=currency_filter, date_from=date_from, date_to=date_to,
+                                           currency_code=currency_code)
+        root = f"{self.s3}/currencies/{currency_type}"
+        with self.get_connection() as conn:
+            currencies = self._scan_years(conn, root, f"{root}.parquet", date_from, date_to)
+            available = [column for column in currencies.columns if column != '_layout']
+            # filters and projection are pushed into the parquet scans, files are sorted by effective_date, so
+            # row groups outside of the date range are skipped using their min/max statistics
+            return self._materialize(conn, conn.sql(f"""SELECT {self._select_list(available, columns or available)}
+                                FROM currencies
+                                {'WHERE ' + where if where else ""}
+                                QUALIFY ROW_NUMBER() OVER (PARTITION BY code, effective_date ORDER BY _layout) = 1
+                                ORDER BY effective_date, code""", params=params), arrow)
+
+    def append_gold_prices(self, prices: pl.DataFrame) -> list[str]:
+        """
+        Appends gold prices to the year partitioned `gold_prices/year=YYYY/` layout, one small file per day.
 
-        if currency_code:
-            df = df.filter(pl.col('code') == currency_code)
+        Args:
+            prices: Rows with date (DATE) and price columns
 
-        return df
+        Returns:
+            list[str]: Paths of written files
+        """
+        return self._append_by_year(f"{self.s3}/gold_prices", prices, 'date')
+
+    def gold_prices_exist(self) -> bool:
+        """Checks if any gold price was stored, answered from the dataset manifest without reading data"""
+        return bool(self._list_files(f"{self.s3}/gold_prices/**/*.parquet"))
 
-    def get_gold_prices(self, date_from: str | None = None, date_to: str | None = None) -> pl.DataFrame:
+    def compact_gold_prices(self) -> Compaction:
+        """Merges daily gold prices of closed years into yearly files and splits the legacy single file"""
+        root = f"{self.s3}/gold_prices"
+        return self._compact_years(root, f"{root}/gold_prices.parquet", 'date', ['date'])
+
+    @profiled
+    @cached_result('gold_prices')
+    def get_gold_prices(self, date_from: str | None = None, date_to: str | None = None,
+                        arrow: bool = False) -> pl.DataFrame | pa.Table:
         """
-        Retrieves gold prices data from a parquet file and optionally filters it by date range.
+        Retrieves gold prices data from parquet files and optionally filters it by date range.
 
-        This method reads gold prices data from a parquet file, converts the date column to proper date type,
-        and applies date filtering if specified. The method handles both individual date filtering and
-        combined date range filtering.
+        Only year partitions overlapping the date range are listed and the range is pushed into the parquet scan.
+        The legacy single-file history is merged on read while it exists.
 
         Args:
             date_from: Start date for filtering records. If None, no start date filtering is applied.
             date_to: End date for filtering records. If None, no end date filtering is applied.
+            arrow: If True, the result is returned as an Arrow table, see `_materialize`.
 
         Returns:
             pl.DataFrame: DataFrame containing gold prices data with date column cast to Date type.
                 If date filtering is applied, returns filtered DataFrame based on the specified date range.
         """
-        df = self.read_file("gold_prices/gold_prices.parquet")
-        df = df.with_columns(pl.col('date').cast(pl.Date))
-        if date_from or date_to:
-            df = self._filter_df_by_date(date_from, date_to, df)
-        return df
-
+        date_from = parse_date(date_from)
+        date_to = parse_date(date_to)
+        where, params = self._query_filter(filter_def=self.filter_date_isin, date_from=date_from, date_to=date_to)
+        root = f"{self.s3}/gold_prices"
+        with self.get_connection() as conn:
+            gold_files = self._scan_years(conn, root, f"{root}/gold_prices.parquet", date_from, date_to)
+            # legacy file holds dates as strings, for DATE columns the cast is a no-op and the filter still reaches
+            # the parquet scan
+            return self._materialize(conn, conn.sql(f"""WITH gold AS (SELECT CAST(date AS DATE) AS date, price, _layout
+                                                              FROM gold_files)
+                                SELECT date, price FROM gold
+                                {'WHERE ' + where if where else ""}
+                                QUALIFY ROW_NUMBER() OVER (PARTITION BY date ORDER BY _layout) = 1
+                                ORDER BY date""", params=params), arrow)
+
+    @staticmethod
+    def _materialize(conn, relation: duckdb.DuckDBPyRelation, arrow: bool = False) -> pl.DataFrame | pa.Table:
+        """
+        Fetches the query result as a polars DataFrame or, for callers passing it on (e.g. as an Arrow IPC stream),
+        as an Arrow table built by DuckDB directly, without an intermediate polars copy
+        """
+        with fetching(conn):
+            return relation.to_arrow_table() if arrow else relation.pl()
+
+    @staticmethod
+    def _select_list(available: list[str], columns: list[str] | None) -> str:
+        """Builds projection of the query, columns are checked against the schema as they can't be parametrized"""
+        if not columns:
+            return '*'
+        unknown = [column for column in columns if column not in available]
+        if unknown:
+            raise ValueError(f"Unknown columns {unknown}. Valid columns are {available}")
+        return ', '.join(f'"{column}"' for column in columns)
+
+    @profiled
+    @cached_result('latest', 'llm_summaries')
     def get_llm_summary(self, date_from: str | None = None, date_to: str | None = None):
         """Retrieves last LLM summary for data"""
         with self.get_connection() as conn:
-            return (conn.read_parquet(f"{self.s3}/llm_summaries/**/*.parquet")
+            files = self._latest_paths('llm_summaries', f"{self.s3}/llm_summaries/**/*.parquet")
+            return (conn.read_parquet(files, hive_partitioning=False)
+                    .select('date', 'summary')
                     .order('date DESC')
                     .fetchone())
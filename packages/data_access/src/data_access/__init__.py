@@ -1,2 +1,10 @@
-from .S3 import DuckS3
-from .validators import validate_isin, parse_date
\ No newline at end of file
+from .S3 import DuckS3, MARKET_TIMEZONE, OHLC_DAILY_COLUMNS, RESAMPLE_INTERVALS
+from .async_client import AsyncDuckS3
+from .pool import ConnectionPool, QueryCancelled, get_pool
+from .result_cache import ResultCache, get_result_cache
+from .validators import validate_isin, parse_date, parse_datetime
+from .storage import Storage, S3Storage, LocalStorage, get_storage
+from .write_options import WriteOptions, DATASET_LAYOUTS, layout_of
+from .partitions import Compaction
+from .metrics import MetricsRegistry, get_metrics
+from .profiling import QueryProfile, recent_profiles
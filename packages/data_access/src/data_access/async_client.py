@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from data_access.S3 import DuckS3
+from data_access.pool import CancelScope, cancel_scope
+
+
+class AsyncDuckS3:
+    """
+    Asyncio facade over DuckS3 for async web handlers.
+
+    Every public DuckS3 method is available as a coroutine, e.g. `await ducks3.get_news(date_from=...)`, generator
+    methods (`iter_*`) as async iterators, e.g. `async for batch in ducks3.iter_news(...)`. Calls run
+    on a dedicated thread pool, DuckDB releases the GIL while executing, so concurrent requests are served in
+    parallel while the event loop stays responsive. At most `max_concurrency` calls run at once (by default the
+    size of the connection pool, so a call never waits for a connection while holding a worker thread), others
+    wait without blocking the loop. Cancelling the awaiting task, e.g. when the client disconnected, interrupts
+    the DuckDB query running on its behalf.
+    """
+
+    def __init__(self, ducks3: DuckS3 | None = None, max_concurrency: int | None = None):
+        self.ducks3 = ducks3 or DuckS3()
+        self.max_concurrency = max_concurrency or self.ducks3.pool.size
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='ducks3')
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    @staticmethod
+    def _call(scope: CancelScope, func: Callable, args: tuple, kwargs: dict) -> Any:
+        with cancel_scope(scope):
+            return func(*args, **kwargs)
+
+    async def _run_in_scope(self, scope: CancelScope, func: Callable, *args, **kwargs) -> Any:
+        future = asyncio.wrap_future(self._executor.submit(self._call, scope, func, args, kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            scope.cancel()
+            # the slot is released only after the worker finished, so cancelled queries can't exceed the limit
+            await asyncio.wait([future])
+            if not future.cancelled():
+                future.exception()
+            raise
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Runs blocking function on the query executor, the running query is interrupted if the caller is cancelled"""
+        async with self._semaphore:
+            return await self._run_in_scope(CancelScope(), func, *args, **kwargs)
+
+    async def stream(self, func: Callable[..., Iterator], *args, **kwargs) -> AsyncIterator:
+        """
+        Iterates blocking generator on the query executor, every item is pulled by a worker thread.
+
+        The concurrency slot is held until the iteration ends, as the generator keeps its pooled connection checked
+        out. Cancelling the consumer interrupts the query and closes the generator, returning the connection.
+        """
+        scope = CancelScope()
+        done = object()
+        async with self._semaphore:
+            items = await self._run_in_scope(scope, func, *args, **kwargs)
+            try:
+                while (item := await self._run_in_scope(scope, next, items, done)) is not done:
+                    yield item
+            finally:
+                await asyncio.shield(asyncio.wrap_future(self._executor.submit(items.close)))
+
+    def __getattr__(self, name: str) -> Callable:
+        attribute = getattr(self.ducks3, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        if inspect.isgeneratorfunction(attribute):
+            @functools.wraps(attribute)
+            def iterate(*args, **kwargs) -> AsyncIterator:
+                return self.stream(attribute, *args, **kwargs)
+
+            return iterate
+
+        @functools.wraps(attribute)
+        async def method(*args, **kwargs):
+            return await self.run(attribute, *args, **kwargs)
+
+        return method
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
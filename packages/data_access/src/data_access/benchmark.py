@@ -0,0 +1,270 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+import duckdb
+
+from data_access.S3 import DuckS3
+from data_access.pool import ConnectionPool
+from data_access.profiling import QueryProfile, recent_profiles
+from data_access.synthetic import SyntheticConfig, generate
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).resolve().parents[2] / 'benchmarks' / 'baseline.json'
+# generated datasets end on a fixed day, so every run reads exactly the same data
+END_DATE = datetime.date(2025, 6, 30)
+SIZES = {
+    'small': SyntheticConfig(years=0.25, isins=5, seed_years=1, news_per_day=10, end_date=END_DATE),
+    'medium': SyntheticConfig(years=1, isins=20, seed_years=2, news_per_day=40, end_date=END_DATE),
+    'large': SyntheticConfig(years=2, isins=100, seed_years=3, news_per_day=80, end_date=END_DATE),
+}
+# allowed relative and absolute growth of a metric over its baseline before it's reported as a regression, timings
+# and memory are noisy (most of all for queries taking a few milliseconds), the amount of data read isn't
+TOLERANCES = {'seconds': (0.5, 0.01), 'cold_seconds': (0.75, 0.02), 'peak_rss_bytes': (0.3, 8 * 1024 ** 2),
+              'bytes_read': (0.05, 0), 'files_opened': (0, 0)}
+
+
+@dataclass(frozen=True)
+class Case:
+    """
+    One measured call, `arguments` are computed from the last day of the dataset.
+    """
+    name: str
+    method: str
+    arguments: Callable[[datetime.date], dict]
+
+
+def _days_before(end: datetime.date, days: int) -> str:
+    return (end - datetime.timedelta(days=days)).isoformat()
+
+
+CASES = [
+    Case('news_last_week', 'get_news', lambda end: {'date_from': _days_before(end, 7), 'date_to': end.isoformat()}),
+    Case('news_of_company_year', 'get_news',
+         lambda end: {'isin': 'PLSYN0000001', 'only_isin': True, 'date_from': _days_before(end, 365)}),
+    Case('ohlc_daily_all', 'aggregate_ohlc_daily', lambda end: {}),
+    Case('ohlc_daily_last_month', 'aggregate_ohlc_daily', lambda end: {'date_from': _days_before(end, 30)}),
+    Case('ohlc_minutely_day', 'get_ohlc_minutely', lambda end: {'date_from': end.isoformat()}),
+    Case('ohlc_minutely_month', 'get_ohlc_minutely', lambda end: {'date_from': _days_before(end, 30)}),
+    Case('currencies_year', 'get_currencies',
+         lambda end: {'currency_type': 'mid_market_rate', 'date_from': _days_before(end, 365)}),
+    Case('gold_prices_all', 'get_gold_prices', lambda end: {}),
+    Case('companies_metadata', 'get_companies_metadata', lambda end: {}),
+]
+
+
+@dataclass
+class CaseResult:
+    """
+    Measurements of one case.
+
+    Attributes:
+        rows: Number of returned rows, a changed count means the benchmark isn't comparable to its baseline
+        seconds: Median wall time of the warm runs
+        cold_seconds: Wall time of the first run on fresh DuckDB connections
+        peak_rss_bytes: Growth of the resident memory of the process over its level before the cold run
+        bytes_read: Bytes DuckDB read from files during the cold run
+        files_opened: Distinct files DuckDB opened during the cold run
+    """
+    rows: int
+    seconds: float
+    cold_seconds: float
+    peak_rss_bytes: int
+    bytes_read: int
+    files_opened: int
+
+
+class _RssSampler:
+    """Samples resident memory of the process on a background thread, tracks the peak since start"""
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.peak = self.baseline = self.rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    @staticmethod
+    def rss() -> int:
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            # without procfs only the lifetime peak is known (kilobytes on Linux, bytes on macOS)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if platform.system() == 'Darwin' else peak * 1024
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def __enter__(self) -> '_RssSampler':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+    @property
+    def growth(self) -> int:
+        return self.peak - self.baseline
+
+
+def _fresh_client(bucket: str) -> DuckS3:
+    """Client with its own single connection pool, so a cold run doesn't benefit from DuckDB's metadata and file
+    caches warmed by other cases, and without result cache, so every run executes the query"""
+    ducks3 = DuckS3(bucket=bucket, pool=ConnectionPool(size=1))
+    ducks3.result_cache = None
+    return ducks3
+
+
+def _measure_reads(bucket: str, case: Case, arguments: dict) -> QueryProfile:
+    """Runs the case cold once more with DuckDB's file and HTTP logging, so reads of every query are counted"""
+    level = os.environ.get('QUERY_PROFILING')
+    os.environ['QUERY_PROFILING'] = 'io'
+    try:
+        getattr(_fresh_client(bucket), case.method)(**arguments)
+    finally:
+        if level is None:
+            del os.environ['QUERY_PROFILING']
+        else:
+            os.environ['QUERY_PROFILING'] = level
+    return recent_profiles(1)[0]
+
+
+def run_case(bucket: str, case: Case, end_date: datetime.date, repeat: int = 5) -> CaseResult:
+    """
+    Measures one case, timings are taken with the configured query profiling (on by default, as in production),
+    reads in a separate run (see `_measure_reads`), as file logging slows queries down.
+    """
+    method = getattr(_fresh_client(bucket), case.method)
+    arguments = case.arguments(end_date)
+
+    with _RssSampler() as memory:
+        start = time.perf_counter()
+        rows = method(**arguments).height
+        cold_seconds = time.perf_counter() - start
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        method(**arguments)
+        timings.append(time.perf_counter() - start)
+    reads = _measure_reads(bucket, case, arguments)
+    return CaseResult(rows=rows, seconds=statistics.median(timings), cold_seconds=cold_seconds,
+                      peak_rss_bytes=memory.growth, bytes_read=reads.bytes_read, files_opened=reads.files_opened)
+
+
+def prepare_dataset(size: str, config: SyntheticConfig) -> DuckS3:
+    """Generates the dataset of a size into its own bucket, a bucket generated by an earlier run is reused"""
+    ducks3 = DuckS3(bucket=f"benchmark-{size}-{config.seed}")
+    marker = f"_benchmark/{size}.json"
+    fingerprint = json.dumps(asdict(config), default=str, sort_keys=True).encode()
+    stored, _ = ducks3.storage.get_bytes(marker)
+    if stored != fingerprint:
+        logger.info(f"Generating {size} dataset")
+        generate(ducks3, config)
+        ducks3.storage.put_bytes(marker, fingerprint)
+    return ducks3
+
+
+def run_benchmark(sizes: dict[str, SyntheticConfig], cases: list[Case] = CASES,
+                  repeat: int = 5) -> dict[str, dict[str, dict]]:
+    """
+    Runs every case against the dataset of every size.
+
+    Returns:
+        dict[str, dict[str, dict]]: Measurements (see `CaseResult`) by size and case name
+    """
+    results = {}
+    for size, config in sizes.items():
+        ducks3 = prepare_dataset(size, config)
+        results[size] = {}
+        for case in cases:
+            results[size][case.name] = asdict(run_case(ducks3.bucket, case, config.end_date, repeat))
+            logger.info(f"{size} {case.name}: {results[size][case.name]}")
+    return results
+
+
+def find_regressions(results: dict, baseline: dict,
+                     tolerances: dict[str, tuple[float, float]] = TOLERANCES) -> list[str]:
+    """
+    Compares results with a baseline, both by size and case as returned by `run_benchmark`.
+
+    Returns:
+        list[str]: Description of every metric grown over its baseline by more than its tolerance, and of every case
+            returning a different number of rows than in the baseline
+    """
+    regressions = []
+    for size, cases in results.items():
+        for case, metrics in cases.items():
+            expected = baseline.get(size, {}).get(case)
+            if expected is None:
+                continue
+            if metrics['rows'] != expected['rows']:
+                regressions.append(f"{size}/{case}: returned {metrics['rows']} rows, baseline {expected['rows']}")
+            for metric, (relative, absolute) in tolerances.items():
+                if metrics[metric] > expected[metric] * (1 + relative) + absolute:
+                    regressions.append(f"{size}/{case}: {metric} {metrics[metric]:.6g} > baseline "
+                                       f"{expected[metric]:.6g} (+{relative:.0%} allowed)")
+    return regressions
+
+
+def main() -> None:
+    """
+    Benchmarks DuckS3 reads on synthetic datasets and compares them with the stored baseline, e.g.
+
+        python -m data_access.benchmark --sizes small medium --update-baseline
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'])
+    parser.add_argument('--cases', nargs='+', choices=[case.name for case in CASES], default=None)
+    parser.add_argument('--repeat', type=int, default=5, help="Warm runs per case")
+    parser.add_argument('--data-dir', default='.benchmark_data', help="Directory of generated datasets")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--output', type=Path, default=None, help="Also write results to this file")
+    parser.add_argument('--update-baseline', action='store_true', help="Store results as the new baseline")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # datasets are generated into local buckets, so results don't depend on the network
+    os.environ['STORAGE_BACKEND'] = 'local'
+    os.environ['LOCAL_STORAGE_ROOT'] = args.data_dir
+    cases = [case for case in CASES if args.cases is None or case.name in args.cases]
+    results = run_benchmark({size: SIZES[size] for size in args.sizes}, cases, args.repeat)
+
+    report = {'environment': {'python': platform.python_version(), 'duckdb': duckdb.__version__,
+                              'machine': platform.machine(), 'cpus': os.cpu_count()},
+              'results': results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    regressions = find_regressions(results, baseline['results']) if baseline else []
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if args.update_baseline:
+        # sizes and cases not measured by this run keep their baseline
+        merged = baseline['results'] if baseline else {}
+        for size, measured in results.items():
+            merged.setdefault(size, {}).update(measured)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({**report, 'results': merged}, indent=2) + '\n')
+    elif regressions:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
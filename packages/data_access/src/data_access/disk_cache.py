@@ -0,0 +1,177 @@
+import contextvars
+import datetime
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from data_access.partitions import partition_date
+
+logger = logging.getLogger(__name__)
+
+# files returned by `DiskCache.get` within the innermost `DiskCache.pinned` context of the current task
+_pinned_paths: contextvars.ContextVar[list[str] | None] = contextvars.ContextVar('pinned_paths', default=None)
+
+
+class DiskCache:
+    """
+    Read-through cache of immutable S3 objects on local disk.
+
+    Entries are keyed by object key plus ETag, so a rewritten object is never served from a stale copy. Total size
+    is capped, least recently used files are evicted first. Only objects marked as immutable are cached: files under
+    prefixes passed to `mark_immutable` and day partitions (year=/month=/day=) of past days, which are never
+    rewritten once the day is over.
+
+    Files returned within a `pinned` context aren't evicted until the context exits, so a query reading more data
+    than the budget, or queries running concurrently, never lose files they were given. The budget is exceeded
+    until the pinned files are released.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, immutable_prefixes: list[str] | None = None):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.immutable_prefixes = list(immutable_prefixes or [])
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._pins: dict[str, int] = {}
+        self._size = 0
+        self._load_entries()
+
+    def _load_entries(self) -> None:
+        """Registers files left by previous processes, least recently used first"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                files.append((stat.st_atime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._size += size
+        self._evict()
+
+    def mark_immutable(self, prefix: str) -> None:
+        """Marks every object under the key prefix as immutable, so it can be cached"""
+        if prefix not in self.immutable_prefixes:
+            self.immutable_prefixes.append(prefix)
+
+    def is_immutable(self, key: str) -> bool:
+        """Checks if the object never changes once written"""
+        if any(key.startswith(prefix) for prefix in self.immutable_prefixes):
+            return True
+        date = partition_date(key)
+        return date is not None and date < datetime.date.today()
+
+    def local_path(self, key: str, etag: str) -> str:
+        # object key is kept as relative path, so hive partitions can still be parsed from the local path
+        return os.path.join(self.directory, etag, key)
+
+    def get(self, key: str, etag: str, fetch: Callable[[str, str], None]) -> str:
+        """
+        Returns local path of the object, downloading it on a miss.
+
+        Args:
+            key: Object key in the bucket
+            etag: ETag of the current version of the object
+            fetch: Function downloading the object key to the given local path
+        """
+        path = self.local_path(key, etag)
+        with self._lock:
+            if path in self._entries and os.path.exists(path):
+                self._entries.move_to_end(path)
+                self._pin(path)
+                return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            fetch(key, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._size += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            self._pin(path)
+            self._evict()
+        return path
+
+    @contextmanager
+    def pinned(self) -> Iterator[None]:
+        """
+        Keeps files returned by `get` within the context on disk until it exits, e.g. while a query reads them.
+
+        The context is tracked per thread or asyncio task, threads started within it have to run in its copy
+        (`contextvars.copy_context`) for their files to be pinned.
+        """
+        paths = []
+        token = _pinned_paths.set(paths)
+        try:
+            yield
+        finally:
+            _pinned_paths.reset(token)
+            with self._lock:
+                for path in paths:
+                    if self._pins[path] == 1:
+                        del self._pins[path]
+                    else:
+                        self._pins[path] -= 1
+                self._evict()
+
+    def _pin(self, path: str) -> None:
+        paths = _pinned_paths.get()
+        if paths is not None:
+            paths.append(path)
+            self._pins[path] = self._pins.get(path, 0) + 1
+
+    def _evict(self) -> None:
+        """Removes least recently used files until the cache fits the budget, files in use are skipped"""
+        for path in list(self._entries):
+            if self._size <= self.max_bytes or len(self._entries) <= 1:
+                break
+            if path in self._pins:
+                continue
+            self._size -= self._entries.pop(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evicted {path} from disk cache")
+
+    def clear(self) -> None:
+        """Removes all files, including pinned ones"""
+        with self._lock:
+            while self._entries:
+                path, _ = self._entries.popitem()
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+
+_disk_cache: DiskCache | None = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache() -> DiskCache | None:
+    """Returns process-wide disk cache configured by S3_CACHE_DIR, None if caching is disabled"""
+    global _disk_cache
+    directory = os.getenv('S3_CACHE_DIR')
+    if not directory:
+        return None
+    with _disk_cache_lock:
+        if _disk_cache is None:
+            _disk_cache = DiskCache(directory,
+                                    max_bytes=int(os.getenv('S3_CACHE_MAX_BYTES', 2 * 1024 ** 3)),
+                                    immutable_prefixes=['ohlc_seed/', 'compacted/'])
+        return _disk_cache
@@ -0,0 +1,154 @@
+import datetime
+import json
+import logging
+import threading
+from dataclasses import dataclass, asdict, field
+from functools import cached_property
+from typing import Callable
+
+from data_access.storage import Storage, ObjectInfo, PreconditionFailed, glob_to_regex
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PREFIX = '_manifests'
+
+# column holding the date of a row, its min/max statistics are recorded per file
+DATE_COLUMNS = {
+    'news': 'date',
+    'news_isin_index': 'date',
+    'ohlc': 'datetime',
+    'ohlc_daily': 'date',
+    'ohlc_seed': 'datetime',
+    'companies_metadata': 'date',
+    'llm_summaries': 'date',
+    'currencies': 'effective_date',
+    'gold_prices': 'date',
+    'latest': 'date',
+}
+
+
+def dataset_of(key: str) -> str:
+    """Returns dataset the object belongs to, compacted files belong to the dataset they were merged from"""
+    parts = key.lstrip('/').split('/')
+    if parts[0] == 'compacted' and len(parts) > 1:
+        return parts[1]
+    return parts[0]
+
+
+@dataclass
+class ManifestEntry:
+    key: str
+    size: int
+    etag: str
+    last_modified: str
+    rows: int | None = None
+    min_date: str | None = None
+    max_date: str | None = None
+
+
+@dataclass
+class Manifest:
+    """List of files of a dataset with their row counts and min/max dates, readers use it instead of listing S3"""
+    dataset: str
+    entries: dict[str, ManifestEntry] = field(default_factory=dict)
+    version: int = 0
+    etag: str | None = None
+
+    def to_json(self) -> bytes:
+        return json.dumps({'dataset': self.dataset, 'version': self.version,
+                           'entries': [asdict(entry) for entry in self.entries.values()]}).encode()
+
+    @classmethod
+    def from_json(cls, data: bytes, etag: str | None = None) -> 'Manifest':
+        raw = json.loads(data)
+        entries = {entry['key']: ManifestEntry(**entry) for entry in raw['entries']}
+        return cls(dataset=raw['dataset'], entries=entries, version=raw['version'], etag=etag)
+
+    def glob(self, pattern_key: str, uri: str) -> list[ObjectInfo]:
+        """Returns objects matching the glob pattern (relative to the bucket), sorted by key"""
+        regex = glob_to_regex(pattern_key)
+        return [ObjectInfo(key=entry.key, path=f"{uri}/{entry.key}", size=entry.size, etag=entry.etag,
+                           last_modified=datetime.datetime.fromisoformat(entry.last_modified))
+                for key, entry in sorted(self.entries.items()) if regex.match(key)]
+
+    @cached_property
+    def last_modified(self) -> datetime.datetime | None:
+        """Time the newest file of the dataset was written, None if it has no files"""
+        return max((datetime.datetime.fromisoformat(entry.last_modified) for entry in self.entries.values()),
+                   default=None)
+
+
+class ManifestStore:
+    """
+    Loads and updates dataset manifests kept in `_manifests/{dataset}.json`.
+
+    Updates use optimistic concurrency: the manifest is written only if its ETag didn't change since it was read,
+    otherwise the update is retried on a fresh copy, so concurrent writers (e.g. news sources materialized in
+    parallel) never lose each other's files.
+    """
+
+    def __init__(self, storage: Storage, max_retries: int = 10):
+        self.storage = storage
+        self.max_retries = max_retries
+        self._cache: dict[str, Manifest] = {}
+
+    @staticmethod
+    def key(dataset: str) -> str:
+        return f"{MANIFEST_PREFIX}/{dataset}.json"
+
+    def load(self, dataset: str) -> Manifest | None:
+        """Returns the current manifest of the dataset, None if it wasn't created yet"""
+        cached = self._cache.get(dataset)
+        data, etag = self.storage.get_bytes(self.key(dataset), if_none_match=cached.etag if cached else None)
+        if data is None and etag is None:
+            self._cache.pop(dataset, None)
+            return None
+        if data is None:
+            # not modified since the last read
+            return cached
+        manifest = Manifest.from_json(data, etag)
+        self._cache[dataset] = manifest
+        return manifest
+
+    def update(self, dataset: str, change: Callable[[Manifest], None],
+               bootstrap: Callable[[], Manifest]) -> Manifest:
+        """
+        Applies change to the manifest and writes it back with compare-and-swap.
+
+        Args:
+            dataset: Dataset name
+            change: Function modifying the manifest in place
+            bootstrap: Function building the manifest from a listing, called when it doesn't exist yet, so files
+                written before the manifest was introduced stay visible to readers
+        """
+        for attempt in range(1, self.max_retries + 1):
+            manifest = self.load(dataset)
+            is_new = manifest is None
+            if is_new:
+                manifest = bootstrap()
+            else:
+                manifest = Manifest.from_json(manifest.to_json(), manifest.etag)
+            change(manifest)
+            manifest.version += 1
+            try:
+                manifest.etag = self.storage.put_bytes(self.key(dataset), manifest.to_json(),
+                                                       if_match=None if is_new else manifest.etag,
+                                                       if_none_match=is_new)
+            except PreconditionFailed:
+                logger.info(f"Manifest of {dataset} changed concurrently, retrying ({attempt}/{self.max_retries})")
+                continue
+            self._cache[dataset] = manifest
+            return manifest
+        raise RuntimeError(f"Could not update manifest of {dataset} after {self.max_retries} attempts")
+
+
+_stores: dict[str, ManifestStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_manifest_store(storage: Storage) -> ManifestStore:
+    """Returns process-wide manifest store of the bucket, so loaded manifests are shared between DuckS3 instances"""
+    with _stores_lock:
+        if storage.uri not in _stores:
+            _stores[storage.uri] = ManifestStore(storage)
+        return _stores[storage.uri]
@@ -0,0 +1,126 @@
+import threading
+from dataclasses import dataclass, field
+
+# upper bounds of histogram buckets in seconds, from a cached lookup to a scan of the whole history
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+@dataclass
+class _Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self):
+        self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters, gauges and histograms, rendered in the Prometheus text format.
+
+    Metrics are created on first use, the kind and help text of a metric come from `describe`. Every series is
+    identified by the metric name and its labels, e.g. `inc('ducks3_queries_total', method='get_news')`.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._descriptions: dict[str, tuple[str, str]] = {}
+        self._values: dict[str, dict[tuple, float | _Histogram]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """Declares kind ('counter', 'gauge' or 'histogram') and help text of a metric"""
+        with self._lock:
+            self._descriptions[name] = (kind, help_text)
+
+    @staticmethod
+    def _key(labels: dict) -> tuple:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increases a counter"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Sets a gauge"""
+        with self._lock:
+            self._values.setdefault(name, {})[self._key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Records a value of a histogram"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            if key not in series:
+                series[key] = _Histogram(self.buckets)
+            series[key].observe(value)
+
+    def value(self, name: str, **labels) -> float | None:
+        """Returns value of a counter or gauge (count of a histogram), None if the series wasn't recorded"""
+        with self._lock:
+            value = self._values.get(name, {}).get(self._key(labels))
+        return value.count if isinstance(value, _Histogram) else value
+
+    def render(self) -> str:
+        """Renders all series in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._values.items()):
+                kind, help_text = self._descriptions.get(name, ('untyped', ''))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(series.items()):
+                    labels = dict(key)
+                    if not isinstance(value, _Histogram):
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                        continue
+                    for bound, count in zip(value.buckets, value.counts):
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': f'{bound:g}'})} {count}")
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {value.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(value.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+_metrics: MetricsRegistry | None = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Returns process-wide metrics registry, shared by DuckS3 query profiles and the API"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
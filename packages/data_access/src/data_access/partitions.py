@@ -0,0 +1,143 @@
+import datetime
+import re
+from dataclasses import dataclass, field
+
+_HIVE_DATE = re.compile(r'year=(\d{4})/month=(\d{1,2})/day=(\d{1,2})/')
+_COMPACTED_PERIOD = re.compile(r'/(\d{4})(?:-(\d{2}))?/[^/]+$')
+
+
+@dataclass
+class Compaction:
+    """Files a compaction run left in the dataset and files it deleted, including ones it wrote and merged again"""
+    written: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+
+
+def months_between(date_from: datetime.date, date_to: datetime.date) -> list[tuple[int, int]]:
+    """Returns (year, month) pairs of every month touched by the date range, both ends inclusive"""
+    months = []
+    year, month = date_from.year, date_from.month
+    while (year, month) <= (date_to.year, date_to.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def partition_globs(root: str, date_from: datetime.date | None, date_to: datetime.date | None,
+                    file_pattern: str = '*.parquet', max_months: int = 12) -> list[str]:
+    """
+    Translates a date range into glob patterns covering only the matching year=/month=/day= partitions.
+
+    Object stores list everything under the fixed prefix of a glob, so `ohlc/**/*.parquet` lists the whole history
+    even when one day is requested. Narrowing the prefix to the touched months (or years for long ranges) keeps the
+    cost of listing proportional to the requested range instead of the size of the bucket.
+
+    Args:
+        root: Dataset location, e.g. 's3://bucket/ohlc'
+        date_from: First day of the range. If None, the whole dataset is globbed
+        date_to: Last day of the range. If None, today is used as partitions are never written ahead of time
+        file_pattern: Pattern of file names inside the day partition
+        max_months: Above this number of months, one glob per year is generated instead of one per month
+
+    Returns:
+        List of glob patterns, one per month or year
+    """
+    if date_from is None:
+        return [f"{root}/**/{file_pattern}"]
+
+    date_to = date_to or max(datetime.date.today(), date_from)
+    months = months_between(date_from, date_to)
+    if len(months) <= max_months:
+        return [f"{root}/year={year}/month={month}/*/{file_pattern}" for year, month in months]
+    return [f"{root}/year={year}/*/*/{file_pattern}" for year in range(date_from.year, date_to.year + 1)]
+
+
+def partition_date(path: str) -> datetime.date | None:
+    """Extracts the date of a year=/month=/day= hive partition from a file path"""
+    match = _HIVE_DATE.search(path)
+    if not match:
+        return None
+    year, month, day = map(int, match.groups())
+    return datetime.date(year, month, day)
+
+
+def in_date_range(path: str, date_from: datetime.date | None, date_to: datetime.date | None) -> bool:
+    """Checks if the hive partition of the file falls into the date range, paths without a partition always match"""
+    date = partition_date(path)
+    if date is None:
+        return True
+    return (date_from is None or date >= date_from) and (date_to is None or date <= date_to)
+
+
+def hive_date_predicate(date_from: datetime.date | None, date_to: datetime.date | None) -> str:
+    """
+    Builds SQL predicate on year/month/day hive columns for the date range.
+
+    Unlike a filter on MAKE_DATE(year, month, day) compared with a prepared parameter, the predicate references only
+    partition columns and literals, so DuckDB can evaluate it against file paths and skip partitions before opening them.
+    """
+    key = "(year * 10000 + month * 100 + day)"
+    conditions = []
+    if date_from:
+        conditions.append(f"{key} >= {date_from.year * 10000 + date_from.month * 100 + date_from.day}")
+    if date_to:
+        conditions.append(f"{key} <= {date_to.year * 10000 + date_to.month * 100 + date_to.day}")
+    return " AND ".join(conditions)
+
+
+def compacted_path(root: str, year: int, month: int | None, file_name: str) -> str:
+    """
+    Returns path of a compacted file, `{root}/2025-03/{file_name}` for a month or `{root}/2025/{file_name}` for a year.
+
+    Compacted files keep year/month/day as regular columns, directory names are not hive partitions, so files of
+    different granularity can be read together.
+    """
+    period = f"{year}-{month:02d}" if month else f"{year}"
+    return f"{root}/{period}/{file_name}"
+
+
+def compacted_period(path: str) -> tuple[int, int | None] | None:
+    """Extracts (year, month) of a compacted file, month is None for yearly files"""
+    match = _COMPACTED_PERIOD.search(path)
+    if not match:
+        return None
+    year, month = match.groups()
+    return int(year), int(month) if month else None
+
+
+def period_in_date_range(year: int, month: int | None, date_from: datetime.date | None,
+                         date_to: datetime.date | None) -> bool:
+    """Checks if the month (or whole year if month is None) overlaps the date range"""
+    first = (year, month or 1)
+    last = (year, month or 12)
+    return ((date_from is None or last >= (date_from.year, date_from.month)) and
+            (date_to is None or first <= (date_to.year, date_to.month)))
+
+
+def drop_compacted(daily_files: list[str], compacted_files: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Resolves overlap between layouts, coarser files take precedence over the files they were merged from.
+
+    Files are merged per file name (e.g. one compacted file per news source), so a day partition is dropped when
+    a compacted file with the same name covers its month or year, and a monthly file is dropped when a yearly file
+    with the same name exists. Writing the compacted file is therefore the commit point of a compaction: readers
+    switch to it atomically and the merged files can be deleted afterwards.
+
+    Returns:
+        Tuple of remaining daily files and compacted files
+    """
+    periods = [compacted_period(path) for path in compacted_files]
+    names = [path.rsplit('/', 1)[-1] for path in compacted_files]
+    years = {(year, name) for (year, month), name in zip(periods, names) if month is None}
+    months = {(year, month, name) for (year, month), name in zip(periods, names) if month is not None}
+
+    compacted_files = [path for path, (year, month), name in zip(compacted_files, periods, names)
+                       if month is None or (year, name) not in years]
+    remaining_daily = []
+    for path in daily_files:
+        date = partition_date(path)
+        name = path.rsplit('/', 1)[-1]
+        if date and ((date.year, name) in years or (date.year, date.month, name) in months):
+            continue
+        remaining_daily.append(path)
+    return remaining_daily, compacted_files
@@ -0,0 +1,235 @@
+import contextvars
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+import duckdb
+
+from data_access.profiling import current_profile
+from data_access.storage import storage_backend
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCancelled(Exception):
+    """Query was interrupted because the caller cancelled it"""
+
+
+class CancelScope:
+    """
+    Tracks cursors used on behalf of one caller, so a query running in a worker thread can be interrupted.
+
+    Cursors acquired while the scope is active (see `cancel_scope`) are registered in it; `cancel` interrupts
+    the running ones and makes further `acquire` calls raise `QueryCancelled`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cursors: set[duckdb.DuckDBPyConnection] = set()
+        self.cancelled = False
+
+    def register(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled()
+            self._cursors.add(cursor)
+
+    def unregister(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            self._cursors.discard(cursor)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            cursors = list(self._cursors)
+        for cursor in cursors:
+            try:
+                cursor.interrupt()
+            except duckdb.Error:
+                pass
+
+
+_cancel_scope: contextvars.ContextVar[CancelScope | None] = contextvars.ContextVar('cancel_scope', default=None)
+
+
+@contextmanager
+def cancel_scope(scope: CancelScope) -> Iterator[CancelScope]:
+    """Activates the scope for queries run by the current thread"""
+    token = _cancel_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _cancel_scope.reset(token)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of warm, pre-configured DuckDB connections.
+
+    Each pooled connection is an in-memory database with the timezone, httpfs extension and MinIO secret (for the S3
+    storage backend) already applied, so callers skip that setup on every request. `acquire` checks a connection out, health-checks it and
+    hands out a fresh cursor bound to it; the cursor is closed on release, so views or temporary tables created by
+    one request never leak into the next one. Cursors acquired inside an active `CancelScope` can be interrupted
+    from another thread. Safe to share between FastAPI threadpool workers and Dagster assets.
+    """
+
+    def __init__(self, size: int | None = None, is_minio: bool | None = None, timeout: float | None = None):
+        self.size = size or int(os.getenv('DUCKDB_POOL_SIZE', 4))
+        self.timeout = timeout or float(os.getenv('DUCKDB_POOL_TIMEOUT', 30))
+        # the MinIO secret and httpfs are needed only when the bucket is on the object store
+        self.is_minio = bool(os.getenv('IS_MINIO')) and storage_backend() == 's3' if is_minio is None else is_minio
+        self._idle: queue.LifoQueue[duckdb.DuckDBPyConnection] = queue.LifoQueue(maxsize=self.size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _configure(self, conn: duckdb.DuckDBPyConnection) -> None:
+        """Applies settings, extensions and secrets shared by every cursor of the connection"""
+        conn.sql("SET GLOBAL TimeZone = 'Europe/Warsaw'")
+        if self.is_minio:
+            conn.execute(f"""
+                CREATE SECRET minio_secret (
+                    TYPE S3,
+                    KEY_ID '{os.getenv('S3_ACCESS_KEY_ID')}',
+                    SECRET '{os.getenv('S3_SECRET_ACCESS_KEY')}',
+                    ENDPOINT '{os.getenv('S3_ENDPOINT')}',
+                    URL_STYLE '{os.getenv('S3_URL_STYLE', 'path')}',
+                    USE_SSL {os.getenv('S3_USE_SSL', 'false')}
+                )
+            """)
+            conn.sql("LOAD httpfs")
+
+    def _new_connection(self) -> duckdb.DuckDBPyConnection:
+        conn = duckdb.connect(":memory:")
+        try:
+            self._configure(conn)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: duckdb.DuckDBPyConnection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except duckdb.Error:
+            return False
+
+    def _reset_after_fork(self) -> None:
+        """Drops connections inherited from a parent process, DuckDB handles are not fork-safe"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._idle = queue.LifoQueue(maxsize=self.size)
+            self._created = 0
+            self._pid = os.getpid()
+
+    def _checkout(self) -> duckdb.DuckDBPyConnection:
+        self._reset_after_fork()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                return self._create()
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No DuckDB connection available after {self.timeout}s (pool size {self.size})")
+
+        if not self._is_healthy(conn):
+            logger.warning("Replacing unhealthy DuckDB connection")
+            self._discard(conn)
+            with self._lock:
+                self._created += 1
+            conn = self._create()
+        return conn
+
+    def _create(self) -> duckdb.DuckDBPyConnection:
+        """Opens a connection in a slot already counted in `_created`, the slot is given back if opening fails"""
+        try:
+            return self._new_connection()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _discard(self, conn: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except duckdb.Error:
+            pass
+
+    def _release(self, conn: duckdb.DuckDBPyConnection) -> None:
+        if self._pid != os.getpid():
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    @contextmanager
+    def acquire(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """
+        Yields a cursor of a pooled connection, the connection goes back to the pool on exit. Within a profiled
+        DuckS3 call (see `profiled`), statistics of queries run on the cursor are added to its profile.
+        """
+        conn = self._checkout()
+        try:
+            cursor = conn.cursor()
+        except duckdb.Error:
+            self._discard(conn)
+            raise
+        scope = _cancel_scope.get()
+        profile = current_profile()
+        try:
+            if scope is not None:
+                scope.register(cursor)
+            if profile is not None:
+                profile.attach(cursor)
+            yield cursor
+        except duckdb.InterruptException as e:
+            if scope is not None and scope.cancelled:
+                raise QueryCancelled() from e
+            raise
+        finally:
+            try:
+                if scope is not None:
+                    scope.unregister(cursor)
+                if profile is not None:
+                    profile.collect(cursor)
+                cursor.close()
+            finally:
+                self._release(conn)
+
+    def close(self) -> None:
+        """Closes idle connections, connections in use are closed when they are released"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+_shared_pool: ConnectionPool | None = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Returns process-wide connection pool, created lazily on first use"""
+    global _shared_pool
+    if _shared_pool is None:
+        with _shared_pool_lock:
+            if _shared_pool is None:
+                _shared_pool = ConnectionPool()
+    return _shared_pool
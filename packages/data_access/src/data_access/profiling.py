@@ -0,0 +1,328 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Iterator
+
+import duckdb
+
+from data_access.metrics import MetricsRegistry, get_metrics
+
+logger = logging.getLogger(__name__)
+
+# number of recent profiles kept for `recent_profiles`
+PROFILE_HISTORY = 200
+# stored plans keep only the start of the query text, it lists every read file
+PLAN_QUERY_CHARS = 500
+
+METRICS = {
+    'ducks3_queries_total': ('counter', "DuckS3 queries by method and status (ok, error)"),
+    'ducks3_query_seconds': ('histogram', "Wall time of DuckS3 queries"),
+    'ducks3_query_list_seconds_total': ('counter', "Time spent resolving files from manifests and bucket listings"),
+    'ducks3_query_download_seconds_total': ('counter', "Time spent downloading files into the disk cache"),
+    'ducks3_query_duckdb_seconds_total': ('counter', "Time DuckDB spent executing queries (profiler latency)"),
+    'ducks3_query_convert_seconds_total': ('counter', "Time spent converting DuckDB results to Polars frames"),
+    'ducks3_query_rows_total': ('counter', "Rows returned by DuckS3 queries"),
+    'ducks3_query_bytes_read_total': ('counter', "Bytes DuckDB read from parquet files"),
+    'ducks3_query_files_opened_total': ('counter', "Files DuckDB opened"),
+    'ducks3_query_http_requests_total': ('counter', "HTTP requests made by DuckDB (httpfs)"),
+    'ducks3_query_list_requests_total': ('counter', "Bucket listings made to resolve files"),
+    'ducks3_query_cache_hits_total': ('counter', "Queries served from the result cache"),
+}
+
+_current: contextvars.ContextVar['QueryProfile | None'] = contextvars.ContextVar('query_profile', default=None)
+_recent: deque['QueryProfile'] = deque(maxlen=PROFILE_HISTORY)
+
+
+@dataclass
+class QueryProfile:
+    """
+    Structured profile of one DuckS3 query, shows where its time went.
+
+    Attributes:
+        method: Name of the DuckS3 method
+        arguments: Arguments of the call
+        started_at: Unix time of the call
+        seconds: Total wall time
+        list_seconds: Resolving files from manifests and bucket listings
+        download_seconds: Downloading files into the disk cache
+        duckdb_seconds: Executing queries in DuckDB, including reading parquet files
+        fetch_seconds: Executing the query producing the result and fetching it, DuckDB execution plus conversion
+        convert_seconds: Converting DuckDB results to Polars frames (or Arrow tables)
+        rows: Returned rows
+        bytes_read: Bytes DuckDB read from files
+        files_opened: Files DuckDB read
+        http_requests: HTTP requests made by httpfs, 0 for the local storage backend
+        http_seconds: Total duration of the HTTP requests
+        list_requests: Bucket listings, datasets with a manifest aren't listed
+        cache_hit: The result was served from the result cache
+        error: Type of the raised exception
+        plans: DuckDB profiling output (operator tree with timings) of the query producing the result of every
+            connection the call used
+        io_logged: Reads are taken from DuckDB's file system and HTTP logs and cover every query of the call, HTTP
+            requests are known only then. Otherwise they come from the profiler and cover queries producing
+            results, e.g. not the lookup of files in the news index.
+    """
+    method: str
+    arguments: dict = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    seconds: float = 0.0
+    list_seconds: float = 0.0
+    download_seconds: float = 0.0
+    duckdb_seconds: float = 0.0
+    fetch_seconds: float = 0.0
+    convert_seconds: float = 0.0
+    rows: int = 0
+    bytes_read: int = 0
+    files_opened: int = 0
+    http_requests: int = 0
+    http_seconds: float = 0.0
+    list_requests: int = 0
+    cache_hit: bool = False
+    error: str | None = None
+    plans: list[dict] = field(default_factory=list)
+    io_logged: bool = False
+
+    def summary(self) -> dict:
+        """Profile without the DuckDB plans, for logs"""
+        return {item.name: getattr(self, item.name) for item in fields(self)
+                if item.name != 'plans'}
+
+    def attach(self, conn: duckdb.DuckDBPyConnection) -> None:
+        """
+        Starts collecting DuckDB statistics on a pooled connection checked out for this query. Profiling is set on the
+        cursor, file system and HTTP logging (if `io_logged`) on its database, which no other caller uses while it's
+        checked out.
+        """
+        conn.sql("SET enable_profiling = 'no_output'")
+        if self.io_logged:
+            conn.sql("CALL enable_logging(['FileSystem', 'HTTP'])")
+
+    def add_result(self, plan: dict | None, fetch_seconds: float, executed_before: bool) -> None:
+        """
+        Adds the DuckDB profiling output of a query producing a result and the time of fetching it, see `fetching`.
+        Conversion is the part of the fetch not spent executing the query, all of it for queries executed before.
+        """
+        self.fetch_seconds += fetch_seconds
+        if plan is None:
+            return
+        plan['query_name'] = plan.get('query_name', '')[:PLAN_QUERY_CHARS]
+        self.plans.append(plan)
+        latency = plan.get('latency', 0.0)
+        self.duckdb_seconds += latency
+        self.convert_seconds += fetch_seconds if executed_before else max(fetch_seconds - latency, 0.0)
+        if not self.io_logged:
+            self.bytes_read += int(plan.get('total_bytes_read', 0))
+            self.files_opened += _files_read(plan)
+
+    def collect(self, conn: duckdb.DuckDBPyConnection) -> None:
+        """Adds file and HTTP reads of all queries run on the connection since `attach` (if `io_logged`)"""
+        if not self.io_logged:
+            return
+        try:
+            bytes_read, files_opened = conn.sql("""
+                SELECT COALESCE(SUM(bytes) FILTER (op = 'READ'), 0), COUNT(DISTINCT path) FILTER (op = 'OPEN')
+                FROM duckdb_logs_parsed('FileSystem')
+            """).fetchone()
+            http_requests, http_ms = conn.sql("""
+                SELECT COUNT(*), COALESCE(SUM(request.duration_ms), 0) FROM duckdb_logs_parsed('HTTP')
+            """).fetchone()
+            self.bytes_read += int(bytes_read)
+            self.files_opened += int(files_opened)
+            self.http_requests += int(http_requests)
+            self.http_seconds += http_ms / 1000
+        except duckdb.Error as e:
+            # e.g. an interrupted query, the profile is then incomplete but the connection is still usable
+            logger.debug(f"Incomplete profile of {self.method}: {e}")
+        finally:
+            with contextlib.suppress(duckdb.Error):
+                conn.sql("CALL disable_logging()")
+                conn.sql("CALL truncate_duckdb_logs()")
+
+    def record(self, registry: MetricsRegistry) -> None:
+        """Adds the profile to the metrics of its method"""
+        for name, (kind, help_text) in METRICS.items():
+            registry.describe(name, kind, help_text)
+        method = self.method
+        registry.inc('ducks3_queries_total', method=method, status='error' if self.error else 'ok')
+        registry.observe('ducks3_query_seconds', self.seconds, method=method)
+        registry.inc('ducks3_query_list_seconds_total', self.list_seconds, method=method)
+        registry.inc('ducks3_query_download_seconds_total', self.download_seconds, method=method)
+        registry.inc('ducks3_query_duckdb_seconds_total', self.duckdb_seconds, method=method)
+        registry.inc('ducks3_query_convert_seconds_total', self.convert_seconds, method=method)
+        registry.inc('ducks3_query_rows_total', self.rows, method=method)
+        registry.inc('ducks3_query_bytes_read_total', self.bytes_read, method=method)
+        registry.inc('ducks3_query_files_opened_total', self.files_opened, method=method)
+        registry.inc('ducks3_query_http_requests_total', self.http_requests, method=method)
+        registry.inc('ducks3_query_list_requests_total', self.list_requests, method=method)
+        registry.inc('ducks3_query_cache_hits_total', int(self.cache_hit), method=method)
+
+
+def profiling_level() -> str:
+    """
+    Returns how queries are profiled, set by QUERY_PROFILING: '1' (default) profiles every query, 'io' additionally
+    logs every file and HTTP request of DuckDB (see `QueryProfile.io_logged`, adds milliseconds to each query),
+    '0' disables profiling.
+    """
+    return os.getenv('QUERY_PROFILING', '1')
+
+
+def current_profile() -> QueryProfile | None:
+    """Returns profile of the query running in this context, None if none is being profiled"""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def timed(step: str) -> Iterator[None]:
+    """Adds time spent in the block to the `{step}_seconds` field of the current profile"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(profile, f"{step}_seconds", getattr(profile, f"{step}_seconds") + time.perf_counter() - start)
+
+
+def _plan(conn: duckdb.DuckDBPyConnection) -> dict | None:
+    """Returns DuckDB profiling output of the last query run on the cursor, None if there is none"""
+    try:
+        plan = json.loads(conn.get_profiling_information(format='json') or '{}')
+    except (duckdb.Error, ValueError):
+        return None
+    return plan if 'latency' in plan else None
+
+
+@contextlib.contextmanager
+def fetching(conn: duckdb.DuckDBPyConnection) -> Iterator[None]:
+    """
+    Profiles fetching of a query result in the block, see `QueryProfile.add_result`.
+
+    Relations of parameterized queries are executed when they're created, fetching them only converts the result,
+    their profiling output is then the one present before the fetch.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    executed = _plan(conn)
+    start = time.perf_counter()
+    yield
+    fetch_seconds = time.perf_counter() - start
+    plan = _plan(conn)
+    profile.add_result(plan or executed, fetch_seconds, executed_before=plan is None)
+
+
+def recent_profiles(limit: int = PROFILE_HISTORY) -> list[QueryProfile]:
+    """Returns the most recent profiles, newest first"""
+    return list(reversed(_recent))[:limit]
+
+
+def _files_read(plan: dict) -> int:
+    """Sums files read by the scans of a DuckDB profiling output"""
+    files = int(plan.get('extra_info', {}).get('Total Files Read', 0))
+    return files + sum(_files_read(child) for child in plan.get('children', []))
+
+
+def _count_rows(result: Any) -> int:
+    if hasattr(result, 'num_rows'):
+        return result.num_rows
+    if hasattr(result, 'height'):
+        return result.height
+    return 0
+
+
+def _finish(profile: QueryProfile, start: float) -> None:
+    profile.seconds = time.perf_counter() - start
+    profile.record(get_metrics())
+    _recent.append(profile)
+    slow = profile.seconds >= float(os.getenv('SLOW_QUERY_SECONDS', 1))
+    level = logging.INFO if slow else logging.DEBUG
+    if logger.isEnabledFor(level):
+        logger.log(level, f"{'Slow query' if slow else 'Query'} profile: {json.dumps(profile.summary(), default=str)}")
+
+
+def profiled(method: Callable) -> Callable:
+    """
+    Profiles calls of a DuckS3 method, see `QueryProfile`.
+
+    Connections acquired during the call report their DuckDB statistics to the profile (see `ConnectionPool.acquire`).
+    Finished profiles are logged (at INFO level if slower than SLOW_QUERY_SECONDS, default 1s, DEBUG otherwise),
+    recorded in the metrics registry and kept in `recent_profiles`. A method called by another profiled method is
+    accounted to the outer call. Generator methods are profiled from the first to the last batch.
+    """
+    signature = inspect.signature(method)
+
+    def start_profile(self, args: tuple, kwargs: dict) -> QueryProfile | None:
+        level = profiling_level()
+        if level == '0' or _current.get() is not None:
+            return None
+        bound = signature.bind(self, *args, **kwargs)
+        arguments = {name: value for name, value in bound.arguments.items() if name != 'self'}
+        return QueryProfile(method=method.__name__, arguments=json.loads(json.dumps(arguments, default=str)),
+                            io_logged=level == 'io')
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def iterate(self, *args, **kwargs):
+            profile = start_profile(self, args, kwargs)
+            if profile is None:
+                yield from method(self, *args, **kwargs)
+                return
+            start = time.perf_counter()
+            items = method(self, *args, **kwargs)
+            try:
+                while True:
+                    # the generator may be resumed from different threads, e.g. by `AsyncDuckS3.stream`
+                    token = _current.set(profile)
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        break
+                    finally:
+                        _current.reset(token)
+                    profile.rows += _count_rows(item)
+                    yield item
+            except GeneratorExit:
+                # the consumer stopped early, e.g. a client disconnected from an export
+                raise
+            except BaseException as e:
+                profile.error = type(e).__name__
+                raise
+            finally:
+                token = _current.set(profile)
+                try:
+                    items.close()
+                finally:
+                    _current.reset(token)
+                    _finish(profile, start)
+
+        return iterate
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = start_profile(self, args, kwargs)
+        if profile is None:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        token = _current.set(profile)
+        try:
+            result = method(self, *args, **kwargs)
+            profile.rows = _count_rows(result)
+            return result
+        except BaseException as e:
+            profile.error = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            _finish(profile, start)
+
+    return wrapper
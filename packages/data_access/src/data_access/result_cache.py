@@ -0,0 +1,171 @@
+import datetime
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+import polars as pl
+import pyarrow as pa
+
+from data_access.profiling import current_profile
+
+_MISSING = object()
+
+
+def size_of(value: Any) -> int:
+    """Estimates memory held by a cached result in bytes"""
+    if isinstance(value, pl.DataFrame):
+        return int(value.estimated_size())
+    if isinstance(value, pa.Table):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def normalize(value: Any) -> Hashable:
+    """Turns an argument into a hashable key part, so equal arguments passed in different shapes share an entry"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, normalize(item)) for key, item in value.items()))
+    return value
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+    versions: tuple
+
+
+class ResultCache:
+    """
+    In-memory LRU cache of query results bounded by total size in bytes.
+
+    Every entry remembers versions of the datasets it was computed from (ETags of dataset manifests) and is
+    served only while they are unchanged, so a result never outlives the next write. The TTL additionally bounds
+    the age of results of datasets without a manifest.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, versions: tuple) -> Any:
+        """Returns cached value, `_MISSING` if there is none, it expired or any dataset changed since"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.versions != versions or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, versions: tuple) -> None:
+        size = size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, time.monotonic() + self.ttl, versions)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        self._size -= self._entries.pop(key).size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+def _unshared(result: Any) -> Any:
+    """
+    Returns a copy of a cached result callers can modify without changing the cache, cloning a polars frame is cheap.
+    Arrow tables are immutable and shared.
+    """
+    if isinstance(result, pl.DataFrame):
+        return result.clone()
+    if isinstance(result, (list, dict)):
+        return result.copy()
+    return result
+
+
+def cached_result(*datasets: str) -> Callable:
+    """
+    Caches results of a DuckS3 method in `self.result_cache`, keyed by method name and normalized arguments.
+
+    Args:
+        datasets: Datasets the method reads, a cached result is dropped when the version of any of them changes
+    """
+
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.result_cache
+            if cache is None:
+                return method(self, *args, **kwargs)
+
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = tuple((name, normalize(value)) for name, value in bound.arguments.items() if name != 'self')
+            key = (self.s3, method.__qualname__, arguments)
+            versions = self.dataset_versions(datasets)
+
+            result = cache.get(key, versions)
+            if result is _MISSING:
+                result = method(self, *args, **kwargs)
+                cache.put(key, result, versions)
+            elif profile := current_profile():
+                profile.cache_hit = True
+            return _unshared(result)
+
+        wrapper.datasets = datasets
+        return wrapper
+
+    return decorator
+
+
+_result_cache: ResultCache | None = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache | None:
+    """
+    Returns process-wide result cache configured by RESULT_CACHE_MAX_BYTES (default 256 MiB) and
+    RESULT_CACHE_TTL (seconds, default 300), None if caching is disabled with RESULT_CACHE_MAX_BYTES=0
+    """
+    global _result_cache
+    max_bytes = int(os.getenv('RESULT_CACHE_MAX_BYTES', 256 * 1024 ** 2))
+    if max_bytes <= 0:
+        return None
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(max_bytes, ttl=float(os.getenv('RESULT_CACHE_TTL', 300)))
+        return _result_cache
@@ -0,0 +1,321 @@
+import datetime
+import fcntl
+import os
+import re
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Protocol
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+
+class PreconditionFailed(Exception):
+    """Conditional write was rejected because the object changed in the meantime"""
+
+
+@dataclass
+class ObjectInfo:
+    key: str
+    path: str
+    size: int
+    etag: str
+    last_modified: datetime.datetime
+
+
+def glob_to_regex(pattern: str) -> re.Pattern:
+    """Translates DuckDB-style glob (`*`, `?`, `**` for any number of directories) into a regex"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:[^/]+/)*'
+            i += 3
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(regex + '$')
+
+
+def storage_backend() -> str:
+    """Returns storage backend selected by STORAGE_BACKEND, 's3' (default, S3 or MinIO) or 'local'"""
+    backend = os.getenv('STORAGE_BACKEND', 's3').lower()
+    if backend not in ('s3', 'local'):
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend}, expected 's3' or 'local'")
+    return backend
+
+
+class Storage(Protocol):
+    """
+    Object operations DuckDB can't do by itself (listing with metadata, conditional writes, deleting).
+
+    `uri` is the root DuckDB reads and writes the bucket at, paths are `{uri}/{key}`.
+    """
+    uri: str
+
+    def key(self, path: str) -> str:
+        """Converts full path (or key with leading slash) into the object key"""
+        if path.startswith(self.uri):
+            path = path[len(self.uri):]
+        return path.lstrip('/')
+
+    def list_objects(self, prefix: str) -> list[ObjectInfo]: ...
+
+    def glob(self, pattern: str) -> list[ObjectInfo]:
+        """Lists objects matching the glob pattern, only the prefix before the first wildcard is listed"""
+        key_pattern = self.key(pattern)
+        prefix = re.split(r'[*?\[]', key_pattern, maxsplit=1)[0]
+        regex = glob_to_regex(key_pattern)
+        return sorted((obj for obj in self.list_objects(prefix) if regex.match(obj.key)), key=lambda obj: obj.key)
+
+    def head(self, path: str) -> ObjectInfo | None: ...
+
+    def get_bytes(self, path: str, if_none_match: str | None = None) -> tuple[bytes | None, str | None]: ...
+
+    def put_bytes(self, path: str, data: bytes, if_match: str | None = None, if_none_match: bool = False) -> str: ...
+
+    def prepare_write(self, path: str) -> None:
+        """Prepares the path for a DuckDB COPY, e.g. creates missing directories"""
+
+    def download(self, path: str, local_path: str) -> None: ...
+
+    def move(self, source: str, target: str) -> None: ...
+
+    def delete(self, paths: list[str]) -> None: ...
+
+
+class S3Storage(Storage):
+    """Object operations on the S3/MinIO bucket"""
+
+    def __init__(self, bucket: str = None):
+        self.bucket = bucket or os.environ.get('S3_BUCKET')
+        self.uri = f"s3://{self.bucket}"
+        client_kwargs = {}
+        if os.getenv('IS_MINIO'):
+            use_ssl = os.getenv('S3_USE_SSL', 'false').lower() == 'true'
+            client_kwargs = {
+                'endpoint_url': f"{'https' if use_ssl else 'http'}://{os.getenv('S3_ENDPOINT')}",
+                'aws_access_key_id': os.getenv('S3_ACCESS_KEY_ID'),
+                'aws_secret_access_key': os.getenv('S3_SECRET_ACCESS_KEY'),
+                'config': Config(s3={'addressing_style': os.getenv('S3_URL_STYLE', 'path')}),
+            }
+        # boto3 clients are thread-safe, one client is shared by all threads
+        self.client = boto3.client('s3', **client_kwargs)
+
+    def list_objects(self, prefix: str) -> list[ObjectInfo]:
+        """Lists all objects under the prefix"""
+        objects = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.key(prefix)):
+            for obj in page.get('Contents', []):
+                objects.append(ObjectInfo(key=obj['Key'], path=f"{self.uri}/{obj['Key']}", size=obj['Size'],
+                                          etag=obj['ETag'].strip('"'), last_modified=obj['LastModified']))
+        return objects
+
+    def head(self, path: str) -> ObjectInfo | None:
+        """Returns metadata of the object, None if it doesn't exist"""
+        key = self.key(path)
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return ObjectInfo(key=key, path=f"{self.uri}/{key}", size=response['ContentLength'],
+                          etag=response['ETag'].strip('"'), last_modified=response['LastModified'])
+
+    def get_bytes(self, path: str, if_none_match: str | None = None) -> tuple[bytes | None, str | None]:
+        """
+        Reads the whole object.
+
+        Args:
+            path: Object path or key
+            if_none_match: ETag of a copy the caller already has, the body isn't transferred if it's still current
+
+        Returns:
+            Tuple of content and ETag; content is None if the object wasn't modified, both are None if it doesn't exist
+        """
+        kwargs = {'IfNoneMatch': f'"{if_none_match}"'} if if_none_match else {}
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.key(path), **kwargs)
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code in ('404', 'NoSuchKey'):
+                return None, None
+            if code in ('304', 'NotModified'):
+                return None, if_none_match
+            raise
+        return response['Body'].read(), response['ETag'].strip('"')
+
+    def put_bytes(self, path: str, data: bytes, if_match: str | None = None, if_none_match: bool = False) -> str:
+        """
+        Writes the object, optionally only if it wasn't changed (if_match) or doesn't exist yet (if_none_match).
+
+        Returns:
+            ETag of the written object
+
+        Raises:
+            PreconditionFailed: If the condition isn't met
+        """
+        kwargs = {}
+        if if_match:
+            kwargs['IfMatch'] = f'"{if_match}"'
+        if if_none_match:
+            kwargs['IfNoneMatch'] = '*'
+        try:
+            response = self.client.put_object(Bucket=self.bucket, Key=self.key(path), Body=data, **kwargs)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('412', 'PreconditionFailed', '409', 'ConditionalRequestConflict'):
+                raise PreconditionFailed(path) from e
+            raise
+        return response['ETag'].strip('"')
+
+    def download(self, path: str, local_path: str) -> None:
+        """Downloads the object to a local file"""
+        self.client.download_file(self.bucket, self.key(path), local_path)
+
+    def move(self, source: str, target: str) -> None:
+        """Moves the object with a server-side copy, the target appears at once with its whole content"""
+        self.client.copy_object(Bucket=self.bucket, Key=self.key(target),
+                                CopySource={'Bucket': self.bucket, 'Key': self.key(source)})
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(source))
+
+    def delete(self, paths: list[str]) -> None:
+        """Deletes objects, missing objects are ignored"""
+        keys = [self.key(path) for path in paths]
+        # DeleteObjects accepts up to 1000 keys per request
+        for i in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket,
+                                       Delete={'Objects': [{'Key': key} for key in keys[i:i + 1000]],
+                                               'Quiet': True})
+
+
+class LocalStorage(Storage):
+    """
+    Bucket kept in a local directory, `LOCAL_STORAGE_ROOT/{bucket}`, for development and benchmarks without
+    an object store.
+
+    Objects are written to a temporary file and renamed, so like S3 objects they appear at once with their whole
+    content. ETags are derived from inode, modification time and size, conditional writes are serialized with
+    a lock file, so they are safe between processes on one host.
+    """
+
+    def __init__(self, bucket: str = None, root: str = None):
+        self.bucket = bucket or os.environ.get('S3_BUCKET')
+        root = root or os.getenv('LOCAL_STORAGE_ROOT', 'data')
+        self.uri = os.path.abspath(os.path.join(root, self.bucket))
+        os.makedirs(self.uri, exist_ok=True)
+
+    def _file(self, path: str) -> str:
+        return os.path.join(self.uri, self.key(path))
+
+    def _info(self, key: str, stat: os.stat_result) -> ObjectInfo:
+        return ObjectInfo(key=key, path=f"{self.uri}/{key}", size=stat.st_size,
+                          etag=f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}",
+                          last_modified=datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc))
+
+    def list_objects(self, prefix: str) -> list[ObjectInfo]:
+        """Lists all files under the prefix, hidden files (locks, files being written) are skipped"""
+        prefix = self.key(prefix)
+        objects = []
+        for directory, _, files in os.walk(os.path.join(self.uri, os.path.dirname(prefix))):
+            for name in files:
+                if name.startswith('.'):
+                    continue
+                file = os.path.join(directory, name)
+                key = os.path.relpath(file, self.uri).replace(os.sep, '/')
+                if key.startswith(prefix):
+                    try:
+                        objects.append(self._info(key, os.stat(file)))
+                    except FileNotFoundError:
+                        continue
+        return objects
+
+    def head(self, path: str) -> ObjectInfo | None:
+        """Returns metadata of the file, None if it doesn't exist"""
+        try:
+            return self._info(self.key(path), os.stat(self._file(path)))
+        except FileNotFoundError:
+            return None
+
+    def get_bytes(self, path: str, if_none_match: str | None = None) -> tuple[bytes | None, str | None]:
+        """Reads the whole file, see `S3Storage.get_bytes`"""
+        try:
+            with open(self._file(path), 'rb') as file:
+                info = self._info(self.key(path), os.fstat(file.fileno()))
+                if info.etag == if_none_match:
+                    return None, info.etag
+                return file.read(), info.etag
+        except FileNotFoundError:
+            return None, None
+
+    def put_bytes(self, path: str, data: bytes, if_match: str | None = None, if_none_match: bool = False) -> str:
+        """Writes the file, see `S3Storage.put_bytes`"""
+        file = self._file(path)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        with open(os.path.join(self.uri, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = self.head(path)
+            if (if_none_match and current) or (if_match and (current is None or current.etag != if_match)):
+                raise PreconditionFailed(path)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(file), prefix='.', delete=False) as temporary:
+                temporary.write(data)
+            os.replace(temporary.name, file)
+            return self.head(path).etag
+
+    def prepare_write(self, path: str) -> None:
+        """Creates the parent directory, DuckDB creates only directories of hive partitions"""
+        os.makedirs(os.path.dirname(self._file(path)), exist_ok=True)
+
+    def download(self, path: str, local_path: str) -> None:
+        shutil.copyfile(self._file(path), local_path)
+
+    def move(self, source: str, target: str) -> None:
+        """Renames the file, the target is replaced atomically"""
+        self.prepare_write(target)
+        os.replace(self._file(source), self._file(target))
+        self._remove_empty_parents(self._file(source))
+
+    def delete(self, paths: list[str]) -> None:
+        """Deletes files, missing files are ignored. Directories left empty are removed, like prefixes on S3"""
+        for path in paths:
+            try:
+                os.remove(self._file(path))
+            except FileNotFoundError:
+                continue
+            self._remove_empty_parents(self._file(path))
+
+    def _remove_empty_parents(self, file: str) -> None:
+        directory = os.path.dirname(file)
+        while directory != self.uri and directory.startswith(self.uri):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+_storages: dict[tuple[str, str], Storage] = {}
+_storages_lock = threading.Lock()
+
+
+def get_storage(bucket: str = None) -> Storage:
+    """
+    Returns process-wide storage of the bucket, created lazily on first use. The backend is selected by
+    STORAGE_BACKEND (see `storage_backend`).
+    """
+    bucket = bucket or os.environ.get('S3_BUCKET')
+    backend = storage_backend()
+    with _storages_lock:
+        if (backend, bucket) not in _storages:
+            _storages[(backend, bucket)] = LocalStorage(bucket) if backend == 'local' else S3Storage(bucket)
+        return _storages[(backend, bucket)]
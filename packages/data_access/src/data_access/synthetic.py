@@ -0,0 +1,300 @@
+import argparse
+import datetime
+import logging
+import math
+from dataclasses import dataclass, field
+
+import polars as pl
+
+from data_access.S3 import DuckS3
+
+logger = logging.getLogger(__name__)
+
+NEWS_SOURCES = {'BankierSource': 'www.bankier.pl', 'InteriaSource': 'biznes.interia.pl'}
+# NBP table, currency name and starting rate of generated currencies
+CURRENCIES = {
+    'mid_market_rate': ('A', {'USD': ('dolar amerykański', 3.9), 'EUR': ('euro', 4.3),
+                              'CHF': ('frank szwajcarski', 4.4), 'GBP': ('funt szterling', 5.0),
+                              'JPY': ('jen (Japonia)', 0.027), 'CZK': ('korona czeska', 0.17),
+                              'NOK': ('korona norweska', 0.37), 'SEK': ('korona szwedzka', 0.38),
+                              'HUF': ('forint (Węgry)', 0.011), 'CAD': ('dolar kanadyjski', 2.9)}),
+    'bid_ask': ('C', {'USD': ('dolar amerykański', 3.9), 'EUR': ('euro', 4.3),
+                      'CHF': ('frank szwajcarski', 4.4), 'GBP': ('funt szterling', 5.0)}),
+    'mid_market_rate_unpopular': ('B', {'UAH': ('hrywna (Ukraina)', 0.1), 'TRY': ('lira turecka', 0.12),
+                                        'BRL': ('real (Brazylia)', 0.75), 'INR': ('rupia indyjska', 0.047)}),
+}
+SESSION_START = datetime.time(9, 0)
+
+_U64 = pl.UInt64
+
+
+@dataclass
+class SyntheticConfig:
+    """
+    Volume of generated data, the same config (including seed and end_date) always produces the same data.
+
+    Attributes:
+        years: Years of minutely ticks (`ohlc/`) ending at end_date
+        isins: Number of companies, 20 for WIG20, about 400 for the whole GPW
+        seed_years: Years of daily history in `ohlc_seed` before the first tick
+        ticks_per_day: Ticks per company and session, one per minute from 9:00
+        news_per_day: Articles per news source and day
+        mention_rate: Share of articles mentioning a company
+        end_date: Last generated day
+        seed: Seed of the generator
+    """
+    years: float = 1
+    isins: int = 20
+    seed_years: int = 5
+    ticks_per_day: int = 480
+    news_per_day: int = 40
+    mention_rate: float = 0.3
+    end_date: datetime.date = field(default_factory=datetime.date.today)
+    seed: int = 0
+
+    @property
+    def tick_start(self) -> datetime.date:
+        return self.end_date - datetime.timedelta(days=round(self.years * 365))
+
+    @property
+    def history_start(self) -> datetime.date:
+        return self.tick_start - datetime.timedelta(days=self.seed_years * 365)
+
+
+def _mix(x: pl.Expr) -> pl.Expr:
+    """splitmix64 finalizer, uint64 arithmetic wraps around"""
+    x = x + pl.lit(0x9E3779B97F4A7C15, dtype=_U64)
+    x = (x ^ (x // 2 ** 30)) * pl.lit(0xBF58476D1CE4E5B9, dtype=_U64)
+    x = (x ^ (x // 2 ** 27)) * pl.lit(0x94D049BB133111EB, dtype=_U64)
+    return x ^ (x // 2 ** 31)
+
+
+def _uniform(key: pl.Expr, seed: int, stream: int) -> pl.Expr:
+    """Uniform number in (0, 1) derived from the row key, independent for every stream"""
+    salt = (seed * 0x2545F4914F6CDD1D + stream * 0x9E3779B97F4A7C15) % 2 ** 64
+    bits = _mix(key.cast(_U64) ^ pl.lit(salt, dtype=_U64))
+    return ((bits // 2 ** 11).cast(pl.Float64) + 0.5) / 2 ** 53
+
+
+def _normal(key: pl.Expr, seed: int, stream: int) -> pl.Expr:
+    """Standard normal number derived from the row key (Box-Muller)"""
+    radius = (-2 * _uniform(key, seed, stream).log()).sqrt()
+    return radius * (2 * math.pi * _uniform(key, seed, stream + 1)).cos()
+
+
+def _key(*columns: tuple[str, int]) -> pl.Expr:
+    """Packs integer columns into one uint64 key, each column gets the given number of bits"""
+    key = pl.lit(0, dtype=_U64)
+    for column, bits in columns:
+        key = key * 2 ** bits + pl.col(column).cast(_U64)
+    return key
+
+
+def _weekdays(start: datetime.date, end: datetime.date) -> list[datetime.date]:
+    return [day for day in pl.date_range(start, end, eager=True).to_list() if day.weekday() < 5]
+
+
+def _isin(index: int) -> str:
+    return f"PLSYN{index:07d}"
+
+
+def _daily_prices(config: SyntheticConfig) -> pl.DataFrame:
+    """Daily OHLC random walk of every company over the whole history, source of the seed and of tick sessions"""
+    days = pl.DataFrame({'date': _weekdays(config.history_start, config.end_date)}).with_row_index('day_idx')
+    companies = pl.DataFrame({'isin_idx': pl.int_range(config.isins, eager=True, dtype=pl.UInt32)})
+    key = _key(('isin_idx', 24), ('day_idx', 24))
+    start_price = 10 + 190 * _uniform(pl.col('isin_idx'), config.seed, 1)
+    return (companies.join(days, how='cross')
+            .sort('isin_idx', 'day_idx')
+            .with_columns(close=start_price * (0.02 * _normal(key, config.seed, 2)).cum_sum().over('isin_idx').exp(),
+                          gap=(0.005 * _normal(key, config.seed, 4)).exp())
+            .with_columns(open=pl.col('close').shift(1).over('isin_idx').fill_null(start_price) * pl.col('gap'))
+            .with_columns(high=pl.max_horizontal('open', 'close') * (1 + 0.01 * _normal(key, config.seed, 6).abs()),
+                          low=pl.min_horizontal('open', 'close') * (1 - 0.01 * _normal(key, config.seed, 8).abs()),
+                          volume=(1_000 + 1_000_000 * _uniform(key, config.seed, 10)).cast(pl.Int64),
+                          isin=pl.format('PLSYN{}', pl.col('isin_idx').cast(pl.String).str.zfill(7)))
+            .drop('gap'))
+
+
+def _ohlc_seed(daily: pl.DataFrame, config: SyntheticConfig) -> pl.DataFrame:
+    """Daily history in the schema of `GpwSource.fetch_company_history_data`"""
+    return (daily.filter(pl.col('date') < config.tick_start)
+            .select(pl.col('date').cast(pl.Datetime('ms')).dt.replace_time_zone('Europe/Warsaw').alias('datetime'),
+                    'open', 'high', 'low', 'close', 'volume', 'isin'))
+
+
+def _ticks(sessions: pl.DataFrame, config: SyntheticConfig) -> pl.DataFrame:
+    """Minutely ticks of the sessions in the schema written by the `daily_ohlc` asset"""
+    minutes = pl.DataFrame({'minute': pl.int_range(config.ticks_per_day, eager=True, dtype=pl.UInt32)})
+    key = _key(('isin_idx', 20), ('day_idx', 24), ('minute', 16))
+    session_start = pl.col('date').cast(pl.Datetime('ms')) + pl.duration(hours=SESSION_START.hour)
+    return (sessions.join(minutes, how='cross')
+            .sort('isin_idx', 'day_idx', 'minute')
+            .with_columns(price=pl.col('open') * (0.001 * _normal(key, config.seed, 20)).cum_sum()
+                          .over('isin_idx', 'day_idx').exp(),
+                          volume=(1 + 2_000 * _uniform(key, config.seed, 22) ** 4).cast(pl.Int64))
+            .select((session_start + pl.duration(minutes=pl.col('minute')))
+                    .dt.replace_time_zone('Europe/Warsaw').alias('datetime'),
+                    'price', 'volume', 'isin',
+                    # the asset stamps ticks with the time it ran, after the session
+                    (pl.col('date').cast(pl.Datetime('us')) + pl.duration(hours=18)).alias('date'))
+            .with_columns(year=pl.col('date').dt.year(), month=pl.col('date').dt.month(),
+                          day=pl.col('date').dt.day()))
+
+
+def _companies_metadata(config: SyntheticConfig) -> pl.DataFrame:
+    """Snapshot in the schema written by the `wig20_companies_metadata` asset"""
+    rows = [{'listed_since': f"{1997 + index % 25}-01-02", 'name': f"SYN{index}", 'ticker': f"S{index:03d}",
+             'full_name': f"SYNTHETIC COMPANY {index} SPÓŁKA AKCYJNA", 'headquarters_address': "ul. Książęca 4, Warszawa",
+             'voivodeship': "mazowieckie", 'website': f"https://syn{index}.example.pl",
+             'description': f"Synthetic company {index}", 'company_isin': _isin(index),
+             'sector': ["banki", "energetyka", "handel", "paliwa", "telekomunikacja"][index % 5]}
+            for index in range(config.isins)]
+    return pl.DataFrame(rows).with_columns(date=pl.lit(config.end_date))
+
+
+def _news(config: SyntheticConfig) -> pl.DataFrame:
+    """Articles of all sources in the schema written by `DuckS3.write_news`, with source and partition columns"""
+    days = pl.DataFrame({'date': pl.date_range(config.history_start, config.end_date, eager=True)}) \
+        .with_row_index('day_idx')
+    articles = pl.DataFrame({'article': pl.int_range(config.news_per_day, eager=True, dtype=pl.UInt32)})
+    sources = pl.DataFrame({'source': list(NEWS_SOURCES), 'domain': list(NEWS_SOURCES.values())}) \
+        .with_row_index('source_idx')
+    key = _key(('source_idx', 4), ('day_idx', 24), ('article', 20))
+
+    def mentioned(stream: int) -> pl.Expr:
+        isin_idx = (_uniform(key, config.seed, stream) * config.isins).cast(pl.UInt32)
+        return pl.when(_uniform(key, config.seed, stream + 1) < config.mention_rate) \
+            .then(pl.format('PLSYN{}', isin_idx.cast(pl.String).str.zfill(7)))
+
+    return (sources.join(days, how='cross').join(articles, how='cross')
+            .with_columns(first=mentioned(30), second=pl.when(_uniform(key, config.seed, 32) < 0.2).then(mentioned(33)))
+            .select(pl.format("Synthetic article {} of {}", 'article', 'date').alias('title'),
+                    pl.format("https://{}/synthetic/{}/{}", 'domain', 'date', 'article').alias('link'),
+                    'date',
+                    pl.format("Summary of synthetic article {} published {} by {}", 'article', 'date', 'source')
+                    .alias('summary'),
+                    pl.concat_list('first', 'second').list.drop_nulls().list.unique(maintain_order=True)
+                    .alias('company_isins'),
+                    'source'))
+
+
+def _currencies(currency_type: str, config: SyntheticConfig) -> pl.DataFrame:
+    """Exchange rate tables in the schema of `NbpSource.transform_currency`"""
+    table, currencies = CURRENCIES[currency_type]
+    days = _weekdays(config.history_start, config.end_date)
+    if table == 'B':
+        # table B is published weekly, on Wednesdays
+        days = [day for day in days if day.weekday() == 2]
+    rates = pl.DataFrame({'effective_date': days}).with_row_index('day_idx')
+    codes = pl.DataFrame({'code': list(currencies), 'currency': [name for name, _ in currencies.values()],
+                          'start': [rate for _, rate in currencies.values()]}).with_row_index('code_idx')
+    key = _key(('code_idx', 16), ('day_idx', 24))
+    rates = (codes.join(rates, how='cross')
+             .sort('code_idx', 'day_idx')
+             .with_columns(mid=pl.col('start') * (0.004 * _normal(key, config.seed, 40)).cum_sum().over('code').exp(),
+                           table=pl.lit(table),
+                           no=pl.format("{}/{}/NBP/{}",
+                                        (pl.col('effective_date').rank('dense').over(
+                                            pl.col('effective_date').dt.year()).cast(pl.Int64)).cast(pl.String)
+                                        .str.zfill(3),
+                                        pl.lit(table), pl.col('effective_date').dt.year())))
+    if table == 'C':
+        return rates.select('table', 'no',
+                            (pl.col('effective_date') - pl.duration(days=1)).alias('trading_date'),
+                            'effective_date', 'currency', 'code',
+                            (pl.col('mid') * 0.99).round(4).alias('bid'), (pl.col('mid') * 1.01).round(4).alias('ask'))
+    return rates.select('table', 'no', 'effective_date', 'currency', 'code', pl.col('mid').round(6))
+
+
+def _gold_prices(config: SyntheticConfig) -> pl.DataFrame:
+    """Gold prices in the schema written by the `gold_prices` asset"""
+    prices = pl.DataFrame({'date': _weekdays(config.history_start, config.end_date)}).with_row_index('day_idx')
+    return prices.select('date', (120 * (0.01 * _normal(pl.col('day_idx'), config.seed, 50)).cum_sum().exp())
+                         .round(2).alias('price'))
+
+
+def generate(ducks3: DuckS3, config: SyntheticConfig) -> dict[str, int]:
+    """
+    Writes a synthetic market into the bucket of ducks3, in the datasets, schemas and layouts the Dagster assets
+    produce: `ohlc/` day partitions of minutely ticks (and the `ohlc_daily` rollup), `ohlc_seed` daily history,
+    per-source `news/` files with their ISIN index, company metadata with its latest snapshot, `currencies/` and
+    `gold_prices/`.
+
+    Prices are random walks, news mention random companies. Use an empty bucket, e.g. a local one
+    (STORAGE_BACKEND=local), existing files are overwritten.
+
+    Returns:
+        dict[str, int]: Number of rows written per dataset
+    """
+    rows = {}
+    daily = _daily_prices(config)
+
+    seed = _ohlc_seed(daily, config)
+    seed_name = datetime.datetime.combine(config.tick_start, datetime.time(18)).isoformat()
+    ducks3.write_data(seed, f"/ohlc_seed/{seed_name}.parquet")
+    rows['ohlc_seed'] = seed.height
+
+    sessions = daily.filter(pl.col('date') >= config.tick_start)
+    written, rows['ohlc'] = [], 0
+    for _, month in sessions.group_by(pl.col('date').dt.truncate('1mo'), maintain_order=True):
+        ticks = _ticks(month, config)
+        written += ducks3.write_data(ticks, '/ohlc', register=False)
+        rows['ohlc'] += ticks.height
+        logger.info(f"Generated {ticks.height} ticks of {month.get_column('date').min():%Y-%m}")
+    ducks3.register_files(written)
+    ducks3.update_ohlc_daily_rollup()
+
+    metadata = _companies_metadata(config)
+    ducks3.write_data(metadata, f"/companies_metadata/{config.end_date.isoformat()}T18:00:00.parquet")
+    ducks3.publish_latest('companies_metadata', metadata)
+    rows['companies_metadata'] = metadata.height
+
+    news = _news(config)
+    written = []
+    for (day, source), articles in news.group_by('date', 'source'):
+        partition = f"year={day.year}/month={day.month}/day={day.day}/{source}.parquet"
+        written += ducks3.write_data(articles.drop('source'), f"/news/{partition}", register=False)
+    ducks3.register_files(written)
+    ducks3.rebuild_news_index()
+    rows['news'] = news.height
+
+    for currency_type in CURRENCIES:
+        currencies = _currencies(currency_type, config)
+        ducks3.append_currencies(currency_type, currencies, file_name='backfill.parquet')
+        rows[f"currencies/{currency_type}"] = currencies.height
+
+    gold = _gold_prices(config)
+    ducks3.append_gold_prices(gold)
+    rows['gold_prices'] = gold.height
+    return rows
+
+
+def main() -> None:
+    """
+    Generates a synthetic market into the bucket configured by the environment, e.g.
+
+        STORAGE_BACKEND=local LOCAL_STORAGE_ROOT=/tmp/synthetic python -m data_access.synthetic --years 3 --isins 400
+    """
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--bucket', default=None, help="Bucket to write to, defaults to S3_BUCKET")
+    parser.add_argument('--years', type=float, default=defaults.years)
+    parser.add_argument('--isins', type=int, default=defaults.isins)
+    parser.add_argument('--seed-years', type=int, default=defaults.seed_years)
+    parser.add_argument('--ticks-per-day', type=int, default=defaults.ticks_per_day)
+    parser.add_argument('--news-per-day', type=int, default=defaults.news_per_day)
+    parser.add_argument('--end-date', type=datetime.date.fromisoformat, default=defaults.end_date)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = SyntheticConfig(years=args.years, isins=args.isins, seed_years=args.seed_years,
+                             ticks_per_day=args.ticks_per_day, news_per_day=args.news_per_day,
+                             end_date=args.end_date, seed=args.seed)
+    for dataset, count in generate(DuckS3(bucket=args.bucket), config).items():
+        print(f"{dataset}: {count} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -45,3 +45,24 @@ def parse_date(date: str) -> datetime.date | None:
     return datetime.datetime.strptime(date, "%Y-%m-%d").date()
 
 
+def parse_datetime(value: str | datetime.datetime | None) -> datetime.datetime | None:
+    """
+    Parses an ISO 8601 timestamp, e.g. '2025-06-30T15:45:00+02:00'.
+
+    Args:
+        value: Timestamp string or datetime, a timestamp without offset is market time (Europe/Warsaw), as DuckDB
+            connections compare it in that time zone (see `ConnectionPool`).
+
+    Returns:
+        A datetime.datetime object, or None if the input is None.
+
+    Raises:
+        ValueError: If the input string is not an ISO 8601 timestamp.
+    """
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+
+    if not re.match(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}', value):
+        raise ValueError("Invalid datetime")
+
+    return datetime.datetime.fromisoformat(value)
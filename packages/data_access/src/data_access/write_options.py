@@ -0,0 +1,73 @@
+import dataclasses
+from dataclasses import dataclass
+
+from data_access.manifest import dataset_of
+
+# year partitioned datasets are sorted by date and split into small row groups, so readers skip row groups outside
+# of the requested range
+CURRENCY_SORT = ['effective_date', 'code']
+YEARLY_ROW_GROUP_SIZE = 10_240
+# compacted files are written once and read for years, a higher zstd level is worth the slower write
+COMPACTED_COMPRESSION_LEVEL = 9
+
+
+@dataclass(frozen=True)
+class WriteOptions:
+    """
+    Physical layout of parquet files written by `DuckS3.write_data`.
+
+    Attributes:
+        compression: Parquet compression codec
+        compression_level: Level of the codec, None means DuckDB's default
+        row_group_size: Number of rows per row group, smaller groups can be skipped more selectively by readers,
+            None means DuckDB's default (122 880)
+        sort_by: Columns to sort rows by, so min/max statistics of row groups let readers skip data
+        partition_by: Hive partition columns, the written path is then the root directory of the dataset
+        append: For partitioned writes, new files get unique names instead of replacing files of the partition
+        atomic: Files are written under a staging prefix first and moved to the target only after the whole
+            write succeeded, so a failed write leaves nothing behind and readers never open a partial file
+    """
+    compression: str = 'zstd'
+    compression_level: int | None = 3
+    row_group_size: int | None = None
+    sort_by: tuple[str, ...] = ()
+    partition_by: tuple[str, ...] = ()
+    append: bool = False
+    atomic: bool = True
+
+    def replace(self, **changes) -> 'WriteOptions':
+        return dataclasses.replace(self, **changes)
+
+    def copy_options(self) -> str:
+        """Options of the DuckDB COPY statement"""
+        options = ['FORMAT PARQUET', f'COMPRESSION {self.compression}']
+        if self.compression_level is not None:
+            options.append(f'COMPRESSION_LEVEL {self.compression_level}')
+        if self.row_group_size:
+            options.append(f'ROW_GROUP_SIZE {self.row_group_size}')
+        if self.partition_by:
+            options.append(f"PARTITION_BY ({', '.join(self.partition_by)})")
+            if self.append:
+                options.append("FILENAME_PATTERN '{uuid}', APPEND")
+            else:
+                options.append('OVERWRITE_OR_IGNORE')
+        return ', '.join(options)
+
+
+# layout of every dataset, chosen for the filters its readers use
+DATASET_LAYOUTS = {
+    'news': WriteOptions(sort_by=('date',)),
+    'news_isin_index': WriteOptions(sort_by=('isin', 'date')),
+    'ohlc': WriteOptions(sort_by=('isin', 'datetime'), partition_by=('year', 'month', 'day')),
+    'ohlc_daily': WriteOptions(sort_by=('isin', 'date'), partition_by=('year', 'month', 'day')),
+    'ohlc_seed': WriteOptions(sort_by=('isin', 'datetime')),
+    'companies_metadata': WriteOptions(sort_by=('company_isin',)),
+    'llm_summaries': WriteOptions(sort_by=('date',), partition_by=('year', 'month'), append=True),
+    'currencies': WriteOptions(sort_by=tuple(CURRENCY_SORT), row_group_size=YEARLY_ROW_GROUP_SIZE),
+    'gold_prices': WriteOptions(sort_by=('date',), row_group_size=YEARLY_ROW_GROUP_SIZE),
+}
+
+
+def layout_of(path: str) -> WriteOptions:
+    """Returns write options of the dataset the path belongs to, defaults for datasets without a layout"""
+    return DATASET_LAYOUTS.get(dataset_of(path), WriteOptions())
@@ -0,0 +1,30 @@
+import pytest
+from data_access import DuckS3
+from data_access.synthetic import generate
+
+
+def bucket_name(*parts: str) -> str:
+    """Bucket named after the test module and parts, storages are process-wide per bucket"""
+    module = parts[0].rsplit('.', 1)[-1].removeprefix('test_')
+    return '-'.join((module, *parts[1:])).replace('_', '-').lower()
+
+
+@pytest.fixture
+def ducks3(tmp_path, monkeypatch, request):
+    """Empty bucket of its own in local storage, without result cache"""
+    monkeypatch.setenv('STORAGE_BACKEND', 'local')
+    monkeypatch.setenv('LOCAL_STORAGE_ROOT', str(tmp_path))
+    monkeypatch.setenv('RESULT_CACHE_MAX_BYTES', '0')
+    return DuckS3(bucket=bucket_name(request.module.__name__, request.node.name))
+
+
+@pytest.fixture(scope='module')
+def market(tmp_path_factory, request):
+    """Bucket with synthetic data generated by the `CONFIG` of the test module, shared by its read-only tests"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('STORAGE_BACKEND', 'local')
+        monkeypatch.setenv('LOCAL_STORAGE_ROOT', str(tmp_path_factory.mktemp('buckets')))
+        monkeypatch.setenv('RESULT_CACHE_MAX_BYTES', '0')
+        client = DuckS3(bucket=bucket_name(request.module.__name__, 'market'))
+        generate(client, request.module.CONFIG)
+        yield client
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from data_access.async_client import AsyncDuckS3
+from data_access.pool import ConnectionPool, QueryCancelled
+
+
+class SlowReader:
+    """Stands in for DuckS3, runs a query long enough to be cancelled"""
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.running = 0
+        self.max_running = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def slow_query(self) -> int:
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            with self.pool.acquire() as conn:
+                return conn.sql("SELECT SUM(a) FROM range(10000000000) t(a)").fetchone()[0]
+        except QueryCancelled as e:
+            self.errors.append(e)
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def iter_range(self, rows: int, batch_size: int):
+        with self.pool.acquire() as conn:
+            yield from conn.sql(f"SELECT * FROM range({rows}) t(a)").to_arrow_reader(batch_size)
+
+    def sleep(self, seconds: float) -> float:
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(seconds)
+        with self._lock:
+            self.running -= 1
+        return seconds
+
+
+@pytest.fixture
+def reader():
+    pool = ConnectionPool(size=2, is_minio=False)
+    yield SlowReader(pool)
+    pool.close()
+
+
+def test_cancel_interrupts_running_query(reader):
+    async def scenario():
+        ducks3 = AsyncDuckS3(reader)
+        task = asyncio.ensure_future(ducks3.slow_query())
+        await asyncio.sleep(0.3)
+        started = time.monotonic()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 5
+    assert len(reader.errors) == 1
+
+
+def test_concurrency_is_capped(reader):
+    async def scenario():
+        ducks3 = AsyncDuckS3(reader)
+        return await asyncio.gather(*(ducks3.sleep(0.05) for _ in range(6)))
+
+    assert asyncio.run(scenario()) == [0.05] * 6
+    assert reader.max_running == 2
+
+
+def test_generator_methods_are_streamed(reader):
+    async def scenario():
+        ducks3 = AsyncDuckS3(reader)
+        return [batch.num_rows async for batch in ducks3.iter_range(10, batch_size=4)]
+
+    assert asyncio.run(scenario()) == [4, 4, 2]
+
+
+def test_stopped_stream_returns_connection(reader):
+    async def scenario():
+        ducks3 = AsyncDuckS3(reader)
+        batches = ducks3.iter_range(1_000_000, batch_size=1_000)
+        await anext(batches)
+        await batches.aclose()
+
+    asyncio.run(scenario())
+    assert reader.pool._idle.qsize() == 1
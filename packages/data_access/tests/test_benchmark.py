@@ -0,0 +1,32 @@
+import datetime
+
+from data_access.benchmark import CASES, find_regressions, run_benchmark
+from data_access.synthetic import SyntheticConfig
+
+METRICS = {'rows': 10, 'seconds': 0.1, 'cold_seconds': 0.2, 'peak_rss_bytes': 10 ** 7, 'bytes_read': 1000,
+           'files_opened': 2}
+
+
+def test_find_regressions_applies_tolerances():
+    baseline = {'small': {'gold_prices_all': METRICS}}
+    noisy = {**METRICS, 'seconds': 0.12, 'peak_rss_bytes': 1.1 * 10 ** 7}
+    assert find_regressions({'small': {'gold_prices_all': noisy}}, baseline) == []
+
+    slower = {**METRICS, 'seconds': 0.5, 'files_opened': 3}
+    regressions = find_regressions({'small': {'gold_prices_all': slower, 'new_case': METRICS}}, baseline)
+    assert [regression.split(':')[1].split()[0] for regression in regressions] == ['seconds', 'files_opened']
+
+
+def test_run_benchmark_measures_reads(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'local')
+    monkeypatch.setenv('LOCAL_STORAGE_ROOT', str(tmp_path))
+    config = SyntheticConfig(years=0.05, isins=2, seed_years=0, ticks_per_day=5, news_per_day=2,
+                             end_date=datetime.date(2025, 3, 31))
+    cases = [case for case in CASES if case.name in ('ohlc_minutely_day', 'gold_prices_all')]
+
+    results = run_benchmark({'tiny': config}, cases, repeat=1)
+
+    assert results['tiny']['ohlc_minutely_day']['rows'] == 10
+    for metrics in results['tiny'].values():
+        assert metrics['bytes_read'] > 0 and metrics['files_opened'] > 0
+    assert find_regressions(results, results) == []
@@ -0,0 +1,106 @@
+import contextvars
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from data_access.disk_cache import DiskCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / 'cache'), max_bytes=250, immutable_prefixes=['ohlc_seed/'])
+
+
+def fetcher(calls: list, size: int = 100):
+    def fetch(key, local_path):
+        calls.append(key)
+        with open(local_path, 'wb') as f:
+            f.write(b'x' * size)
+
+    return fetch
+
+
+def test_hit_does_not_fetch_again(cache):
+    calls = []
+    first = cache.get('ohlc_seed/a.parquet', 'etag1', fetcher(calls))
+    second = cache.get('ohlc_seed/a.parquet', 'etag1', fetcher(calls))
+    assert first == second
+    assert calls == ['ohlc_seed/a.parquet']
+
+
+def test_new_etag_is_fetched(cache):
+    calls = []
+    first = cache.get('ohlc_seed/a.parquet', 'etag1', fetcher(calls))
+    second = cache.get('ohlc_seed/a.parquet', 'etag2', fetcher(calls))
+    assert first != second
+    assert len(calls) == 2
+
+
+def test_local_path_keeps_hive_partitions(cache):
+    path = cache.local_path('ohlc/year=2025/month=3/day=1/data_0.parquet', 'abc')
+    assert path.endswith('abc/ohlc/year=2025/month=3/day=1/data_0.parquet')
+
+
+def test_least_recently_used_is_evicted(cache):
+    calls = []
+    a = cache.get('ohlc_seed/a.parquet', 'e', fetcher(calls))
+    b = cache.get('ohlc_seed/b.parquet', 'e', fetcher(calls))
+    cache.get('ohlc_seed/a.parquet', 'e', fetcher(calls))
+    cache.get('ohlc_seed/c.parquet', 'e', fetcher(calls))
+
+    assert cache._size <= cache.max_bytes
+    assert a in cache._entries
+    assert b not in cache._entries
+
+
+def test_entries_survive_restart(cache):
+    path = cache.get('ohlc_seed/a.parquet', 'e', fetcher([]))
+    restarted = DiskCache(cache.directory, max_bytes=250)
+    assert path in restarted._entries
+
+
+def test_is_immutable(cache):
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    today = datetime.date.today()
+    assert cache.is_immutable('ohlc_seed/2025-01-01.parquet')
+    assert cache.is_immutable(f'news/year={yesterday.year}/month={yesterday.month}/day={yesterday.day}/a.parquet')
+    assert not cache.is_immutable(f'news/year={today.year}/month={today.month}/day={today.day}/a.parquet')
+    assert not cache.is_immutable('gold_prices/gold_prices.parquet')
+    cache.mark_immutable('gold_prices/')
+    assert cache.is_immutable('gold_prices/gold_prices.parquet')
+
+
+def test_pinned_files_are_not_evicted(cache):
+    # working set of one query is larger than the budget, all its files must exist until it runs
+    with cache.pinned():
+        paths = [cache.get(f'ohlc_seed/{name}.parquet', 'e', fetcher([])) for name in 'abcd']
+        assert all(os.path.exists(path) for path in paths)
+        assert cache._size > cache.max_bytes
+
+    assert cache._size <= cache.max_bytes
+    assert [os.path.exists(path) for path in paths] == [False, False, True, True]
+
+
+def test_concurrent_queries_keep_each_others_files(cache):
+    with cache.pinned():
+        first = [cache.get(f'ohlc_seed/{name}.parquet', 'e', fetcher([])) for name in 'ab']
+        with cache.pinned():
+            second = [cache.get(f'ohlc_seed/{name}.parquet', 'e', fetcher([])) for name in 'cd']
+        # files of the finished query are evicted to fit the budget, the running one keeps its own
+        assert all(os.path.exists(path) for path in first)
+        assert not any(os.path.exists(path) for path in second)
+    assert not cache._pins
+    assert all(os.path.exists(path) for path in first)
+
+
+def test_files_fetched_in_threads_of_the_context_are_pinned(cache):
+    names = 'abcd'
+    with cache.pinned():
+        contexts = [contextvars.copy_context() for _ in names]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            paths = list(executor.map(
+                lambda context, name: context.run(cache.get, f'ohlc_seed/{name}.parquet', 'e', fetcher([])),
+                contexts, names))
+        assert all(os.path.exists(path) for path in paths)
+    assert cache._size <= cache.max_bytes
@@ -0,0 +1,57 @@
+import datetime
+
+import polars as pl
+from data_access import DuckS3
+
+
+def metadata(day: datetime.date, *isins: str) -> pl.DataFrame:
+    return pl.DataFrame({'name': [f"SYN{isin[-1]}" for isin in isins], 'company_isin': list(isins),
+                         'sector': 'banki', 'date': day})
+
+
+def store_snapshot(ducks3: DuckS3, snapshot: pl.DataFrame) -> None:
+    """Writes a snapshot to the history as the metadata asset does"""
+    ducks3.write_data(snapshot, f"/companies_metadata/{snapshot.get_column('date')[0]}T18:00:00.parquet")
+
+
+def test_company_metadata_reads_the_published_snapshot(ducks3):
+    old, new = datetime.date(2025, 3, 28), datetime.date(2025, 3, 31)
+    store_snapshot(ducks3, metadata(old, 'PLSYN0000001', 'PLSYN0000002'))
+    newest = metadata(new, 'PLSYN0000001', 'PLSYN0000003')
+    store_snapshot(ducks3, newest)
+
+    # until a snapshot is published the newest one is found in the history
+    assert ducks3.get_latest_isins() == ['PLSYN0000001', 'PLSYN0000003']
+
+    ducks3.publish_latest('companies_metadata', newest)
+    assert ducks3.file_exists('/latest/companies_metadata.parquet')
+    # snapshots stored without publishing aren't read anymore, only the published object is opened
+    store_snapshot(ducks3, metadata(datetime.date(2025, 4, 1), 'PLSYN0000009'))
+
+    assert ducks3.get_latest_isins() == ['PLSYN0000001', 'PLSYN0000003']
+    assert ducks3.get_companies_metadata().equals(newest)
+    company = ducks3.get_companies_metadata(isin='PLSYN0000003')
+    assert company.get_column('company_isin').to_list() == ['PLSYN0000003']
+
+    newer = metadata(datetime.date(2025, 4, 2), 'PLSYN0000004')
+    store_snapshot(ducks3, newer)
+    ducks3.publish_latest('companies_metadata', newer)
+    assert ducks3.get_latest_isins() == ['PLSYN0000004']
+
+
+def test_llm_summary_reads_the_published_summary(ducks3):
+    def summary(at: datetime.datetime, text: str) -> pl.DataFrame:
+        return pl.DataFrame({'date': at, 'year': at.year, 'month': at.month, 'summary': text})
+
+    ducks3.write_data(summary(datetime.datetime(2025, 2, 27, 18), 'older'), '/llm_summaries')
+    newest = summary(datetime.datetime(2025, 3, 31, 18), 'newest')
+    ducks3.write_data(newest, '/llm_summaries')
+    assert ducks3.get_llm_summary() == (datetime.datetime(2025, 3, 31, 18), 'newest')
+
+    ducks3.publish_latest('llm_summaries', newest.select('date', 'summary'))
+    assert ducks3.get_llm_summary() == (datetime.datetime(2025, 3, 31, 18), 'newest')
+
+    published = summary(datetime.datetime(2025, 4, 1, 18), 'published')
+    ducks3.write_data(published, '/llm_summaries')
+    ducks3.publish_latest('llm_summaries', published.select('date', 'summary'))
+    assert ducks3.get_llm_summary() == (datetime.datetime(2025, 4, 1, 18), 'published')
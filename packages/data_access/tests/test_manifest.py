@@ -0,0 +1,113 @@
+import datetime
+
+import polars as pl
+import pytest
+from data_access import DuckS3
+from data_access.manifest import Manifest, ManifestEntry, ManifestStore, dataset_of
+from data_access.storage import PreconditionFailed
+
+
+class MemoryStorage:
+    """Conditional get/put of S3Storage kept in a dict, ETag is a counter of writes"""
+
+    uri = 's3://bucket'
+
+    def __init__(self):
+        self.objects: dict[str, tuple[bytes, str]] = {}
+        self.writes = 0
+
+    def get_bytes(self, path, if_none_match=None):
+        if path not in self.objects:
+            return None, None
+        data, etag = self.objects[path]
+        if etag == if_none_match:
+            return None, etag
+        return data, etag
+
+    def put_bytes(self, path, data, if_match=None, if_none_match=False):
+        current = self.objects.get(path)
+        if (if_none_match and current) or (if_match and (current is None or current[1] != if_match)):
+            raise PreconditionFailed(path)
+        self.writes += 1
+        self.objects[path] = (data, str(self.writes))
+        return str(self.writes)
+
+
+def entry(key: str, max_date: str = '2025-03-01') -> ManifestEntry:
+    return ManifestEntry(key=key, size=10, etag='e', last_modified='2025-03-01T12:00:00', rows=5,
+                         min_date='2025-03-01', max_date=max_date)
+
+
+def test_dataset_of_compacted_file():
+    assert dataset_of('news/year=2025/month=3/day=1/pap.parquet') == 'news'
+    assert dataset_of('compacted/news/2025-03/pap.parquet') == 'news'
+
+
+def test_json_round_trip():
+    manifest = Manifest('ohlc', {'ohlc/a.parquet': entry('ohlc/a.parquet')}, version=3)
+    assert Manifest.from_json(manifest.to_json(), 'etag') == Manifest('ohlc', manifest.entries, 3, 'etag')
+
+
+def test_glob_matches_keys():
+    keys = ['ohlc/year=2025/month=3/day=1/data_0.parquet', 'ohlc/year=2025/month=4/day=1/data_0.parquet',
+            'compacted/ohlc/2025-02/data_0.parquet']
+    manifest = Manifest('ohlc', {key: entry(key) for key in keys})
+    objects = manifest.glob('ohlc/year=2025/month=3/*/*.parquet', 's3://bucket')
+    assert [obj.path for obj in objects] == ['s3://bucket/ohlc/year=2025/month=3/day=1/data_0.parquet']
+    assert objects[0].last_modified == datetime.datetime(2025, 3, 1, 12)
+    assert len(manifest.glob('ohlc/**/*.parquet', 's3://bucket')) == 2
+
+
+def add(key: str):
+    def change(manifest: Manifest) -> None:
+        manifest.entries[key] = entry(key)
+
+    return change
+
+
+def test_update_bootstraps_missing_manifest():
+    store = ManifestStore(MemoryStorage())
+    assert store.load('news') is None
+    store.update('news', add('news/b.parquet'),
+                 bootstrap=lambda: Manifest('news', {'news/a.parquet': entry('news/a.parquet')}))
+    assert set(store.load('news').entries) == {'news/a.parquet', 'news/b.parquet'}
+
+
+def test_concurrent_update_is_retried():
+    storage = MemoryStorage()
+    first, second = ManifestStore(storage), ManifestStore(storage)
+    first.update('news', add('news/a.parquet'), bootstrap=lambda: Manifest('news'))
+    second.load('news')
+    first.update('news', add('news/b.parquet'), bootstrap=lambda: Manifest('news'))
+
+    # second store holds a stale copy, its write is rejected and applied again on the current manifest
+    manifest = second.update('news', add('news/c.parquet'), bootstrap=lambda: Manifest('news'))
+    assert set(manifest.entries) == {'news/a.parquet', 'news/b.parquet', 'news/c.parquet'}
+    assert manifest.version == 3
+
+
+def test_update_gives_up_after_max_retries():
+    class ConflictingStorage(MemoryStorage):
+        def put_bytes(self, *args, **kwargs):
+            raise PreconditionFailed('conflict')
+
+    store = ManifestStore(ConflictingStorage(), max_retries=2)
+    with pytest.raises(RuntimeError):
+        store.update('news', add('news/a.parquet'), bootstrap=lambda: Manifest('news'))
+
+
+def test_data_version_changes_with_written_files(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'local')
+    monkeypatch.setenv('LOCAL_STORAGE_ROOT', str(tmp_path))
+    ducks3 = DuckS3(bucket='versions')
+    assert ducks3.data_version('get_gold_prices') is None
+
+    ducks3.append_gold_prices(pl.DataFrame({'date': [datetime.date(2025, 1, 2)], 'price': [322.0]}))
+    tag, last_modified = ducks3.data_version('get_gold_prices')
+    assert ducks3.data_version('get_gold_prices') == (tag, last_modified)
+
+    ducks3.append_gold_prices(pl.DataFrame({'date': [datetime.date(2025, 1, 3)], 'price': [323.0]}))
+    new_tag, new_last_modified = ducks3.data_version('get_gold_prices')
+    assert new_tag != tag and new_last_modified >= last_modified
+    # methods not declaring the datasets they read have no version
+    assert ducks3.data_version('file_exists') is None
@@ -0,0 +1,53 @@
+import datetime
+
+import polars as pl
+from data_access import DuckS3
+
+ISIN = 'PLPKN0000018'
+TODAY = datetime.date.today()
+
+
+def articles(*links: str, day: datetime.date = TODAY, isins: list[str] | None = None) -> pl.DataFrame:
+    published = datetime.datetime.combine(day, datetime.time(8))
+    return pl.DataFrame({'title': list(links), 'link': list(links), 'date': [published] * len(links),
+                         'summary': [''] * len(links), 'company_isins': [isins or [ISIN]] * len(links)},
+                        schema_overrides={'company_isins': pl.List(pl.String)})
+
+
+def store_legacy(ducks3: DuckS3, news: pl.DataFrame, day: datetime.date) -> None:
+    """Writes a partition as the pipeline did before `write_news`, without deduplication or ISIN index"""
+    ducks3.write_data(news, f"/news/year={day.year}/month={day.month}/day={day.day}/BankierSource.parquet")
+
+
+def test_company_news_written_before_the_index_are_kept(ducks3):
+    day = TODAY - datetime.timedelta(days=30)
+    store_legacy(ducks3, articles('old1', 'old2', day=day), day)
+    assert ducks3.get_news(isin=ISIN).height == 2
+
+    ducks3.write_news(articles('new'), 'BankierSource')
+
+    assert sorted(ducks3.get_news(isin=ISIN).get_column('link')) == ['new', 'old1', 'old2']
+    assert sorted(ducks3.get_news(only_isin=True).get_column('link')) == ['new', 'old1', 'old2']
+
+
+def test_legacy_duplicates_are_returned_once(ducks3):
+    for days_ago in (20, 10):
+        day = TODAY - datetime.timedelta(days=days_ago)
+        store_legacy(ducks3, articles('old', day=day), day)
+    ducks3.write_news(articles('new'), 'BankierSource')
+
+    assert sorted(ducks3.get_news().get_column('link')) == ['new', 'old']
+    assert ducks3.get_news(isin=ISIN).get_column('link').to_list().count('old') == 1
+
+
+def test_write_news_lookback_boundary(ducks3):
+    recent, old = TODAY - datetime.timedelta(days=3), TODAY - datetime.timedelta(days=8)
+    store_legacy(ducks3, articles('recent', day=recent), recent)
+    store_legacy(ducks3, articles('old', day=old), old)
+
+    written = ducks3.write_news(articles('recent', 'old', 'new'), 'BankierSource', lookback_days=7)
+
+    # links stored within the lookback are skipped, older ones are stored again but read once
+    assert sorted(written.get_column('link')) == ['new', 'old']
+    assert sorted(ducks3.get_news().get_column('link')) == ['new', 'old', 'recent']
+    assert sorted(ducks3.get_news(isin=ISIN).get_column('link')) == ['new', 'old', 'recent']
@@ -0,0 +1,176 @@
+import datetime
+
+import polars as pl
+import pytest
+from data_access import DuckS3
+from data_access.pool import ConnectionPool
+from data_access.synthetic import SyntheticConfig, generate
+
+CONFIG = SyntheticConfig(years=0.02, isins=2, seed_years=0, ticks_per_day=10, news_per_day=1,
+                         end_date=datetime.date(2025, 3, 31), seed=3)
+
+
+def test_minutely_filters(market):
+    day = CONFIG.end_date.isoformat()
+    ticks = market.get_ohlc_minutely(date_from=day)
+    assert ticks.height == CONFIG.isins * CONFIG.ticks_per_day
+    assert ticks.columns.count('date') == 1 and 'date_1' not in ticks.columns
+    assert (ticks.get_column('date').dt.date() == CONFIG.end_date).all()
+    assert market.get_ohlc_minutely(date_from=day, date_to=day).height == ticks.height
+    assert set(market.get_ohlc_minutely(date_from=day, isin='PLSYN0000001').get_column('isin')) == {'PLSYN0000001'}
+
+
+def test_ticks_since(market):
+    ticks = market.get_ohlc_minutely(date_from=CONFIG.end_date.isoformat())
+    newest = ticks.get_column('datetime').max()
+
+    since = market.get_ohlc_minutely(since=newest.isoformat())
+    assert since.height == CONFIG.isins and (since.get_column('datetime') == newest).all()
+    # naive timestamps are market time
+    naive = newest.replace(tzinfo=None).isoformat()
+    assert market.get_ohlc_minutely(since=naive).height == CONFIG.isins
+    assert market.get_ohlc_minutely(since=(newest + datetime.timedelta(minutes=1)).isoformat()).height == 0
+    with pytest.raises(ValueError):
+        market.get_ohlc_minutely(since='yesterday')
+
+
+def test_daily_filters_and_columns(market):
+    daily = market.aggregate_ohlc_daily(isin='PLSYN0000001', date_from='2025-03-20', columns=['close'])
+    assert daily.columns == ['date', 'isin', 'close']
+    assert set(daily.get_column('isin')) == {'PLSYN0000001'}
+    assert daily.get_column('date').min() >= datetime.date(2025, 3, 20)
+    with pytest.raises(ValueError):
+        market.aggregate_ohlc_daily(columns=['price'])
+
+
+def test_daily_pages(market):
+    everything = market.aggregate_ohlc_daily()
+    pages, after = [], None
+    while not pages or pages[-1].height == 5:
+        pages.append(market.aggregate_ohlc_daily(limit=5, after=after))
+        if pages[-1].height:
+            after = pages[-1].select('isin', 'date').row(-1)
+    assert len(pages) > 2
+    assert pl.concat(pages).equals(everything)
+
+
+def test_resampled_bars(market):
+    day = CONFIG.end_date.isoformat()
+    ticks = market.get_ohlc_minutely(date_from=day, isin='PLSYN0000001').sort('datetime')
+    bars = market.resample_ohlc('1h', isin='PLSYN0000001')
+    assert bars.get_column('volume').sum() == ticks.get_column('volume').sum()
+    assert bars.get_column('open')[0] == ticks.get_column('price')[0]
+    assert bars.get_column('high').max() == ticks.get_column('price').max()
+
+    daily = market.aggregate_ohlc_daily(isin='PLSYN0000001')
+    weekly = market.resample_ohlc('1w', isin='PLSYN0000001')
+    assert weekly.height < daily.height and (weekly.get_column('date').dt.weekday() == 1).all()
+    assert weekly.get_column('close')[-1] == daily.get_column('close')[-1]
+    with pytest.raises(ValueError):
+        market.resample_ohlc('2h')
+
+
+def test_resampled_bars_without_filters(market, monkeypatch):
+    # without a date of the newest partition nor any filter, intraday bars cover all ticks
+    monkeypatch.setattr(market, 'last_ohlc_date', lambda: None)
+    bars = market.resample_ohlc('1h')
+    assert bars.get_column('volume').sum() == market.get_ohlc_minutely().get_column('volume').sum()
+    assert bars.get_column('date').dt.date().n_unique() > 1
+
+
+@pytest.fixture
+def fresh(ducks3):
+    """Bucket of its own with the same data, for tests writing data"""
+    generate(ducks3, CONFIG)
+    return ducks3
+
+
+def daily_from_ticks(ticks: pl.DataFrame) -> pl.DataFrame:
+    return (ticks.sort('datetime')
+            .group_by(pl.col('date').dt.date(), 'isin')
+            .agg(open=pl.col('price').first(), close=pl.col('price').last(), low=pl.col('price').min(),
+                 high=pl.col('price').max(), volume=pl.col('volume').sum())
+            .sort('isin', 'date'))
+
+
+def test_daily_rollup_matches_ticks(market):
+    ticks = market.get_ohlc_minutely(date_from=CONFIG.tick_start.isoformat())
+    daily = market.aggregate_ohlc_daily(date_from=CONFIG.tick_start.isoformat())
+    assert daily.equals(daily_from_ticks(ticks).select(daily.columns), null_equal=True)
+
+
+def test_daily_seed_precedes_rollup(fresh):
+    # daily history of the week before the ticks, in the file the seed asset writes
+    days = [CONFIG.tick_start - datetime.timedelta(days=offset) for offset in range(7, 0, -1)]
+    seed = pl.DataFrame({'datetime': [datetime.datetime.combine(day, datetime.time()) for day in days],
+                         'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 100, 'isin': 'PLSYN0000001'}) \
+        .with_columns(pl.col('datetime').dt.replace_time_zone('Europe/Warsaw'))
+    seed_name = datetime.datetime.combine(CONFIG.tick_start, datetime.time(18)).isoformat()
+    fresh.write_data(seed, f"/ohlc_seed/{seed_name}.parquet")
+
+    daily = fresh.aggregate_ohlc_daily(isin='PLSYN0000001')
+    rollup_start = fresh.get_ohlc_minutely().get_column('date').min().date()
+    from_seed, rollup = daily.filter(pl.col('date') < rollup_start), daily.filter(pl.col('date') >= rollup_start)
+    assert from_seed.get_column('date').to_list() == days
+    assert rollup.height > 0 and daily.get_column('date').is_unique().all()
+    # a range starting after the seed reads only the rollup
+    assert fresh.aggregate_ohlc_daily(isin='PLSYN0000001', date_from=rollup_start.isoformat()).equals(rollup)
+
+
+def test_daily_rollup_update_rewrites_one_day(fresh):
+    last_day = CONFIG.end_date
+    new_day = last_day + datetime.timedelta(days=1)
+    untouched = {obj.key: obj.etag for obj in fresh.storage.list_objects('ohlc_daily/')}
+
+    ticks = (fresh.get_ohlc_minutely(date_from=last_day.isoformat())
+             .with_columns(pl.col('datetime', 'date') + datetime.timedelta(days=1))
+             .with_columns(year=pl.col('date').dt.year(), month=pl.col('date').dt.month(),
+                           day=pl.col('date').dt.day()))
+    fresh.write_data(ticks, '/ohlc')
+    fresh.update_ohlc_daily_rollup(new_day)
+
+    objects = {obj.key: obj.etag for obj in fresh.storage.list_objects('ohlc_daily/')}
+    assert {key: objects[key] for key in untouched} == untouched
+    assert [key for key in objects if key not in untouched] == [
+        f'ohlc_daily/year={new_day.year}/month={new_day.month}/day={new_day.day}/data_0.parquet']
+
+    expected = daily_from_ticks(ticks)
+    daily = fresh.aggregate_ohlc_daily(date_from=new_day.isoformat())
+    assert daily.equals(expected.select(daily.columns), null_equal=True)
+
+    # later ticks of the same day replace its rollup instead of adding rows
+    more = ticks.with_columns(pl.col('datetime') + datetime.timedelta(minutes=30), volume=pl.lit(1, pl.Int64))
+    fresh.write_data(pl.concat([ticks, more]), '/ohlc')
+    fresh.update_ohlc_daily_rollup(new_day)
+    daily = fresh.aggregate_ohlc_daily(date_from=new_day.isoformat())
+    assert daily.height == CONFIG.isins
+    assert daily.get_column('volume').to_list() == (expected.get_column('volume') + 10).to_list()
+
+
+def test_partition_files_are_pruned_and_compacted_files_preferred(fresh):
+    day = CONFIG.end_date - datetime.timedelta(days=3)
+    daily, compacted = fresh._partition_files('ohlc', date_from=day, date_to=day)
+    assert [obj.key for obj in daily] == [f'ohlc/year={day.year}/month={day.month}/day={day.day}/data_0.parquet']
+    assert compacted == []
+    before = fresh.get_ohlc_minutely(date_from=day.isoformat(), date_to=day.isoformat())
+    everything = fresh.get_ohlc_minutely()
+
+    fresh.compact_partitions('ohlc')
+
+    daily, compacted = fresh._partition_files('ohlc', date_from=day, date_to=day)
+    assert daily == [] and [obj.key for obj in compacted] == [f'compacted/ohlc/{day:%Y-%m}/data_0.parquet']
+    assert fresh._partition_files('ohlc', date_from=CONFIG.end_date + datetime.timedelta(days=1)) == ([], [])
+    after = fresh.get_ohlc_minutely(date_from=day.isoformat(), date_to=day.isoformat())
+    # rows now come from the compacted file, its columns are in the order it was written in
+    columns = [column for column in before.columns if column != 'filename']
+    assert after.select(columns).sort('isin', 'datetime').equals(before.select(columns).sort('isin', 'datetime'))
+    assert fresh.get_ohlc_minutely().height == everything.height
+
+
+def test_compaction_with_a_single_connection(fresh):
+    # registering compacted files reads their statistics on a connection of its own
+    client = DuckS3(bucket=fresh.bucket, pool=ConnectionPool(size=1, is_minio=False, timeout=1))
+    everything = client.get_ohlc_minutely()
+    compaction = client.compact_partitions('ohlc')
+    assert compaction.written and compaction.deleted
+    assert client.get_ohlc_minutely().height == everything.height
@@ -0,0 +1,78 @@
+from datetime import date
+
+import pytest
+from data_access.partitions import months_between, partition_globs, partition_date, in_date_range, \
+    hive_date_predicate, compacted_path, compacted_period, period_in_date_range, drop_compacted
+
+
+def test_months_between_crosses_year():
+    assert months_between(date(2024, 11, 20), date(2025, 2, 1)) == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+
+
+def test_partition_globs_without_lower_bound_covers_whole_dataset():
+    assert partition_globs('s3://b/ohlc', None, date(2025, 1, 1)) == ['s3://b/ohlc/**/*.parquet']
+
+
+def test_partition_globs_per_month():
+    globs = partition_globs('s3://b/news', date(2025, 1, 30), date(2025, 2, 2), file_pattern='BankierSource.parquet')
+    assert globs == ['s3://b/news/year=2025/month=1/*/BankierSource.parquet',
+                     's3://b/news/year=2025/month=2/*/BankierSource.parquet']
+
+
+def test_partition_globs_per_year_for_long_ranges():
+    globs = partition_globs('s3://b/ohlc', date(2023, 5, 1), date(2025, 2, 2))
+    assert globs == ['s3://b/ohlc/year=2023/*/*/*.parquet',
+                     's3://b/ohlc/year=2024/*/*/*.parquet',
+                     's3://b/ohlc/year=2025/*/*/*.parquet']
+
+
+@pytest.mark.parametrize("path, expected",
+                         [("s3://b/ohlc/year=2025/month=3/day=7/data_0.parquet", date(2025, 3, 7)),
+                          ("s3://b/ohlc_seed/2025-03-07.parquet", None)])
+def test_partition_date(path, expected):
+    assert partition_date(path) == expected
+
+
+def test_in_date_range():
+    path = "s3://b/ohlc/year=2025/month=3/day=7/data_0.parquet"
+    assert in_date_range(path, date(2025, 3, 7), date(2025, 3, 7))
+    assert not in_date_range(path, date(2025, 3, 8), None)
+    assert not in_date_range(path, None, date(2025, 3, 6))
+
+
+def test_hive_date_predicate():
+    assert hive_date_predicate(None, None) == ""
+    assert hive_date_predicate(date(2025, 3, 7), date(2025, 12, 31)) == \
+           "(year * 10000 + month * 100 + day) >= 20250307 AND (year * 10000 + month * 100 + day) <= 20251231"
+
+
+def test_compacted_path_roundtrip():
+    monthly = compacted_path('s3://b/compacted/news', 2025, 3, 'BankierSource.parquet')
+    yearly = compacted_path('s3://b/compacted/news', 2024, None, 'BankierSource.parquet')
+    assert monthly == 's3://b/compacted/news/2025-03/BankierSource.parquet'
+    assert compacted_period(monthly) == (2025, 3)
+    assert compacted_period(yearly) == (2024, None)
+
+
+def test_period_in_date_range():
+    assert period_in_date_range(2025, 3, date(2025, 3, 31), None)
+    assert not period_in_date_range(2025, 3, date(2025, 4, 1), None)
+    assert period_in_date_range(2024, None, None, date(2024, 1, 1))
+    assert not period_in_date_range(2024, None, date(2025, 1, 1), None)
+
+
+def test_drop_compacted_prefers_coarser_files_with_same_name():
+    daily = ['s3://b/news/year=2025/month=3/day=1/BankierSource.parquet',
+             's3://b/news/year=2025/month=3/day=1/InteriaSource.parquet',
+             's3://b/news/year=2025/month=4/day=1/BankierSource.parquet',
+             's3://b/news/year=2024/month=5/day=1/BankierSource.parquet']
+    compacted = ['s3://b/compacted/news/2025-03/BankierSource.parquet',
+                 's3://b/compacted/news/2024-05/BankierSource.parquet',
+                 's3://b/compacted/news/2024/BankierSource.parquet']
+
+    remaining_daily, remaining_compacted = drop_compacted(daily, compacted)
+
+    assert remaining_daily == ['s3://b/news/year=2025/month=3/day=1/InteriaSource.parquet',
+                               's3://b/news/year=2025/month=4/day=1/BankierSource.parquet']
+    assert remaining_compacted == ['s3://b/compacted/news/2025-03/BankierSource.parquet',
+                                   's3://b/compacted/news/2024/BankierSource.parquet']
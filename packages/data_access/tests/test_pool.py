@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from data_access.pool import ConnectionPool
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool(size=2, is_minio=False, timeout=1)
+    yield pool
+    pool.close()
+
+
+def test_cursor_has_settings_applied(pool):
+    with pool.acquire() as conn:
+        assert conn.sql("SELECT current_setting('TimeZone')").fetchone()[0] == 'Europe/Warsaw'
+
+
+def test_connections_are_reused(pool):
+    with pool.acquire():
+        pass
+    with pool.acquire():
+        pass
+    assert pool._created == 1
+
+
+def test_cursor_state_does_not_leak(pool):
+    with pool.acquire() as conn:
+        conn.sql("CREATE TEMP TABLE leftover AS SELECT 1 AS x")
+    with pool.acquire() as conn:
+        tables = conn.sql("SELECT table_name FROM duckdb_tables() WHERE temporary").fetchall()
+    assert tables == []
+
+
+def test_exhausted_pool_times_out(pool):
+    with pool.acquire(), pool.acquire():
+        with pytest.raises(TimeoutError):
+            with pool.acquire():
+                pass
+
+
+def test_unhealthy_connection_is_replaced(pool):
+    with pool.acquire():
+        pass
+    broken = pool._idle.get_nowait()
+    broken.close()
+    pool._idle.put_nowait(broken)
+    with pool.acquire() as conn:
+        assert conn.sql("SELECT 42").fetchone()[0] == 42
+
+
+def test_failed_replacement_frees_its_slot(pool, monkeypatch):
+    with pool.acquire():
+        pass
+    broken = pool._idle.get_nowait()
+    broken.close()
+    pool._idle.put_nowait(broken)
+
+    def fail():
+        raise RuntimeError("can't open database")
+
+    monkeypatch.setattr(pool, '_new_connection', fail)
+    with pytest.raises(RuntimeError):
+        with pool.acquire():
+            pass
+    assert pool._created == 0
+
+    monkeypatch.undo()
+    with pool.acquire(), pool.acquire():
+        pass
+
+
+def test_concurrent_use(pool):
+    def query(i):
+        with pool.acquire() as conn:
+            return conn.sql(f"SELECT SUM(range) FROM range({i})").fetchone()[0]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(query, range(1, 50)))
+    assert results == [sum(range(i)) for i in range(1, 50)]
+    assert pool._created <= pool.size
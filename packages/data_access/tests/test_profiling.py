@@ -0,0 +1,60 @@
+import datetime
+
+import polars as pl
+import pytest
+from data_access import DuckS3, MetricsRegistry, get_metrics, recent_profiles
+from data_access.pool import ConnectionPool
+
+
+@pytest.fixture
+def ducks3(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'local')
+    monkeypatch.setenv('LOCAL_STORAGE_ROOT', str(tmp_path))
+    monkeypatch.setenv('RESULT_CACHE_MAX_BYTES', '0')
+    client = DuckS3(bucket='profiled', pool=ConnectionPool(size=1))
+    prices = pl.DataFrame({'date': [datetime.date(2024, 12, 31), datetime.date(2025, 1, 2)], 'price': [320.5, 322.0]})
+    client.append_gold_prices(prices)
+    return client
+
+
+@pytest.mark.parametrize('level', ['1', 'io'])
+def test_query_profile(ducks3, monkeypatch, level):
+    monkeypatch.setenv('QUERY_PROFILING', level)
+
+    ducks3.get_gold_prices(date_from='2024-01-01')
+
+    profile = recent_profiles(1)[0]
+    assert profile.method == 'get_gold_prices' and profile.arguments['date_from'] == '2024-01-01'
+    assert profile.rows == 2 and profile.error is None and profile.io_logged == (level == 'io')
+    assert profile.files_opened == 2 and profile.bytes_read > 0
+    assert profile.plans and profile.duckdb_seconds > 0
+    assert profile.seconds >= profile.fetch_seconds >= profile.convert_seconds
+
+
+def test_failed_query_is_counted(ducks3):
+    with pytest.raises(ValueError):
+        ducks3.get_gold_prices(date_from='yesterday')
+
+    assert recent_profiles(1)[0].error == 'ValueError'
+    assert 'ducks3_queries_total{method="get_gold_prices",status="error"}' in get_metrics().render()
+
+
+def test_metrics_render_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    registry.describe('queries_total', 'counter', "Queries")
+    registry.inc('queries_total', method='get_news')
+    registry.inc('queries_total', 2, method='get_news')
+    registry.observe('query_seconds', 0.5, method='get_"news"')
+
+    assert registry.value('queries_total', method='get_news') == 3
+    assert registry.render().splitlines() == [
+        '# HELP queries_total Queries',
+        '# TYPE queries_total counter',
+        'queries_total{method="get_news"} 3',
+        '# TYPE query_seconds untyped',
+        'query_seconds_bucket{method="get_\\"news\\"",le="0.1"} 0',
+        'query_seconds_bucket{method="get_\\"news\\"",le="1"} 1',
+        'query_seconds_bucket{method="get_\\"news\\"",le="+Inf"} 1',
+        'query_seconds_sum{method="get_\\"news\\""} 0.5',
+        'query_seconds_count{method="get_\\"news\\""} 1',
+    ]
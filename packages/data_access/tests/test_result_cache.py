@@ -0,0 +1,87 @@
+import time
+
+import polars as pl
+import pyarrow as pa
+from data_access.result_cache import ResultCache, cached_result, size_of, _MISSING
+
+
+def frame(rows: int) -> pl.DataFrame:
+    return pl.DataFrame({'value': list(range(rows))})
+
+
+def test_changed_version_is_a_miss():
+    cache = ResultCache(max_bytes=10_000, ttl=60)
+    cache.put('key', frame(10), versions=('v1',))
+    assert cache.get('key', ('v1',)) is not _MISSING
+    assert cache.get('key', ('v2',)) is _MISSING
+    assert cache.size == 0
+
+
+def test_expired_entry_is_a_miss():
+    cache = ResultCache(max_bytes=10_000, ttl=0.01)
+    cache.put('key', frame(10), versions=())
+    time.sleep(0.02)
+    assert cache.get('key', ()) is _MISSING
+
+
+def test_least_recently_used_is_evicted_over_budget():
+    cache = ResultCache(max_bytes=2_000, ttl=60)
+    cache.put('a', frame(100), versions=())
+    cache.put('b', frame(100), versions=())
+    cache.get('a', ())
+    cache.put('c', frame(100), versions=())
+    assert cache.get('b', ()) is _MISSING
+    assert cache.get('a', ()) is not _MISSING
+    assert cache.size <= 2_000
+
+
+def test_arrow_table_size_counts_buffers():
+    table = pa.table({'value': list(range(1_000))})
+    assert size_of(table) == table.nbytes >= 8_000
+
+
+class Reader:
+    s3 = 's3://bucket'
+
+    def __init__(self):
+        self.result_cache = ResultCache(max_bytes=10_000, ttl=60)
+        self.version = 'v1'
+        self.calls = 0
+
+    def dataset_versions(self, datasets):
+        return tuple(self.version for _ in datasets)
+
+    @cached_result('gold_prices')
+    def read(self, date_from: str | None = None, columns: list[str] | None = None) -> pl.DataFrame:
+        self.calls += 1
+        return frame(3)
+
+    @cached_result('companies_metadata')
+    def isins(self) -> list[str]:
+        self.calls += 1
+        return ['PLPKN0000018', 'PLPZU0000011']
+
+
+def test_arguments_are_normalized():
+    reader = Reader()
+    reader.read('2025-01-01', ['value'])
+    reader.read(date_from='2025-01-01', columns=('value',))
+    assert reader.calls == 1
+
+
+def test_write_invalidates_cached_result():
+    reader = Reader()
+    reader.read()
+    reader.version = 'v2'
+    reader.read()
+    assert reader.calls == 2
+
+
+def test_cached_list_is_not_shared_with_callers():
+    reader = Reader()
+    reader.isins().append('PLKGHM000017')
+    isins = reader.isins()
+    assert isins == ['PLPKN0000018', 'PLPZU0000011']
+    isins.clear()
+    assert reader.isins() == ['PLPKN0000018', 'PLPZU0000011']
+    assert reader.calls == 1
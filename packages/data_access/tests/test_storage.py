@@ -0,0 +1,43 @@
+import os
+
+import pytest
+from data_access.storage import LocalStorage, PreconditionFailed
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage('bucket', root=str(tmp_path))
+
+
+def test_conditional_put(storage):
+    etag = storage.put_bytes('_manifests/news.json', b'1', if_none_match=True)
+    with pytest.raises(PreconditionFailed):
+        storage.put_bytes('_manifests/news.json', b'2', if_none_match=True)
+
+    new_etag = storage.put_bytes('_manifests/news.json', b'2', if_match=etag)
+    assert new_etag != etag
+    with pytest.raises(PreconditionFailed):
+        storage.put_bytes('_manifests/news.json', b'3', if_match=etag)
+    assert storage.get_bytes('_manifests/news.json') == (b'2', new_etag)
+    assert storage.get_bytes('_manifests/news.json', if_none_match=new_etag) == (None, new_etag)
+
+
+def test_glob_skips_hidden_files(storage):
+    for key in ['ohlc/year=2025/month=3/day=1/data_0.parquet', 'ohlc/year=2025/month=4/day=1/data_0.parquet']:
+        storage.put_bytes(key, b'x')
+    storage.put_bytes('ohlc/year=2025/month=3/day=1/.partial', b'x')
+
+    objects = storage.glob(f"{storage.uri}/ohlc/year=2025/month=3/*/*")
+    assert [obj.key for obj in objects] == ['ohlc/year=2025/month=3/day=1/data_0.parquet']
+    assert objects[0].path == f"{storage.uri}/ohlc/year=2025/month=3/day=1/data_0.parquet"
+
+
+def test_move_and_delete_remove_empty_directories(storage):
+    storage.put_bytes('_staging/abc/gold_prices/year=2025/2025.parquet', b'x')
+    storage.move(f"{storage.uri}/_staging/abc/gold_prices/year=2025/2025.parquet",
+                 f"{storage.uri}/gold_prices/year=2025/2025.parquet")
+    assert not os.path.exists(os.path.join(storage.uri, '_staging'))
+
+    storage.delete(['gold_prices/year=2025/2025.parquet', 'gold_prices/missing.parquet'])
+    assert storage.glob('gold_prices/**/*') == []
+    assert not os.path.exists(os.path.join(storage.uri, 'gold_prices'))
@@ -0,0 +1,35 @@
+import datetime
+
+import polars as pl
+from data_access import DuckS3, validate_isin
+from data_access.synthetic import SyntheticConfig, _daily_prices, _news, _ticks, generate
+
+CONFIG = SyntheticConfig(years=0.05, isins=3, seed_years=0, ticks_per_day=10, news_per_day=4,
+                         end_date=datetime.date(2025, 3, 31), seed=1)
+
+
+def test_same_seed_generates_same_data():
+    daily = _daily_prices(CONFIG)
+    assert daily.equals(_daily_prices(CONFIG))
+    assert _ticks(daily, CONFIG).equals(_ticks(_daily_prices(CONFIG), CONFIG))
+    assert _news(CONFIG).equals(_news(CONFIG))
+    assert not daily.equals(_daily_prices(SyntheticConfig(**{**vars(CONFIG), 'seed': 2})))
+
+    assert daily.select((pl.col('low') <= pl.min_horizontal('open', 'close')).all()).item()
+    for isin in daily.get_column('isin').unique():
+        validate_isin(isin)
+
+
+def test_generated_bucket_is_readable(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'local')
+    monkeypatch.setenv('LOCAL_STORAGE_ROOT', str(tmp_path))
+    ducks3 = DuckS3(bucket='synthetic')
+
+    rows = generate(ducks3, CONFIG)
+
+    assert rows['ohlc'] == ducks3.get_ohlc_minutely(date_from='2025-01-01').height
+    daily = ducks3.aggregate_ohlc_daily(date_from='2025-03-01')
+    assert daily.get_column('date').max() == CONFIG.end_date
+    assert daily.get_column('isin').n_unique() == CONFIG.isins
+    assert ducks3.get_news(date_from=CONFIG.tick_start.isoformat()).height == rows['news']
+    assert ducks3.get_gold_prices().height == rows['gold_prices']
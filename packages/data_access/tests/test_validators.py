@@ -1,7 +1,7 @@
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 
 import pytest
-from data_access.validators import validate_isin, parse_date
+from data_access.validators import validate_isin, parse_date, parse_datetime
 
 
 @pytest.mark.parametrize("isin, expected",
@@ -28,4 +28,18 @@ def test_parse_date(date_string, expected):
         assert parse_date(date_string) == expected
     else:
         with pytest.raises(expected):
-            parse_date(date_string)
\ No newline at end of file
+            parse_date(date_string)
+
+
+@pytest.mark.parametrize("value, expected",
+                         [("2025-06-30T15:45:00", datetime(2025, 6, 30, 15, 45)),
+                          ("2025-06-30 15:45+02:00", datetime(2025, 6, 30, 15, 45, tzinfo=timezone(timedelta(hours=2)))),
+                          ("2025-06-30", ValueError),
+                          ("30.06.2025 15:45", ValueError)
+                          ])
+def test_parse_datetime(value, expected):
+    if isinstance(expected, datetime):
+        assert parse_datetime(value) == expected
+    else:
+        with pytest.raises(expected):
+            parse_datetime(value)
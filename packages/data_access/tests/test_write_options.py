@@ -0,0 +1,44 @@
+import datetime
+import uuid
+from pathlib import Path
+
+import duckdb
+import polars as pl
+import pytest
+from data_access.S3 import STAGING_PREFIX
+from data_access.write_options import WriteOptions, layout_of
+
+
+def test_copy_options_of_partitioned_append():
+    options = WriteOptions(row_group_size=1000, partition_by=('year', 'month'), append=True)
+    assert options.copy_options() == ("FORMAT PARQUET, COMPRESSION zstd, COMPRESSION_LEVEL 3, ROW_GROUP_SIZE 1000, "
+                                      "PARTITION_BY (year, month), FILENAME_PATTERN '{uuid}', APPEND")
+
+
+def test_copy_options_of_single_file():
+    assert WriteOptions(compression_level=None).copy_options() == "FORMAT PARQUET, COMPRESSION zstd"
+
+
+def test_layout_of_path():
+    assert layout_of('/gold_prices/year=2025/2025-03-01.parquet').sort_by == ('date',)
+    assert layout_of('compacted/ohlc/2025-02/data_0.parquet').sort_by == ('isin', 'datetime')
+    assert layout_of('/unknown/file.parquet') == WriteOptions()
+
+
+
+def test_failed_atomic_write_leaves_nothing_behind(ducks3, monkeypatch):
+    # a file in place of a partition directory of the staged write makes the COPY fail
+    monkeypatch.setattr(uuid, 'uuid4', lambda: uuid.UUID(int=1))
+    blocker = Path(ducks3.s3, STAGING_PREFIX, uuid.UUID(int=1).hex, 'ohlc/year=2025/month=3/day=28')
+    blocker.parent.mkdir(parents=True)
+    blocker.write_bytes(b'')
+    days = [datetime.datetime(2025, 3, day, 10) for day in (27, 28)]
+    ticks = pl.DataFrame({'datetime': days, 'price': [1.0, 2.0], 'volume': [10, 20], 'isin': 'PLSYN0000001',
+                          'year': 2025, 'month': 3, 'day': [27, 28]})
+
+    with pytest.raises(duckdb.Error):
+        ducks3.write_data(ticks, '/ohlc')
+
+    assert ducks3.storage.list_objects('ohlc/') == []
+    assert ducks3.storage.list_objects(f'{STAGING_PREFIX}/') == []
+    assert ducks3.manifests.load('ohlc') is None
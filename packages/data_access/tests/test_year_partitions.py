@@ -0,0 +1,130 @@
+import datetime
+
+import polars as pl
+import pytest
+from data_access import Compaction, DuckS3
+from data_access.synthetic import SyntheticConfig
+
+THIS_YEAR = datetime.date.today().year
+LAST_YEAR = THIS_YEAR - 1
+# a few weeks around the turn of a year, so currencies and gold prices are stored in two year partitions
+CONFIG = SyntheticConfig(years=0.1, isins=1, seed_years=0, ticks_per_day=1, news_per_day=1,
+                         end_date=datetime.date(2025, 1, 15), seed=5)
+
+
+def gold(*rows: tuple[datetime.date, float]) -> pl.DataFrame:
+    return pl.DataFrame({'date': [date for date, _ in rows], 'price': [price for _, price in rows]})
+
+
+def store_legacy_gold(ducks3: DuckS3, *rows: tuple[datetime.date, float]) -> None:
+    """Writes the single-file history as it was stored before the year layout, with dates as strings"""
+    ducks3.write_data(gold(*rows).with_columns(pl.col('date').cast(pl.String)), '/gold_prices/gold_prices.parquet')
+
+
+def test_currency_filters_are_applied_in_the_query(market):
+    everything = market.get_currencies('mid_market_rate')
+    assert everything.get_column('effective_date').dt.year().unique().sort().to_list() == [2024, 2025]
+
+    rates = market.get_currencies('mid_market_rate', date_from='2024-12-20', date_to='2025-01-10',
+                                  currency_code='EUR', columns=['effective_date', 'mid'])
+    expected = (everything.filter(pl.col('effective_date').is_between(datetime.date(2024, 12, 20),
+                                                                      datetime.date(2025, 1, 10)),
+                                  pl.col('code') == 'EUR')
+                .select('effective_date', 'mid'))
+    assert rates.height > 0 and rates.equals(expected)
+    assert market.get_currencies('mid_market_rate', arrow=True).num_rows == everything.height
+    assert market.get_currencies('mid_market_rate', date_from='2030-01-01').is_empty()
+    with pytest.raises(ValueError):
+        market.get_currencies('mid_market_rate', columns=['rate'])
+
+
+def test_gold_filters_are_applied_in_the_query(market):
+    everything = market.get_gold_prices()
+    prices = market.get_gold_prices(date_from='2024-12-30', date_to='2025-01-03')
+    expected = everything.filter(pl.col('date').is_between(datetime.date(2024, 12, 30), datetime.date(2025, 1, 3)))
+    assert prices.height == 5 and prices.equals(expected)
+    assert market.get_gold_prices(date_from='2030-01-01').is_empty()
+
+
+def test_gold_prices_are_appended_and_merged_with_legacy_history(ducks3):
+    assert not ducks3.gold_prices_exist()
+    first, second, third = (datetime.date(LAST_YEAR, 12, 31), datetime.date(THIS_YEAR, 1, 2),
+                            datetime.date(THIS_YEAR, 1, 5))
+    store_legacy_gold(ducks3, (first, 300.0), (second, 301.0))
+    assert ducks3.gold_prices_exist()
+
+    written = ducks3.append_gold_prices(gold((second, 302.0)))
+    written += ducks3.append_gold_prices(gold((third, 303.0)))
+
+    # one small file per day, no existing file is rewritten
+    assert [ducks3.storage.key(path) for path in written] == [
+        f'gold_prices/year={THIS_YEAR}/{second}.parquet', f'gold_prices/year={THIS_YEAR}/{third}.parquet']
+    assert ducks3.file_exists('/gold_prices/gold_prices.parquet')
+    expected = [(first, 300.0), (second, 302.0), (third, 303.0)]
+    assert ducks3.get_gold_prices().rows() == expected
+    assert ducks3.get_gold_prices(date_from=str(second), date_to=str(second)).rows() == [(second, 302.0)]
+
+    # fetching the same day again doesn't duplicate it
+    ducks3.append_gold_prices(gold((third, 303.0)))
+    assert ducks3.get_gold_prices().rows() == expected
+
+
+def test_gold_compaction_reports_written_and_deleted_files(ducks3):
+    store_legacy_gold(ducks3, (datetime.date(LAST_YEAR, 3, 1), 300.0), (datetime.date(THIS_YEAR, 1, 2), 400.0))
+    ducks3.append_gold_prices(gold((datetime.date(LAST_YEAR, 3, 2), 301.0)))
+    before = ducks3.get_gold_prices()
+
+    compaction = ducks3.compact_gold_prices()
+
+    # the legacy split of the closed year is merged into its yearly file within the same call
+    assert sorted(ducks3.storage.key(path) for path in compaction.written) == [
+        f'gold_prices/year={LAST_YEAR}/{LAST_YEAR}.parquet', f'gold_prices/year={THIS_YEAR}/legacy.parquet']
+    assert all(ducks3.file_exists(path) for path in compaction.written)
+    assert not any(ducks3.file_exists(path) for path in compaction.deleted)
+    assert sorted(ducks3.storage.key(path) for path in compaction.deleted) == [
+        'gold_prices/gold_prices.parquet', f'gold_prices/year={LAST_YEAR}/{LAST_YEAR}-03-02.parquet',
+        f'gold_prices/year={LAST_YEAR}/legacy.parquet']
+    assert ducks3.get_gold_prices().equals(before)
+
+    assert ducks3.compact_gold_prices() == Compaction()
+
+
+def rates(*rows: tuple[datetime.date, str, float]) -> pl.DataFrame:
+    return pl.DataFrame({'table': 'A', 'no': '001/A/NBP', 'effective_date': [date for date, _, _ in rows],
+                         'currency': 'dolar amerykański', 'code': [code for _, code, _ in rows],
+                         'mid': [mid for _, _, mid in rows]})
+
+
+def test_currencies_are_appended_and_merged_with_legacy_history(ducks3):
+    first, second = datetime.date(LAST_YEAR, 12, 30), datetime.date(LAST_YEAR, 12, 31)
+    third, fourth = datetime.date(THIS_YEAR, 1, 2), datetime.date(THIS_YEAR, 1, 5)
+    ducks3.write_data(rates((first, 'USD', 4.0), (second, 'USD', 4.1), (fourth, 'USD', 4.1)),
+                      '/currencies/mid_market_rate.parquet')
+
+    written = ducks3.append_currencies('mid_market_rate', rates((second, 'USD', 4.2), (third, 'USD', 4.3)))
+
+    assert sorted(ducks3.storage.key(path) for path in written) == [
+        f'currencies/mid_market_rate/year={LAST_YEAR}/{second}.parquet',
+        f'currencies/mid_market_rate/year={THIS_YEAR}/{third}.parquet']
+    # the appended copy of a row stored in both layouts wins
+    expected = [(first, 4.0), (second, 4.2), (third, 4.3), (fourth, 4.1)]
+    assert ducks3.get_currencies('mid_market_rate').select('effective_date', 'mid').rows() == expected
+
+    # a repeated backfill doesn't duplicate rows
+    ducks3.append_currencies('mid_market_rate', rates((second, 'USD', 4.2), (third, 'USD', 4.3)),
+                             file_name='backfill.parquet')
+    assert ducks3.get_currencies('mid_market_rate').select('effective_date', 'mid').rows() == expected
+
+    compaction = ducks3.compact_currencies('mid_market_rate')
+
+    assert not ducks3.file_exists('/currencies/mid_market_rate.parquet')
+    assert all(ducks3.file_exists(path) for path in compaction.written)
+    assert not any(ducks3.file_exists(path) for path in compaction.deleted)
+    assert sorted(ducks3.storage.key(path) for path in compaction.written) == [
+        f'currencies/mid_market_rate/year={LAST_YEAR}/{LAST_YEAR}.parquet',
+        f'currencies/mid_market_rate/year={THIS_YEAR}/legacy.parquet']
+    assert ducks3.get_currencies('mid_market_rate').select('effective_date', 'mid').rows() == expected
+
+    # the legacy split of the current year stays until the year is closed, appended rows still win over it
+    ducks3.append_currencies('mid_market_rate', rates((fourth, 'USD', 4.4)), file_name='update.parquet')
+    assert ducks3.get_currencies('mid_market_rate', date_from=str(fourth)).get_column('mid').to_list() == [4.4]
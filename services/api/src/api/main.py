@@ -1,144 +1,553 @@
+import asyncio
 import datetime
+import email.utils
 import io
 import os
-from typing import Annotated
-from fastapi import FastAPI, HTTPException, Depends, Query
+from typing import Annotated, AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from dotenv import load_dotenv
-from fastapi.responses import StreamingResponse
-from data_access import DuckS3
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from data_access import AsyncDuckS3, DuckS3, MARKET_TIMEZONE, OHLC_DAILY_COLUMNS, RESAMPLE_INTERVALS, get_metrics, \
+    get_result_cache, parse_date, parse_datetime, recent_profiles, validate_isin
+from api.response_cache import CachedResponse, get_response_cache
 
 load_dotenv()
 app = FastAPI()
 
+# how often a running query checks if the client is still connected, in seconds
+DISCONNECT_POLL_INTERVAL = 0.25
 
-def get_ducks3() -> DuckS3:
-    return DuckS3(bucket=os.getenv("S3_BUCKET"), )
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+# response header of /ohlc/ticks with the `since` value of the next call
+NEXT_SINCE_HEADER = "X-Next-Since"
+# response header of a full page of daily /ohlc with the `cursor` of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
+T = TypeVar('T')
+_ducks3: AsyncDuckS3 | None = None
 
-def last_date_of_ohlc_data():
+
+def get_ducks3() -> AsyncDuckS3:
+    """Returns process-wide async DuckS3, its executor and connection pool are shared by all requests"""
+    global _ducks3
+    if _ducks3 is None:
+        _ducks3 = AsyncDuckS3(DuckS3(bucket=os.getenv("S3_BUCKET")))
+    return _ducks3
+
+
+async def until_disconnected(request: Request, query: Awaitable[T]) -> T:
+    """Awaits the query, cancelling it together with the DuckDB query behind it if the client disconnects first"""
+    task = asyncio.ensure_future(query)
+    try:
+        while True:
+            done, _ = await asyncio.wait([task], timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.wait([task])
+                raise HTTPException(status_code=499, detail="Client closed request")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+def wants_arrow(request: Request) -> bool:
+    """Checks if the client accepts an Arrow IPC stream, parquet stays the default for other clients"""
+    return ARROW_STREAM in request.headers.get("accept", "")
+
+
+def arrow_stream(table: pa.Table) -> Iterator[bytes]:
+    """
+    Writes the table as an Arrow IPC stream one record batch at a time, batches reference buffers of the table
+    fetched from DuckDB, so only the currently sent batch is copied into the response
+    """
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches():
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    # end-of-stream marker written on close
+    yield sink.getvalue()
+
+
+async def parquet_response(data: pl.DataFrame, filename: str,
+                           headers: dict[str, str] | None = None) -> StreamingResponse:
+    """Serializes the frame to parquet off the event loop"""
+    buffer = io.BytesIO()
+    await run_in_threadpool(data.write_parquet, buffer)
+    buffer.seek(0)
+    return StreamingResponse(buffer,
+                             media_type="application/octet-stream",
+                             headers={"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept",
+                                      **(headers or {})})
+
+
+async def table_response(data: pl.DataFrame | pa.Table, filename: str,
+                         headers: dict[str, str] | None = None) -> StreamingResponse:
+    """Returns Arrow tables (fetched for clients accepting Arrow) as an IPC stream, frames as a parquet file"""
+    if isinstance(data, pa.Table):
+        return StreamingResponse(arrow_stream(data), media_type=ARROW_STREAM,
+                                 headers={"Vary": "Accept", **(headers or {})})
+    return await parquet_response(data, filename, headers)
+
+
+def serialize_table(data: pl.DataFrame | pa.Table, filename: str) -> CachedResponse:
+    """Serializes the result as `table_response` would send it, as an Arrow IPC stream or a parquet file"""
+    if isinstance(data, pa.Table):
+        return CachedResponse(b"".join(arrow_stream(data)), ARROW_STREAM)
+    buffer = io.BytesIO()
+    data.write_parquet(buffer)
+    return CachedResponse(buffer.getvalue(), "application/octet-stream",
+                          {"Content-Disposition": f"attachment; filename={filename}"})
+
+
+async def cached_table(request: Request, query: Callable[[bool], Awaitable[pl.DataFrame | pa.Table]], filename: str,
+                       headers: dict[str, str],
+                       describe: Callable[[pl.DataFrame | pa.Table], dict[str, str]] | None = None) -> Response:
+    """
+    Returns result of the query serialized as in `table_response`, served from the response cache if enabled.
+
+    Identical concurrent requests wait for a single query (see `ResponseCache`). The cache key includes the ETag,
+    i.e. the version of the data, so a response is never served after the data it was built from changed.
+
+    Args:
+        request: Request, its path, query and accepted format identify the response
+        query: Coroutine function running the DuckS3 query, called with True if an Arrow table should be fetched
+        filename: Name of the parquet attachment
+        headers: Validators of the data, see `conditional`
+        describe: Function returning headers derived from the result, e.g. a cursor, cached with the body
+    """
+    arrow = wants_arrow(request)
+    cache = get_response_cache()
+    if cache is None:
+        data = await until_disconnected(request, query(arrow))
+        return await table_response(data, filename, {**headers, **(describe(data) if describe else {})})
+
+    async def compute() -> CachedResponse:
+        data = await query(arrow)
+        response = await run_in_threadpool(serialize_table, data, filename)
+        response.headers.update(describe(data) if describe else {})
+        return response
+
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), arrow, headers.get("ETag"))
+    cached = await until_disconnected(request, cache.get(key, compute, endpoint=request.url.path))
+    return Response(cached.body, media_type=cached.media_type, headers={**cached.headers, "Vary": "Accept", **headers})
+
+
+async def validators(request: Request, ducks3: AsyncDuckS3, method: str) -> dict[str, str]:
+    """
+    Returns ETag and Last-Modified headers of the data returned by a DuckS3 method, derived from versions of the
+    datasets it reads (see `DuckS3.data_version`), empty if the version isn't known.
+
+    The version is taken before the query runs, so data written in between is served with the older ETag and sent
+    again on the next request, never skipped.
+    """
+    version = await ducks3.data_version(method)
+    if version is None:
+        return {}
+    tag, last_modified = version
+    # Arrow and parquet bodies of the same data are different representations (Vary: Accept), serialization isn't
+    # byte-for-byte reproducible, hence weak validators
+    headers = {"ETag": f'W/"{tag}-{"arrow" if wants_arrow(request) else "parquet"}"', "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=datetime.timezone.utc)
+        headers["Last-Modified"] = email.utils.format_datetime(last_modified.astimezone(datetime.timezone.utc),
+                                                               usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, headers: dict[str, str]) -> bool:
+    """
+    Evaluates conditional request headers against the validators, If-None-Match takes precedence over
+    If-Modified-Since as in RFC 9110. Last-Modified alone misses deleted files, so the dashboard sends both.
+    """
+    if "ETag" not in headers:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or headers["ETag"].removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or "Last-Modified" not in headers:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    return email.utils.parsedate_to_datetime(headers["Last-Modified"]) <= since
+
+
+async def conditional(request: Request, ducks3: AsyncDuckS3,
+                      method: str) -> tuple[Response | None, dict[str, str]]:
+    """
+    Returns validators of the data returned by the DuckS3 method, with a 304 Not Modified response if the client
+    already has the current version, so the query isn't run at all
+    """
+    headers = await validators(request, ducks3, method)
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers={"Vary": "Accept", **headers}), headers
+    return None, headers
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    Write-only file handing out written bytes in chunks, its position keeps growing after `drain`, as parquet
+    writer records offsets of row groups in the footer
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def encode_batches(batches: AsyncIterator[pa.RecordBatch], arrow: bool) -> AsyncIterator[bytes]:
+    """Encodes record batches as they arrive, into an Arrow IPC stream or a parquet file with a row group per batch"""
+    sink = ChunkSink()
+    writer = None
+    async for batch in batches:
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema) if arrow else pq.ParquetWriter(sink, batch.schema)
+        await run_in_threadpool(writer.write_batch, batch)
+        yield sink.drain()
+    if writer is not None:
+        await run_in_threadpool(writer.close)
+        yield sink.drain()
+
+
+async def export_response(request: Request, batches: AsyncIterator[pa.RecordBatch],
+                          filename: str) -> StreamingResponse:
+    """
+    Streams query result batch by batch with chunked transfer encoding, memory use is bounded by the batch size
+    instead of the size of the result. Format is negotiated as in `table_response`.
+
+    The first chunk is awaited before the response starts, so invalid filters are still reported with a proper
+    status code.
+    """
+    arrow = wants_arrow(request)
+    chunks = encode_batches(batches, arrow)
+    first = await until_disconnected(request, anext(chunks))
+
+    async def body() -> AsyncIterator[bytes]:
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    if arrow:
+        return StreamingResponse(body(), media_type=ARROW_STREAM, headers={"Vary": "Accept"})
+    return StreamingResponse(body(), media_type="application/octet-stream",
+                             headers={"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept"})
+
+
+async def last_date_of_ohlc_data(ducks3: AsyncDuckS3) -> str:
     """Returns the last date of OHLC data available in S3."""
-    s3 = get_ducks3()
-    with s3.get_connection() as conn:
-        last_date = conn.sql(f"""WITH dates AS(
-        SELECT * FROM read_parquet('{s3.s3}/ohlc/**/*.parquet', hive_partitioning=True)
-        )
-        SELECT MAX(MAKE_DATE(year, month, day)) as date FROM dates
-""").fetchone()[0].isoformat()
-        return last_date
+    return (await ducks3.last_ohlc_date()).isoformat()
 
 
 @app.get("/company/")
-def company_metadata(isin: Annotated[str | None, Query(title="The ISIN of the company")] = None,
-                     ducks3: DuckS3 = Depends(get_ducks3)):
+async def company_metadata(request: Request,
+                           isin: Annotated[str | None, Query(title="The ISIN of the company")] = None,
+                           ducks3: AsyncDuckS3 = Depends(get_ducks3)):
     """Return metadata of companies with optional filtering by ISIN."""
-    return ducks3.get_companies_metadata(isin=isin).to_dicts()
+    data = await until_disconnected(request, ducks3.get_companies_metadata(isin=isin))
+    return data.to_dicts()
 
 
 @app.get("/news")
 async def news_daterange(
+        request: Request,
         date_from: Annotated[str | None, Query(title="The start date of the news")] = None,
         date_to: Annotated[str | None, Query(title="The end date of the news")] = None,
         isin: Annotated[str | None, Query(title="The ISIN of the company to fetch news")] = None,
         only_isin: Annotated[bool | None, Query(title="Fetch only news about WIG20 companies")] = None,
-        ducks3: DuckS3 = Depends(get_ducks3)
+        ducks3: AsyncDuckS3 = Depends(get_ducks3)
 ):
-    """Retrieves news data based on specified filters and returns it as a Parquet file."""
-    data = ducks3.get_news(date_from=date_from, date_to=date_to, isin=isin, only_isin=only_isin)
-    buffer = io.BytesIO()
-    data.write_parquet(buffer)
-    buffer.seek(0)
-    return StreamingResponse(buffer,
-                             media_type="application/octet-stream",
-                             headers={"Content-Disposition": "attachment; filename=news.parquet"})
+    """
+    Retrieves news data based on specified filters and returns it as a Parquet file or an Arrow IPC stream.
+    Responds with 304 Not Modified when the client's If-None-Match / If-Modified-Since is still current.
+    """
+    not_modified, headers = await conditional(request, ducks3, 'get_news')
+    if not_modified:
+        return not_modified
+    return await cached_table(request, lambda arrow: ducks3.get_news(date_from=date_from, date_to=date_to, isin=isin,
+                                                                      only_isin=only_isin, arrow=arrow),
+                              "news.parquet", headers)
 
 
 @app.get("/news/today")
-async def today_news(ducks3: DuckS3 = Depends(get_ducks3)):
+async def today_news(request: Request, ducks3: AsyncDuckS3 = Depends(get_ducks3)):
     """Retrieves today's news data and returns it as a json"""
     today = datetime.date.today().isoformat()
-    return ducks3.get_news(date_from=today).to_dicts()
+    data = await until_disconnected(request, ducks3.get_news(date_from=today))
+    return data.to_dicts()
+
+
+def parse_columns(columns: str | None) -> list[str] | None:
+    """Parses comma separated daily OHLC columns, e.g. 'close, volume', checked against `OHLC_DAILY_COLUMNS`"""
+    if not columns:
+        return None
+    names = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in names if name not in OHLC_DAILY_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown columns {unknown}, valid columns are {list(OHLC_DAILY_COLUMNS)}")
+    return names
+
+
+def parse_cursor(cursor: str | None) -> tuple[str, str] | None:
+    """Parses `isin:date` cursor of a daily OHLC page (see `next_cursor`)"""
+    if cursor is None:
+        return None
+    isin, _, date = cursor.partition(":")
+    try:
+        validate_isin(isin)
+        parse_date(date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return isin, date
+
+
+def next_cursor(data: pl.DataFrame | pa.Table, limit: int | None) -> dict[str, str]:
+    """Returns cursor header pointing after the last row of a full page, empty for the last page"""
+    if limit is None or len(data) < limit:
+        return {}
+    last = data.slice(len(data) - 1).select(["isin", "date"])
+    last = (pl.from_arrow(last) if isinstance(last, pa.Table) else last).row(0)
+    return {NEXT_CURSOR_HEADER: f"{last[0]}:{last[1].isoformat()}"}
 
 
 @app.get("/ohlc")
-async def ohlc(ducks3: DuckS3 = Depends(get_ducks3), isin: str = None,
+async def ohlc(request: Request, ducks3: AsyncDuckS3 = Depends(get_ducks3), isin: str = None,
                date_from: str | None = None, date_to: str | None = None,
-               mode: str = 'daily'):
+               mode: str = 'daily',
+               columns: Annotated[str | None, Query(title="Comma separated columns (daily mode)")] = None,
+               limit: Annotated[int | None, Query(title="Rows per page (daily mode)", ge=1)] = None,
+               cursor: Annotated[str | None, Query(title="X-Next-Cursor of the previous page (daily mode)")] = None,
+               interval: Annotated[str | None, Query(title="Bar length (resampled mode)",
+                                                     enum=list(RESAMPLE_INTERVALS))] = None):
     """
     Retrieves OHLC (Open, High, Low, Close) data and returns it as a Parquet file.
 
     This endpoint supports different aggregation modes for OHLC data, including daily and raw, highly-frequent data from
-    gpw chart (minutely).
-    The returned data is streamed as a Parquet file.
+    gpw chart (minutely), and bars of any of `RESAMPLE_INTERVALS` aggregated by DuckDB (resampled), e.g.
+    `mode=resampled&interval=5m&isin=...` for 5 minute candles of the last trading day.
+    The returned data is streamed as a Parquet file, or as an Arrow IPC stream if the client sends
+    `Accept: application/vnd.apache.arrow.stream`. Responses carry ETag and Last-Modified of the OHLC data, a request
+    with current `If-None-Match` / `If-Modified-Since` gets 304 Not Modified without running the query.
+
+    Daily rows are sorted by isin and date and can be fetched in pages of `limit` rows: a full page carries
+    the `X-Next-Cursor` header, passed as `cursor` to get the next one.
 
     Args:
         isin: Optional ISIN identifier for filtering OHLC data.
-        date_from: Optional start date for minutely data filtering.
-        date_to: Optional end date for minutely data filtering.
-        mode: Aggregation mode, either 'daily' or 'minutely'.
+        date_from: Optional start date for filtering OHLC data.
+        date_to: Optional end date for filtering OHLC data.
+        mode: Aggregation mode, 'daily', 'minutely' or 'resampled'.
+        columns: Optional comma separated daily columns to return, e.g. 'close,volume', date and isin are always
+            included.
+        limit: Optional number of daily rows per page.
+        cursor: Position after the last row of the previous daily page.
+        interval: Bar length in resampled mode, e.g. '15m', '1h', '1w' or '1mo'.
 
     Returns:
-        StreamingResponse containing the OHLC data in Parquet format.
+        Response containing the OHLC data in Parquet or Arrow IPC format.
 
     Raises:
-        HTTPException: If the mode is not 'daily' or 'minutely'.
+        HTTPException: If the mode is unknown, pagination is requested outside daily mode, the interval is missing
+            in resampled mode, a column is unknown or the cursor invalid.
     """
-    if mode == 'daily':
-        data = ducks3.aggregate_ohlc_daily()
-
-    elif mode == 'minutely':
-        if not date_from:
-            date_from = last_date_of_ohlc_data()
-        data = ducks3.get_ohlc_minutely(isin=isin, date_from=date_from,
-                                        date_to=date_to)
-    else:
+    methods = {'daily': 'aggregate_ohlc_daily', 'minutely': 'get_ohlc_minutely', 'resampled': 'resample_ohlc'}
+    if mode not in methods:
         raise HTTPException(status_code=404, detail="Mode not found")
+    if mode != 'daily' and (columns or limit or cursor):
+        raise HTTPException(status_code=400, detail="columns, limit and cursor are supported in daily mode only")
+    if (mode == 'resampled') != (interval is not None):
+        raise HTTPException(status_code=400, detail="interval is required in resampled mode only")
+    if interval is not None and interval not in RESAMPLE_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {list(RESAMPLE_INTERVALS)}")
+    after = parse_cursor(cursor)
+    selected = parse_columns(columns)
+    not_modified, headers = await conditional(request, ducks3, methods[mode])
+    if not_modified:
+        return not_modified
 
-    buffer = io.BytesIO()
-    data.write_parquet(buffer)
-    buffer.seek(0)
+    async def query(arrow: bool) -> pl.DataFrame | pa.Table:
+        if mode == 'resampled':
+            return await ducks3.resample_ohlc(interval, isin=isin, date_from=date_from, date_to=date_to, arrow=arrow)
+        if mode == 'daily':
+            return await ducks3.aggregate_ohlc_daily(isin=isin, date_from=date_from, date_to=date_to, arrow=arrow,
+                                                     columns=selected,
+                                                     after=after, limit=limit)
+        return await ducks3.get_ohlc_minutely(isin=isin, date_from=date_from or await last_date_of_ohlc_data(ducks3),
+                                              date_to=date_to, arrow=arrow)
 
-    return StreamingResponse(buffer,
-                             media_type="application/octet-stream",
-                             headers={"Content-Disposition": f"attachment; filename=ohlc{mode}.parquet"})
+    return await cached_table(request, query, f"ohlc{mode}.parquet", headers, lambda data: next_cursor(data, limit))
+
+
+def next_since(data: pl.DataFrame | pa.Table, since: str | None) -> dict[str, str]:
+    """
+    Returns cursor header of a ticks response, the time of its newest tick, `since` if there are none. The time is
+    in UTC with a `Z` suffix, an offset's `+` would turn into a space in a query string that isn't URL-encoded.
+    """
+    newest = pl.from_arrow(data.select(["datetime"])) if isinstance(data, pa.Table) else data.select("datetime")
+    newest = newest.get_column("datetime").max()
+    if newest is None:
+        return {NEXT_SINCE_HEADER: since} if since else {}
+    if newest.tzinfo is None:
+        newest = newest.replace(tzinfo=MARKET_TIMEZONE)
+    cursor = newest.astimezone(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+    return {NEXT_SINCE_HEADER: cursor}
+
+
+@app.get("/ohlc/ticks")
+async def ohlc_ticks(request: Request,
+                     since: Annotated[str | None,
+                                      Query(title="Return ticks at or after this ISO 8601 timestamp")] = None,
+                     isin: Annotated[str | None, Query(title="The ISIN of the company")] = None,
+                     ducks3: AsyncDuckS3 = Depends(get_ducks3)):
+    """
+    Returns minutely ticks added since a previous call, as a Parquet file or an Arrow IPC stream. Without `since`,
+    all ticks of the last trading day are returned.
+
+    The `X-Next-Since` header holds `since` of the next call, the time of the newest returned tick. Ticks at that time
+    are returned again, as their minute may still have been open when they were written, so clients replace rows
+    with the same isin and datetime instead of appending them twice.
+
+    Raises:
+        HTTPException: If `since` or the ISIN is invalid.
+    """
+    try:
+        parse_datetime(since)
+        validate_isin(isin)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    not_modified, headers = await conditional(request, ducks3, 'get_ohlc_minutely')
+    if not_modified:
+        return not_modified
+
+    async def query(arrow: bool) -> pl.DataFrame | pa.Table:
+        if since:
+            return await ducks3.get_ohlc_minutely(isin=isin, since=since, arrow=arrow)
+        return await ducks3.get_ohlc_minutely(isin=isin, date_from=await last_date_of_ohlc_data(ducks3), arrow=arrow)
+
+    return await cached_table(request, query, "ohlc_ticks.parquet", headers, lambda data: next_since(data, since))
+
+
+@app.get("/export/ohlc")
+async def export_ohlc(request: Request,
+                      date_from: Annotated[str, Query(title="The start date")],
+                      date_to: Annotated[str | None, Query(title="The end date")] = None,
+                      isin: Annotated[str | None, Query(title="The ISIN of the company")] = None,
+                      ducks3: AsyncDuckS3 = Depends(get_ducks3)):
+    """
+    Streams minutely OHLC data of a date range, e.g. all ticks of a month, as a Parquet file or an Arrow IPC stream.
+    Data is read and sent in record batches, so exports of any size run in bounded memory.
+    """
+    batches = ducks3.iter_ohlc_minutely(isin=isin, date_from=date_from, date_to=date_to)
+    return await export_response(request, batches, "ohlc_minutely.parquet")
+
+
+@app.get("/export/news")
+async def export_news(request: Request,
+                      date_from: Annotated[str | None, Query(title="The start date of the news")] = None,
+                      date_to: Annotated[str | None, Query(title="The end date of the news")] = None,
+                      isin: Annotated[str | None, Query(title="The ISIN of the company to fetch news")] = None,
+                      ducks3: AsyncDuckS3 = Depends(get_ducks3)):
+    """Streams news of a date range as a Parquet file or an Arrow IPC stream, read and sent in record batches."""
+    batches = ducks3.iter_news(date_from=date_from, date_to=date_to, isin=isin)
+    return await export_response(request, batches, "news.parquet")
 
 
 @app.get("/currencies")
-async def currencies(curr_type: Annotated[str, Query(title="Type of currency",
+async def currencies(request: Request,
+                     curr_type: Annotated[str, Query(title="Type of currency",
                                                      enum=["mid_market", "bid_ask", "mid_market_rate_unpopular"])],
                      date_from: Annotated[str | None, Query(title="The start date")] = None,
                      date_to: Annotated[str | None, Query(title="The end date")] = None,
                      curr_code: Annotated[str | None, Query(title="Currency code (USD, CHF etc)")] = None,
-                     ducks3: DuckS3 = Depends(get_ducks3)):
-    currencies = ducks3.get_currencies(currency_type=curr_type, date_from=date_from, date_to=date_to,
-                                       currency_code=curr_code)
-    """Returns currency data for a given type and date range"""
-    buffer = io.BytesIO()
-    currencies.write_parquet(buffer)
-    buffer.seek(0)
-
-    return StreamingResponse(buffer,
-                             media_type="application/octet-stream",
-                             headers={"Content-Disposition": "attachment; filename=currencies.parquet"})
+                     ducks3: AsyncDuckS3 = Depends(get_ducks3)):
+    """Returns currency data for a given type and date range, 304 Not Modified if the client's copy is current"""
+    not_modified, headers = await conditional(request, ducks3, 'get_currencies')
+    if not_modified:
+        return not_modified
+    return await cached_table(request, lambda arrow: ducks3.get_currencies(currency_type=curr_type,
+                                                                           date_from=date_from, date_to=date_to,
+                                                                           currency_code=curr_code, arrow=arrow),
+                              "currencies.parquet", headers)
 
 
 @app.get('/gold')
-async def gold(date_from: Annotated[str | None, Query(title="The start date")] = None,
+async def gold(request: Request,
+               date_from: Annotated[str | None, Query(title="The start date")] = None,
                date_to: Annotated[str | None, Query(title="The end date")] = None,
-               ducks3: DuckS3 = Depends(get_ducks3)):
+               ducks3: AsyncDuckS3 = Depends(get_ducks3)):
     """Return gold price data for a given date range, if no dates are specified return all data available in s3.
-    Return parquet file."""
-    data = ducks3.get_gold_prices(date_from=date_from, date_to=date_to)
-
-    buffer = io.BytesIO()
-    data.write_parquet(buffer)
-    buffer.seek(0)
-    return StreamingResponse(buffer,
-                             media_type="application/octet-stream",
-                             headers={"Content-Disposition": "attachment; filename=gold.parquet"})
+    Return parquet file or Arrow IPC stream, 304 Not Modified if the client's copy is current."""
+    not_modified, headers = await conditional(request, ducks3, 'get_gold_prices')
+    if not_modified:
+        return not_modified
+    return await cached_table(request, lambda arrow: ducks3.get_gold_prices(date_from=date_from, date_to=date_to,
+                                                                            arrow=arrow),
+                              "gold.parquet", headers)
 
 
 @app.get('/llm_summary')
-async def llm_summary(ducks3: DuckS3 = Depends(get_ducks3)):
+async def llm_summary(request: Request, ducks3: AsyncDuckS3 = Depends(get_ducks3)):
     """Return the latest LLM summary of news, stock market, etc"""
-    summary_date, summary = ducks3.get_llm_summary()
+    summary_date, summary = await until_disconnected(request, ducks3.get_llm_summary())
     return {"date": summary_date, "summary": summary}
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+async def metrics():
+    """
+    Return query metrics (see `QueryProfile`), result and response cache statistics in the Prometheus text format
+    """
+    registry = get_metrics()
+    cache = get_result_cache()
+    if cache is not None:
+        registry.describe('ducks3_result_cache_bytes', 'gauge', "Size of cached query results")
+        registry.describe('ducks3_result_cache_hits_total', 'counter', "Queries served from the result cache")
+        registry.describe('ducks3_result_cache_misses_total', 'counter', "Queries not found in the result cache")
+        registry.set('ducks3_result_cache_bytes', cache.size)
+        registry.set('ducks3_result_cache_hits_total', cache.hits)
+        registry.set('ducks3_result_cache_misses_total', cache.misses)
+    responses = get_response_cache()
+    if responses is not None:
+        registry.set('api_response_cache_bytes', responses.size)
+        registry.set('api_response_cache_entries', len(responses))
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get('/metrics/queries')
+async def query_profiles(limit: Annotated[int, Query(title="Number of profiles", ge=1, le=200)] = 50,
+                         plans: Annotated[bool, Query(title="Include DuckDB profiling output")] = False):
+    """Return profiles of the most recent queries, newest first"""
+    return [{**profile.summary(), **({'plans': profile.plans} if plans else {})}
+            for profile in recent_profiles(limit)]
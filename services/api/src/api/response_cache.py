@@ -0,0 +1,150 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Hashable
+
+from data_access import MetricsRegistry, get_metrics
+
+METRICS = {
+    'api_response_cache_requests_total': ('counter', "Requests by response cache outcome: hit, miss (computed) or "
+                                                     "coalesced (waited for an identical request in flight)"),
+    'api_response_cache_evictions_total': ('counter', "Responses evicted to stay within the byte budget"),
+    'api_response_cache_bytes': ('gauge', "Size of cached response bodies"),
+    'api_response_cache_entries': ('gauge', "Number of cached responses"),
+}
+
+
+@dataclass
+class CachedResponse:
+    """Serialized body of a response with its media type and headers describing the body"""
+    body: bytes
+    media_type: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(name) + len(value) for name, value in self.headers.items())
+
+
+@dataclass
+class _Entry:
+    response: CachedResponse
+    expires_at: float
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of serialized responses bounded by total size in bytes, with single-flight computation.
+
+    Concurrent requests for a key not in the cache share one computation: the first starts it, the others wait
+    for its result, so a herd of identical requests (e.g. dashboard sessions whose caches expired together) costs
+    one query. The computation runs detached from the requests waiting for it and is cancelled only when all of them
+    went away. Keys should include the version of the data (see `DuckS3.data_version`), the TTL bounds the age of
+    responses built from data without a version.
+
+    Used only from the event loop, so its state isn't guarded by a lock.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, metrics: MetricsRegistry | None = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.metrics = metrics or get_metrics()
+        for name, (kind, help_text) in METRICS.items():
+            self.metrics.describe(name, kind, help_text)
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._in_flight: dict[Hashable, _Flight] = {}
+        self._size = 0
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[CachedResponse]],
+                  endpoint: str = '') -> CachedResponse:
+        """
+        Returns the cached response of the key, computes it if missing or expired. Errors of the computation are
+        raised to every request waiting for it and aren't cached.
+
+        Args:
+            key: Identity of the response, e.g. path, query, representation and data version
+            compute: Coroutine function building the response
+            endpoint: Label of the recorded metrics
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at >= time.monotonic():
+            self._entries.move_to_end(key)
+            self.metrics.inc('api_response_cache_requests_total', endpoint=endpoint, result='hit')
+            return entry.response
+
+        flight = self._in_flight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(compute()))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda task: self._landed(key, flight))
+            self.metrics.inc('api_response_cache_requests_total', endpoint=endpoint, result='miss')
+        else:
+            self.metrics.inc('api_response_cache_requests_total', endpoint=endpoint, result='coalesced')
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # nobody waits for the result anymore, e.g. all clients disconnected
+                flight.task.cancel()
+
+    def _landed(self, key: Hashable, flight: _Flight) -> None:
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        if not flight.task.cancelled() and flight.task.exception() is None:
+            self.put(key, flight.task.result())
+
+    def put(self, key: Hashable, response: CachedResponse) -> None:
+        if response.size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(response, time.monotonic() + self.ttl)
+        self._size += response.size
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.metrics.inc('api_response_cache_evictions_total')
+
+    def _remove(self, key: Hashable) -> None:
+        self._size -= self._entries.pop(key).response.size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+
+_response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache | None:
+    """
+    Returns process-wide response cache configured by RESPONSE_CACHE_MAX_BYTES (default 128 MiB) and
+    RESPONSE_CACHE_TTL (seconds, default 300), None if caching is disabled with RESPONSE_CACHE_MAX_BYTES=0
+    """
+    global _response_cache
+    max_bytes = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 128 * 1024 ** 2))
+    if max_bytes <= 0:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(max_bytes, float(os.getenv('RESPONSE_CACHE_TTL', 300)))
+        return _response_cache
@@ -0,0 +1,96 @@
+import datetime
+import io
+
+import polars as pl
+import pyarrow as pa
+import pytest
+from api.main import ARROW_STREAM, NEXT_CURSOR_HEADER, NEXT_SINCE_HEADER, app, get_ducks3
+from data_access import AsyncDuckS3, DuckS3
+from data_access.synthetic import SyntheticConfig, generate
+from fastapi.testclient import TestClient
+
+CONFIG = SyntheticConfig(years=0.02, isins=2, seed_years=0, ticks_per_day=10, news_per_day=1,
+                         end_date=datetime.date(2025, 3, 31), seed=7)
+ISIN = 'PLSYN0000001'
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('STORAGE_BACKEND', 'local')
+        monkeypatch.setenv('LOCAL_STORAGE_ROOT', str(tmp_path_factory.mktemp('buckets')))
+        monkeypatch.setenv('RESULT_CACHE_MAX_BYTES', '0')
+        monkeypatch.setenv('RESPONSE_CACHE_MAX_BYTES', '0')
+        ducks3 = DuckS3(bucket='api-endpoints')
+        generate(ducks3, CONFIG)
+        async_ducks3 = AsyncDuckS3(ducks3)
+        app.dependency_overrides[get_ducks3] = lambda: async_ducks3
+        with TestClient(app) as client:
+            yield client
+        app.dependency_overrides.clear()
+
+
+def test_arrow_stream_is_negotiated(client):
+    parquet = client.get('/ohlc', params={'isin': ISIN})
+    assert parquet.status_code == 200 and parquet.headers['content-type'] == 'application/octet-stream'
+
+    arrow = client.get('/ohlc', params={'isin': ISIN}, headers={'Accept': ARROW_STREAM})
+    assert arrow.status_code == 200 and arrow.headers['content-type'] == ARROW_STREAM
+    assert 'Accept' in arrow.headers['vary']
+    table = pa.ipc.open_stream(arrow.content).read_all()
+    assert pl.from_arrow(table).equals(pl.read_parquet(io.BytesIO(parquet.content)))
+
+
+def test_current_etag_is_not_modified(client):
+    response = client.get('/ohlc', params={'isin': ISIN})
+    etag = response.headers['etag']
+    assert etag.startswith('W/') and response.headers['cache-control'] == 'no-cache'
+
+    not_modified = client.get('/ohlc', params={'isin': ISIN}, headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304 and not_modified.content == b''
+    assert not_modified.headers['etag'] == etag
+    # the Arrow representation has a tag of its own
+    arrow = client.get('/ohlc', params={'isin': ISIN}, headers={'If-None-Match': etag, 'Accept': ARROW_STREAM})
+    assert arrow.status_code == 200 and arrow.headers['etag'] != etag
+
+
+def test_daily_pages_follow_the_cursor(client):
+    everything = pl.read_parquet(io.BytesIO(client.get('/ohlc').content))
+    pages, params = [], {'limit': 3}
+    while True:
+        response = client.get('/ohlc', params=params)
+        assert response.status_code == 200
+        pages.append(pl.read_parquet(io.BytesIO(response.content)))
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params['cursor'] = response.headers[NEXT_CURSOR_HEADER]
+    assert len(pages) > 2
+    assert pl.concat(pages).equals(everything)
+
+
+def test_ticks_since_the_previous_call(client):
+    response = client.get('/ohlc/ticks')
+    ticks = pl.read_parquet(io.BytesIO(response.content))
+    assert ticks.height == CONFIG.isins * CONFIG.ticks_per_day
+    since = response.headers[NEXT_SINCE_HEADER]
+    assert since.endswith('Z')
+
+    # passed unencoded, as clients following the header do
+    newer = client.get(f'/ohlc/ticks?since={since}')
+    assert newer.status_code == 200 and newer.headers[NEXT_SINCE_HEADER] == since
+    newest = pl.read_parquet(io.BytesIO(newer.content))
+    assert newest.height == CONFIG.isins
+    assert (newest.get_column('datetime') == ticks.get_column('datetime').max()).all()
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/ohlc', {'columns': 'bogus'}),
+    ('/ohlc', {'cursor': f'{ISIN}:notadate'}),
+    ('/ohlc', {'cursor': 'notanisin:2025-03-31'}),
+    ('/ohlc', {'mode': 'minutely', 'limit': 5}),
+    ('/ohlc/ticks', {'since': 'garbage'}),
+    ('/ohlc/ticks', {'isin': 'bogus'}),
+])
+def test_invalid_parameters_are_bad_requests(client, path, params):
+    response = client.get(path, params=params)
+    assert response.status_code == 400 and response.json()['detail']
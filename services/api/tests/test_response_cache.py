@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from api import response_cache
+from api.response_cache import CachedResponse, ResponseCache
+from data_access import MetricsRegistry
+
+
+class Loader:
+    """Builds responses slowly enough for identical requests to overlap, counting its calls"""
+
+    def __init__(self, body: bytes = b'x' * 10, error: Exception | None = None):
+        self.body = body
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self) -> CachedResponse:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.error is not None:
+            raise self.error
+        return CachedResponse(self.body, 'application/octet-stream')
+
+
+@pytest.fixture
+def metrics():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def cache(metrics):
+    return ResponseCache(max_bytes=100, ttl=60, metrics=metrics)
+
+
+def test_concurrent_identical_requests_run_loader_once(cache, metrics):
+    loader = Loader()
+
+    async def requests():
+        return await asyncio.gather(*(cache.get('key', loader, endpoint='/gold') for _ in range(5)))
+
+    responses = asyncio.run(requests())
+
+    assert loader.calls == 1
+    assert all(response is responses[0] for response in responses)
+    assert metrics.value('api_response_cache_requests_total', endpoint='/gold', result='miss') == 1
+    assert metrics.value('api_response_cache_requests_total', endpoint='/gold', result='coalesced') == 4
+
+    asyncio.run(cache.get('key', loader, endpoint='/gold'))
+    assert loader.calls == 1
+    assert metrics.value('api_response_cache_requests_total', endpoint='/gold', result='hit') == 1
+
+
+def test_loader_error_reaches_every_waiter_and_is_not_cached(cache):
+    failing = Loader(error=ValueError('query failed'))
+
+    async def requests():
+        return await asyncio.gather(*(cache.get('key', failing) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(requests())
+
+    assert failing.calls == 1
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert len(cache) == 0
+
+    loader = Loader()
+    asyncio.run(cache.get('key', loader))
+    assert loader.calls == 1
+
+
+def test_expired_response_is_computed_again(cache, monkeypatch):
+    now = [1000.0]
+    # only the cache's clock is frozen, the event loop keeps using the real one
+    monkeypatch.setattr(response_cache, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    loader = Loader()
+
+    asyncio.run(cache.get('key', loader))
+    now[0] += 59
+    asyncio.run(cache.get('key', loader))
+    assert loader.calls == 1
+
+    now[0] += 2
+    asyncio.run(cache.get('key', loader))
+    assert loader.calls == 2
+
+
+def test_least_recently_used_responses_are_evicted_over_max_bytes(cache, metrics):
+    for key in ('a', 'b', 'c'):
+        cache.put(key, CachedResponse(b'x' * 40, 'application/octet-stream'))
+
+    assert cache.size <= cache.max_bytes
+    assert len(cache) == 2
+    assert metrics.value('api_response_cache_evictions_total') == 1
+
+    loader = Loader(body=b'x' * 40)
+    asyncio.run(cache.get('a', loader))
+    assert loader.calls == 1
+    assert len(cache) == 2
+
+    cache.put('large', CachedResponse(b'x' * 101, 'application/octet-stream'))
+    assert len(cache) == 2
+
+
+def test_new_data_version_misses(cache):
+    # keys built by `cached_table` end with the ETag of the data version
+    loader = Loader()
+    asyncio.run(cache.get(('/gold', (), True, 'W/"v1"'), loader))
+    asyncio.run(cache.get(('/gold', (), True, 'W/"v1"'), loader))
+    asyncio.run(cache.get(('/gold', (), True, 'W/"v2"'), loader))
+
+    assert loader.calls == 2
@@ -13,15 +13,12 @@ def wig20_companies_metadata(context: dg.AssetExecutionContext, ducks3: DuckDBS3
     client = ducks3.get_resource()
     comapnies_isin = gpw.fetch_all_wig20_isin()
     companies_metadata = [gpw.fetch_metadata(x) for x in comapnies_isin]
-    companies_metadata = pl.DataFrame(companies_metadata)
+    companies_metadata = pl.DataFrame(companies_metadata).with_columns(date=pl.lit(datetime.date.today()))
     now = datetime.datetime.now().isoformat()
-    path = f'{client.s3}/companies_metadata/{now}'
 
-    with client.get_connection() as conn:
-        conn.sql(f"""
-        COPY (SELECT *, CURRENT_DATE() as date, FROM companies_metadata)
-        TO '{path}.parquet' (FORMAT PARQUET)
-        """)
+    client.write_data(companies_metadata, f'/companies_metadata/{now}.parquet')
+    # readers of current metadata open only the latest snapshot
+    client.publish_latest('companies_metadata', companies_metadata)
 
 @dg.asset(retry_policy=API_RETRY_POLICY,
           deps=[wig20_companies_metadata])
@@ -29,19 +26,34 @@ def daily_ohlc(context: dg.AssetExecutionContext, ducks3: DuckDBS3Resource) -> N
     """daily ohlc + volume data for WIG20 companies"""
     client = ducks3.get_resource()
     gpw = GpwSource()
-    with client.get_connection() as conn:
-        current_isins = client.get_latest_isins()
-        today = datetime.datetime.now()
-        ohlc_dfs_list = [gpw.fetch_ohlc(isin) for isin in current_isins]
-        ohlc = pl.concat(ohlc_dfs_list, how='vertical_relaxed')
-        ohlc = ohlc.with_columns(pl.lit(today).alias('date'))
-        path = f"{client.s3}/ohlc"
-        with client.get_connection() as conn:
-            conn.sql(f"""
-            COPY (SELECT *, YEAR(date) as year, MONTH(date) as month, DAY(date) as day
-            FROM ohlc)  TO '{path}' 
-            (FORMAT PARQUET, PARTITION_BY (year, month, day), OVERWRITE_OR_IGNORE)
-            """)
+    current_isins = client.get_latest_isins()
+    today = datetime.datetime.now()
+    ohlc_dfs_list = [gpw.fetch_ohlc(isin) for isin in current_isins]
+    ohlc = pl.concat(ohlc_dfs_list, how='vertical_relaxed')
+    ohlc = ohlc.with_columns(pl.lit(today).alias('date'))
+    ohlc = ohlc.with_columns(year=pl.col('date').dt.year(), month=pl.col('date').dt.month(),
+                             day=pl.col('date').dt.day())
+    # partitioned by day and sorted by isin, datetime (see DATASET_LAYOUTS)
+    client.write_data(ohlc, '/ohlc')
+
+
+class OhlcRollupConfig(dg.Config):
+    full_rebuild: bool = False
+
+
+@dg.asset(deps=[daily_ohlc])
+def daily_ohlc_rollup(context: dg.AssetExecutionContext, ducks3: DuckDBS3Resource, config: OhlcRollupConfig) -> None:
+    """Daily ohlc + volume per company, aggregated from minutely ticks
+
+        - only today's partition is rewritten after each daily_ohlc run
+        - whole rollup is rebuilt if it doesn't exist yet or full_rebuild is set
+    """
+    client = ducks3.get_resource()
+    if config.full_rebuild or not client.ohlc_daily_rollup_exists():
+        context.log.info("Rebuilding daily OHLC rollup from all minutely data")
+        client.update_ohlc_daily_rollup()
+    else:
+        client.update_ohlc_daily_rollup(datetime.date.today())
 
 
 @dg.asset(retry_policy=API_RETRY_POLICY)
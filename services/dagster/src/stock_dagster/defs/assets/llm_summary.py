@@ -119,8 +119,7 @@ def gemini_daily_summary(gemini: GeminiResource, ducks3: DuckDBS3Resource) -> No
                'summary': response}
     summary = pl.DataFrame(summary)
     client = ducks3.get_resource()
-    with client.get_connection() as conn:
-        conn.sql(
-            f"""COPY summary to '{client.s3}/llm_summaries/' 
-             (FORMAT PARQUET, PARTITION_BY (year, month), APPEND)""")
+    # appended as a new file of the (year, month) partition
+    client.write_data(summary, '/llm_summaries')
+    client.publish_latest('llm_summaries', summary.select('date', 'summary'))
 
@@ -0,0 +1,66 @@
+import dagster as dg
+from stock_dagster.defs.resources import DuckDBS3Resource
+
+# datasets written as year=/month=/day= partitions and columns their compacted files are sorted by
+COMPACTED_DATASETS = {
+    'news': ['date'],
+    'news_isin_index': ['isin', 'date'],
+    'ohlc': ['isin', 'datetime'],
+    'ohlc_daily': ['isin', 'date'],
+}
+CURRENCY_TYPES = ['bid_ask', 'mid_market_rate', 'mid_market_rate_unpopular']
+
+
+@dg.asset(group_name='maintenance')
+def partition_compaction(context: dg.AssetExecutionContext, ducks3: DuckDBS3Resource) -> None:
+    """Merges small day partitions into bigger files
+
+        - day partitions of closed months are merged into monthly files
+        - monthly files of closed years are merged into yearly files
+        - daily currency tables and gold prices of closed years are merged into yearly files
+        - number of files read by queries grows with months, not days
+    """
+    client = ducks3.get_resource()
+    for dataset, sort_by in COMPACTED_DATASETS.items():
+        for period, yearly in (('monthly', False), ('yearly', True)):
+            compaction = client.compact_partitions(dataset, yearly=yearly, sort_by=sort_by)
+            context.log.info(f"{dataset}: {len(compaction.written)} {period} files written, "
+                             f"{len(compaction.deleted)} merged files deleted")
+    for currency_type in CURRENCY_TYPES:
+        compaction = client.compact_currencies(currency_type)
+        context.log.info(f"currencies/{currency_type}: {len(compaction.written)} files written, "
+                         f"{len(compaction.deleted)} merged files deleted")
+    compaction = client.compact_gold_prices()
+    context.log.info(f"gold_prices: {len(compaction.written)} files written, "
+                     f"{len(compaction.deleted)} merged files deleted")
+
+
+class ManifestRebuildConfig(dg.Config):
+    datasets: list[str] = ['news', 'news_isin_index', 'ohlc', 'ohlc_daily', 'ohlc_seed', 'companies_metadata', 'llm_summaries',
+                           'currencies', 'gold_prices']
+
+
+@dg.asset(group_name='maintenance')
+def dataset_manifests(context: dg.AssetExecutionContext, ducks3: DuckDBS3Resource,
+                      config: ManifestRebuildConfig) -> None:
+    """Rebuilds manifests of datasets from a listing of the bucket
+
+        - use after files were added or removed outside of the writers (manual uploads, lifecycle rules)
+        - readers list the bucket only for datasets without a manifest
+    """
+    client = ducks3.get_resource()
+    for dataset in config.datasets:
+        client.rebuild_manifest(dataset)
+        context.log.info(f"{dataset}: manifest rebuilt")
+
+
+@dg.asset(group_name='maintenance')
+def news_isin_index(context: dg.AssetExecutionContext, ducks3: DuckDBS3Resource) -> None:
+    """Rebuilds index of news by company ISIN from all stored news
+
+        - news assets keep the index up to date, run once for news written before the index existed
+        - company news are read through the index instead of scanning every article
+    """
+    client = ducks3.get_resource()
+    written = client.rebuild_news_index()
+    context.log.info(f"{written} index files written")
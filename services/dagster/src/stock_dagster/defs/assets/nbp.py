@@ -19,13 +19,11 @@ def _currency_today(curr_type: CurrencyType, ducks3: DuckDBS3Resource, context:
     # drop for compatibility with data fetched by _currency_today; mid_market_rate_unpopular has inconsistent
     # schema for today and past data
     if curr_type == "mid_market_rate_unpopular":
-        currency_today_df.drop('country', strict=False)
+        currency_today_df = currency_today_df.drop('country', strict=False)
 
-    path = f"/currencies/{curr_type}.parquet"
-    currency_past = client.read_file(path)
-
-    currency_concated = pl.concat([currency_past, currency_today_df], how='vertical_relaxed')
-    client.write_data(currency_concated, path)
+    # only today's table is written, history is never read nor rewritten
+    written = client.append_currencies(curr_type, currency_today_df)
+    context.log.info(f"Written {written}")
 
 
 def build_currency_asset(curr_type: CurrencyType) -> AssetsDefinition:
@@ -59,8 +57,7 @@ def _currency_backfill(curr_type: CurrencyType,
         backfill_dfs.append(backfill_df)
     backfill_concated = pl.concat(backfill_dfs, how='diagonal_relaxed')
 
-    path = f"/currencies/{curr_type}.parquet"
-    client.write_data(backfill_concated, path)
+    client.append_currencies(curr_type, backfill_concated, file_name='backfill.parquet')
 
 
 def build_currency_backfill(curr_type: CurrencyType) -> AssetsDefinition:
@@ -74,22 +71,20 @@ def build_currency_backfill(curr_type: CurrencyType) -> AssetsDefinition:
 
 @dg.asset(group_name='nbp', retry_policy=API_RETRY_POLICY)
 def gold_prices(context: dg.AssetExecutionContext, ducks3: DuckDBS3Resource) -> None:
-    """ gold prices history - update data, if data doesn't exist - extract all"""
+    """ gold prices history - append the current price, if data doesn't exist - extract all"""
     client = ducks3.get_resource()
     nbp = NbpSource()
     colnames = ['date', 'price']
 
-    if client.file_exists('/gold_prices/gold_prices.parquet'):
+    if client.gold_prices_exist():
         today_price = nbp.fetch_gold_actual()
         today_price = pl.DataFrame(today_price.json())
         today_price.columns = colnames
-
-        prices = client.read_file('/gold_prices/gold_prices.parquet')
-        prices = pl.concat([prices, today_price])
-        client.write_data(prices, '/gold_prices/gold_prices.parquet')
+        # only the current price is written, one small file per day
+        prices = today_price.with_columns(pl.col('date').str.to_date())
 
     else:
-        # file doesn't exist, backfilling
+        # no data yet, backfilling
         date_intervals = build_date_intervals_df(datetime.date(2013, 1, 1), datetime.date.today(),
                                                  interval='3mo')
 
@@ -101,9 +96,12 @@ def gold_prices(context: dg.AssetExecutionContext, ducks3: DuckDBS3Resource) ->
                     json()
                 )
             )
-        gold_prices_concated = pl.concat(gold_prices_intervals, how='vertical_relaxed')
-        gold_prices_concated.columns = colnames
-        client.write_data(gold_prices_concated, f'/gold_prices/gold_prices.parquet')
+        prices = pl.concat(gold_prices_intervals, how='vertical_relaxed')
+        prices.columns = colnames
+        prices = prices.with_columns(pl.col('date').str.to_date())
+
+    written = client.append_gold_prices(prices)
+    context.log.info(f"Written {len(written)} files")
 
 
 currencies_today_bid_ask = build_currency_asset('bid_ask')
@@ -1,4 +1,3 @@
-import datetime
 from typing import Protocol, Type
 
 import polars as pl
@@ -24,18 +23,8 @@ def _rss_template(context: dg.AssetExecutionContext, ducks3: DuckDBS3Resource, s
     news = source.fetch_news()
     # ensure column 'date' is in date type
     news = news.with_columns(pl.col('date').dt.date())
-    now = datetime.datetime.now()
-
-    path = f'/news/year={now.year}/month={now.month}/day={now.day}/{source.name.title()}Source.parquet'
-    with client.get_connection() as conn:
-        if client.file_exists(path):
-            news_fetched_today = client.get_today_news()
-            # ensuring that date column is date type
-            news_fetched_today = news_fetched_today.with_columns(pl.col('date').dt.date())
-            news = pl.concat([news_fetched_today, news])
-            news = news.unique(subset='link')
-
-        client.write_data(news, path)
+    new_news = client.write_news(news, f'{source.name.title()}Source')
+    context.log.info(f"{new_news.shape[0]} new articles out of {news.shape[0]} fetched")
 
 
 def build_news_asset(source: Type[NewsSource]):
@@ -27,7 +27,7 @@ wig20_metadata = dg.define_asset_job(
 ohlc_job = dg.define_asset_job(
     name="ohlc_today",
     description="Daily OHLC data for WIG20",
-    selection=dg.AssetSelection.assets("daily_ohlc")
+    selection=dg.AssetSelection.assets("daily_ohlc", "daily_ohlc_rollup")
 )
 
 gemini_job = dg.define_asset_job(
@@ -41,3 +41,9 @@ gold_job = dg.define_asset_job(
     description="Daily gold price scraping job",
     selection=dg.AssetSelection.assets("gold_prices")
 )
+
+compaction_job = dg.define_asset_job(
+    name='compaction_job',
+    description="Merge day partitions of closed months/years into bigger parquet files",
+    selection=dg.AssetSelection.assets("partition_compaction")
+)
@@ -1,7 +1,7 @@
 import dagster as dg
 
 from stock_dagster.defs.jobs import currency_daily, currency_unpopular, news_update, wig20_metadata, ohlc_job, \
-    gemini_job, gold_job
+    gemini_job, gold_job, compaction_job
 
 news = dg.ScheduleDefinition(
     description="""Today's news articles from selected sources""",
@@ -50,3 +50,10 @@ gold = dg.ScheduleDefinition(
     job=gold_job,
     cron_schedule='0 13 * * 1-5'
 )
+
+compaction = dg.ScheduleDefinition(
+    description="Compaction of day partitions of closed months",
+    job=compaction_job,
+    cron_schedule='0 3 1 * *',
+    execution_timezone='Europe/Warsaw'
+)
@@ -63,7 +63,7 @@ st.divider()
 if selected_tab == "📊 Overview":
     overview.render(ohlc_daily, ohlc_today_minutely, companies_meta, popular_currencies, gold_prices, llm_summary)
 elif selected_tab == "📈 Companies":
-    companies.render(companies_meta, ohlc_daily, ohlc_today_minutely, all_news)
+    companies.render(companies_meta)
 elif selected_tab == "💱 Currencies":
     currencies.render(currencies_all)
 else:  # News
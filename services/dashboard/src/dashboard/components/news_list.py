@@ -7,8 +7,6 @@ def news_section(news: pl.DataFrame, isin: str = None, initial_limit=5):
     """News section component for displaying company news with loading more functionality"""
 
     state_key = f"news_offset_{isin or 'all'}"
-    if isin:
-        news = news.filter(pl.col('company_isins').list.contains(isin))
 
     len_news = news.shape[0]
 
@@ -3,13 +3,23 @@ import polars as pl
 from components.news_list import news_section
 from dashboard.utils.plotting import plot_ohlc
 from utils.plotting import plot_volume
+from utils.data_loader import load_company_news, load_ohlc_bars
+from datetime import date, timedelta
 
 
-def render(companies_meta: pl.DataFrame,
-           ohlc_daily: pl.DataFrame,
-           ohlc_minutely_today: pl.DataFrame,
-           news: pl.DataFrame,
-           ) -> None:
+# bar length and period of each time range, the API resamples OHLC data to chart-ready bars
+TIME_RANGES = {
+    '1D': ('1m', None),
+    '1W': ('1d', timedelta(weeks=1)),
+    '1M': ('1d', timedelta(days=31)),
+    '3M': ('1d', timedelta(days=92)),
+    '1Y': ('1d', timedelta(days=366)),
+    '5Y': ('1w', timedelta(days=5 * 366)),
+    'MAX': ('1w', None),
+}
+
+
+def render(companies_meta: pl.DataFrame) -> None:
     tickers = companies_meta.sort('ticker').get_column('ticker').to_list()
     selected_ticker_from_overview = st.session_state.get('selected_ticker', None)
     if selected_ticker_from_overview:
@@ -33,30 +43,20 @@ def render(companies_meta: pl.DataFrame,
     st.write(f'{company_meta["description"]}')
     st.divider()
 
-    offsets = {
-        '1D': '-1d',
-        '1W': '-1w',
-        '1M': '-1mo',
-        '3M': '-3mo',
-        '1Y': '-1y',
-        '5Y': '-5y',
-        'MAX': None
-    }
     col1, col2, col3 = st.columns([1, 3, 1])
     with col2:
         time_range = st.segmented_control(
             "Time Range",
-            options=offsets.keys(),
+            options=TIME_RANGES.keys(),
             default="1D",
             label_visibility="collapsed"
         )
-    if time_range == '1D':
-        ohlc_data = ohlc_minutely_today.filter(pl.col('isin') == company_meta['company_isin'])
-    else:
-        ohlc_data = ohlc_daily.filter(pl.col('isin') == company_meta['company_isin'])
+    interval, period = TIME_RANGES[time_range or '1D']
+    ohlc_data = load_ohlc_bars(company_meta['company_isin'], interval, date.today() - period if period else None)
 
-    st.write(plot_ohlc(ohlc_data, selected_ticker, time_range))
+    st.write(plot_ohlc(ohlc_data, selected_ticker))
 
-    st.write(plot_volume(ohlc_data, selected_ticker, time_range))
+    st.write(plot_volume(ohlc_data, selected_ticker))
 
+    news = load_company_news(company_meta['company_isin'])
     news_section(news, isin=company_meta['company_isin'])
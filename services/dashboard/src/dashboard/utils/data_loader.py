@@ -1,12 +1,63 @@
 import os
+import threading
+from collections import OrderedDict
 import streamlit as st
 import requests as req
 import polars as pl
+import pyarrow as pa
 from datetime import timedelta, date
 
 api = os.environ.get('API_URL')
 pl.DataFrame()
 
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+
+def _read_table(response: req.Response) -> pl.DataFrame:
+    """Read table from an Arrow IPC stream or parquet response body"""
+    response.raise_for_status()
+    if response.headers.get('content-type', '').startswith(ARROW_STREAM):
+        return pl.from_arrow(pa.ipc.open_stream(response.content).read_all())
+    return pl.read_parquet(response.content)
+
+
+# last frame received from each URL with its validators (ETag, Last-Modified), kept across expiring st.cache entries;
+# URLs differ by date range and filters, so only the most recently used ones are kept
+VALIDATED_MAX_ENTRIES = 16
+_validated: OrderedDict[str, tuple[dict[str, str], pl.DataFrame]] = OrderedDict()
+_validated_lock = threading.Lock()
+
+
+def _get_table(url: str) -> pl.DataFrame:
+    """
+    Fetch tabular data as an Arrow IPC stream, polars wraps the received Arrow buffers without converting them.
+    Validators of the previous response are sent back, on 304 Not Modified the frame received then is reused.
+    """
+    headers = {'Accept': ARROW_STREAM}
+    with _validated_lock:
+        validators, frame = _validated.get(url, ({}, None))
+        if url in _validated:
+            _validated.move_to_end(url)
+    if 'ETag' in validators:
+        headers['If-None-Match'] = validators['ETag']
+    if 'Last-Modified' in validators:
+        headers['If-Modified-Since'] = validators['Last-Modified']
+
+    response = req.get(url, headers=headers)
+    response.close()
+    if response.status_code == 304 and frame is not None:
+        return frame
+    frame = _read_table(response)
+
+    validators = {name: response.headers[name] for name in ('ETag', 'Last-Modified') if name in response.headers}
+    with _validated_lock:
+        _validated.pop(url, None)
+        if validators:
+            _validated[url] = (validators, frame)
+            while len(_validated) > VALIDATED_MAX_ENTRIES:
+                _validated.popitem(last=False)
+    return frame
+
 
 @st.cache_resource(ttl=timedelta(days=30))
 def load_companies_meta():
@@ -21,20 +72,49 @@ def load_companies_meta():
 def load_ohlc_daily(cache_key: date):
     """load daily aggregated ohlc data since debut on the stock market"""
 
-    response = req.get(f'{api}/ohlc')
-    response.close()
-    ohlc_data = pl.read_parquet(response.content)
+    ohlc_data = _get_table(f'{api}/ohlc')
     return ohlc_data
 
 
+# ticks of the last trading day and `since` of the next /ohlc/ticks call, see load_today_ohlc_minutely
+_ticks: dict = {'frame': None, 'since': None}
+_ticks_lock = threading.Lock()
+
+
 @st.cache_resource(ttl=timedelta(minutes=15))
 def load_today_ohlc_minutely():
-    """load data for today/last day of ohlc data. Loaded every 15 min."""
-    endpoint = f'/ohlc?mode=minutely'
-    response = req.get(f"{api}/{endpoint}")
-    response.close()
-    ohlc_data = pl.read_parquet(response.content)
-    return ohlc_data
+    """load data for today/last day of ohlc data. Loaded every 15 min, only ticks added since the previous load
+    are downloaded and merged into the kept frame."""
+    with _ticks_lock:
+        frame, since = _ticks['frame'], _ticks['since']
+        response = req.get(f"{api}/ohlc/ticks", params={'since': since} if frame is not None else None,
+                           headers={'Accept': ARROW_STREAM})
+        response.close()
+        delta = _read_table(response)
+
+        if frame is None:
+            frame = delta
+        elif delta.height:
+            # the newest ticks of the previous load come again, their current version replaces them
+            frame = (pl.concat([frame, delta], how='vertical_relaxed')
+                     .unique(['isin', 'datetime'], keep='last')
+                     .sort(['isin', 'datetime']))
+            # ticks of a new trading day replace the previous one
+            last_day = frame.get_column('datetime').dt.date().max()
+            frame = frame.filter(pl.col('datetime').dt.date() == last_day)
+
+        _ticks['frame'], _ticks['since'] = frame, response.headers.get('X-Next-Since', since)
+        return frame
+
+
+@st.cache_resource(ttl=timedelta(minutes=15))
+def load_ohlc_bars(isin: str, interval: str, date_from: date | None = None) -> pl.DataFrame:
+    """load chart-ready OHLC bars of one company resampled by the API, e.g. 5 minute candles of the last day
+    (without date_from) or weekly candles since date_from."""
+    params = f"mode=resampled&isin={isin}&interval={interval}"
+    if date_from:
+        params += f"&date_from={date_from.isoformat()}"
+    return _get_table(f"{api}/ohlc?{params}")
 
 
 @st.cache_resource
@@ -50,9 +130,7 @@ def load_news_to_yesterday(key: str):
 
     # Fetching all news (~15MB/year) and filtering client-side is faster
     # and simpler than maintaining filter logic in API for this data volume
-    response = req.get(endpoint)
-    response.close()
-    news = pl.read_parquet(response.content)
+    news = _get_table(endpoint)
     news = _filter_news(news, True)
     return news
 
@@ -84,35 +162,34 @@ def load_all_news() -> pl.DataFrame:
     today = date.today().isoformat()
     to_yesterday = load_news_to_yesterday(today)
 
-    today_news_response = req.get(f"{api}/news?date_from={today}")
-    today_news_response.close()
-    today_news = pl.read_parquet(today_news_response.content)
+    today_news = _get_table(f"{api}/news?date_from={today}")
     today_news = _filter_news(today_news, True)
     news = pl.concat([to_yesterday, today_news], how='vertical_relaxed')
 
     return news
 
 
+@st.cache_resource(ttl=timedelta(minutes=60))
+def load_company_news(isin: str) -> pl.DataFrame:
+    """Load news about one company, API reads only articles pointed to by its ISIN index."""
+    news = _get_table(f"{api}/news?isin={isin}")
+    return news.sort('date', descending=True)
+
+
 @st.cache_resource(ttl=timedelta(hours=12))
 def load_currencies(curr_type='mid_market_rate', currencies_list: list[str] = None):
     currencies_data = []
     if currencies_list:
         for curr in currencies_list:
-            response = req.get(f"{api}/currencies?curr_type={curr_type}&curr_code={curr}")
-            response.close()
-            currencies_data.append(pl.read_parquet(response.content))
+            currencies_data.append(_get_table(f"{api}/currencies?curr_type={curr_type}&curr_code={curr}"))
         return pl.concat(currencies_data, how='vertical_relaxed')
     else:
-        response = req.get(f"{api}/currencies?curr_type={curr_type}")
-        response.close()
-        return pl.read_parquet(response.content)
+        return _get_table(f"{api}/currencies?curr_type={curr_type}")
 
 
 @st.cache_resource(ttl=timedelta(hours=12))
 def load_gold_prices():
-    response = req.get(f"{api}/gold")
-    response.close()
-    return pl.read_parquet(response.content)
+    return _get_table(f"{api}/gold")
 
 
 @st.cache_data(ttl=timedelta(hours=1))
@@ -12,30 +12,8 @@ def _filter_date_by_offset(df: pl.DataFrame, offset: str) -> pl.DataFrame:
 
 
 @st.fragment
-def plot_volume(df: pl.DataFrame, ticker: str, date_range: str) -> go.Figure:
-    """Create volume bar chart"""
-    offsets = {
-        '1D': '-1d',
-        '1W': '-1w',
-        '1M': '-1mo',
-        '3M': '-3mo',
-        '1Y': '-1y',
-        '5Y': '-5y',
-        'MAX': None
-    }
-    offset = offsets.get(date_range, None)
-    if offset == '-1d':
-        df = (
-            df
-            .sort('datetime')
-            .group_by_dynamic('datetime', every='1m')  # polishing data for 1-minute OHLC
-            .agg([
-                pl.col('volume').sum()
-            ]).rename({'datetime': 'date'})
-        )
-    if offset:
-        df = _filter_date_by_offset(df, offset)
-
+def plot_volume(df: pl.DataFrame, ticker: str) -> go.Figure:
+    """Create volume chart of OHLC bars"""
     fig = go.Figure()
 
     fig.add_trace(
@@ -65,34 +43,8 @@ def plot_volume(df: pl.DataFrame, ticker: str, date_range: str) -> go.Figure:
 
 
 @st.fragment
-def plot_ohlc(df: pl.DataFrame, ticker: str, date_range: str) -> go.Figure:
-    """Create interactive OHLC charts"""
-    offsets = {
-        '1D': '-1d',
-        '1W': '-1w',
-        '1M': '-1mo',
-        '3M': '-3mo',
-        '1Y': '-1y',
-        '5Y': '-5y',
-        'MAX': None
-    }
-    offset = offsets[date_range]
-
-    if date_range == '1D':
-        df = (
-            df
-            .sort('datetime')
-            .group_by_dynamic('datetime', every='1m')  # polishing data for 1-minute OHLC
-            .agg([
-                pl.col('open').first(),
-                pl.col('high').max(),
-                pl.col('low').min(),
-                pl.col('close').last(),
-            ]).rename({'datetime': 'date'})
-        )
-    elif offset:
-        df = _filter_date_by_offset(df, offset)
-
+def plot_ohlc(df: pl.DataFrame, ticker: str) -> go.Figure:
+    """Create interactive OHLC charts of bars resampled by the API"""
     fig = make_subplots()
 
     # OHLC Candlestick